@@ -14,8 +14,15 @@ import pandas as pd
 import os
 import shutil
 
-from pull_futures_data import pull_all_futures_data
-from calc_format_futures_data import main_summary, final_table
+from pull_futures_data import product_data_file, pull_product_to_file, save_clean_futures_data
+from calc_format_futures_data import (summary_file, product_summary_file, summarize_product_file,
+                                      merge_product_summaries)
+from calc_term_structure import TERM_STRUCTURE_FILE, load_term_structure_cube
+from calc_continuous_futures import continuous_file, load_continuous_futures_data, load_monthly_excess_returns
+from calc_correlation import rolling_correlation_file, save_rolling_return_correlation
+from notebook_runner import run_notebooks, stale_notebooks, executed_notebook, notebook_inputs
+from run_report import reported
+from product_registry import REGISTRY_FILE, product_codes
 from settings import config
 
 try:
@@ -45,7 +52,9 @@ DATA_DIR = Path(config("DATA_DIR"))
 OUTPUT_DIR = Path(config("OUTPUT_DIR"))
 
 NOTEBOOKS = ["Project_Walkthrough", "Project_Analysis"]
+TIME_PERIODS = ["paper", "current"]
 
+@reported
 def task_config():
     """
     Ensure _data/ and _output/ directories exist
@@ -58,126 +67,227 @@ def task_config():
         "targets": [str(DATA_DIR), str(OUTPUT_DIR)],
     }
 
+@reported
+def task_pull_futures_product():
+    """
+    Pull each product for the 'paper' and 'current' periods from WRDS into its own
+    parquet file in _data/products. One subtask per product and period, so `doit -n 8`
+    pulls products concurrently and a missing product is pulled on its own.
+    """
+    for time_period in TIME_PERIODS:
+        for code in product_codes(time_period):
+            yield {
+                "name": f"{time_period}_{code}",
+                "actions": [(pull_product_to_file, [code, time_period])],
+                "targets": [product_data_file(code, time_period)],
+                "uptodate": [True],
+                "clean": True,
+            }
+
+
+@reported
 def task_pull_clean_futures_data():
     """
-    Pull clean futures data for 'paper' and 'current' periods from WRDS, save CSVs in _data.
+    Merge the per-product pulls into clean futures parquet files for 'paper' and 'current'
+    in _data (CSV copies when EXPORT_CSV is set), and the combined daily store
+    (df_all.parquet) with its coverage index and fingerprints.
+    """
+    paper_raw = DATA_DIR / "clean_futures_paper.parquet"
+    current_raw = DATA_DIR / "clean_futures_current.parquet"
+
+    return {
+        "actions": [(save_clean_futures_data, [TIME_PERIODS])],
+        "file_dep": [product_data_file(code, tp) for tp in TIME_PERIODS for code in product_codes(tp)],
+        "targets": [paper_raw, current_raw, DATA_DIR / "df_all.parquet"],
+        "clean": True,
+    }
+
+
+@reported
+def task_term_structure_cube():
+    """
+    Save the product x month x maturity settlement cube of the daily store as a
+    memory-mappable .npy array with its JSON metadata in _data.
     """
-    paper_raw = DATA_DIR / "clean_futures_paper.csv"
-    current_raw = DATA_DIR / "clean_futures_current.csv"
+    def build():
+        cube = load_term_structure_cube(rebuild=True)
+        print(f"Saved {TERM_STRUCTURE_FILE} with shape {cube['values'].shape}")
+
+    return {
+        "actions": [build],
+        "file_dep": [DATA_DIR / "df_all.parquet", "src/calc_term_structure.py"],
+        "targets": [TERM_STRUCTURE_FILE, TERM_STRUCTURE_FILE.with_suffix(".json")],
+        "clean": True,
+    }
+
+
+@reported
+def task_continuous_futures():
+    """
+    Save the rolled front and second-contract series of every product (roll 5 business
+    days before expiry) in _data, for the analysis and figure modules.
+    """
+    def build():
+        continuous_df = load_continuous_futures_data(nth=(1, 2), rebuild=True)
+        print(f"Saved {continuous_file()} with {len(continuous_df)} rows")
+
+    return {
+        "actions": [build],
+        "file_dep": [DATA_DIR / "df_all.parquet", "src/calc_continuous_futures.py"],
+        "targets": [continuous_file()],
+        "clean": True,
+    }
 
-    def pull():
-        df_paper = pull_all_futures_data("paper")
-        df_paper.to_csv(paper_raw, index=False)
-        print(f"Saved {paper_raw} with {len(df_paper)} rows.")
 
-        df_current = pull_all_futures_data("current")
-        df_current.to_csv(current_raw, index=False)
-        print(f"Saved {current_raw} with {len(df_current)} rows.")
+@reported
+def task_rolling_correlation():
+    """
+    Save the rolling-window correlation tensor (months x products x products) of the
+    monthly excess returns as a compressed array in _data, for the figures.
+    """
+    def build():
+        path = save_rolling_return_correlation(load_monthly_excess_returns(rebuild=True))
+        print(f"Saved {path}")
 
     return {
-        "actions": [pull],
-        "file_dep": [],
-        "targets": [paper_raw, current_raw],
-        "uptodate": [True],
+        "actions": [build],
+        "file_dep": [DATA_DIR / "df_all.parquet", "src/calc_correlation.py", "src/calc_continuous_futures.py"],
+        "targets": [rolling_correlation_file()],
         "clean": True,
     }
 
 
+@reported
+def task_calc_futures_product():
+    """
+    Compute each product's Table 1 row per period from its pulled file, saved in
+    _data/products. Only products whose pulled data changed are recomputed, unless the
+    Table 1 code or the product registry changed.
+    """
+    for time_period in TIME_PERIODS:
+        for code in product_codes(time_period):
+            yield {
+                "name": f"{time_period}_{code}",
+                "actions": [(summarize_product_file, [code, time_period])],
+                "file_dep": [product_data_file(code, time_period), "src/calc_format_futures_data.py", REGISTRY_FILE],
+                "targets": [product_summary_file(code, time_period)],
+                "clean": True,
+            }
+
+
+@reported
 def task_calc_futures_data():
     """
-    Calculate final stats (paper/current) using main_summary & final_table.
-    CSV files in _data, HTML outputs in _output.
+    Merge the per-product rows into the final stats (paper/current) and save them as
+    typed parquet in _data (CSV copies when EXPORT_CSV is set). The HTML tables in
+    _output are rendered from them by create_figures.
     """
-    paper_clean = DATA_DIR / "clean_futures_paper.csv"
-    current_clean = DATA_DIR / "clean_futures_current.csv"
-    paper_csv = DATA_DIR / "final_paper.csv"
-    current_csv = DATA_DIR / "final_current.csv"
-    paper_html = OUTPUT_DIR / "final_paper.html"
-    current_html = OUTPUT_DIR / "final_current.html"
+    paper_summary = summary_file("paper")
+    current_summary = summary_file("current")
 
     def calc():
-        df_paper = main_summary("paper")
-        df_paper.to_csv(paper_csv, index=False)
-        styled_paper = final_table(df_paper)
-        paper_html.write_text(styled_paper.to_html(), encoding="utf-8")
-        print(f"Saved final paper CSV -> {paper_csv} and HTML -> {paper_html}")
-
-        df_current = main_summary("current")
-        df_current.to_csv(current_csv, index=False)
-        styled_current = final_table(df_current)
-        current_html.write_text(styled_current.to_html(), encoding="utf-8")
-        print(f"Saved final current CSV -> {current_csv} and HTML -> {current_html}")
+        merge_product_summaries("paper")
+        print(f"Saved final paper results -> {paper_summary}")
+
+        merge_product_summaries("current")
+        print(f"Saved final current results -> {current_summary}")
 
     return {
         "actions": [calc],
-        "file_dep": [paper_clean, current_clean],
-        "targets": [paper_csv, current_csv, paper_html, current_html],
+        "file_dep": [product_summary_file(code, tp) for tp in TIME_PERIODS for code in product_codes(tp)]
+                    + ["src/calc_format_futures_data.py", REGISTRY_FILE],
+        "targets": [paper_summary, current_summary],
         "clean": True,
     }
 
+@reported
 def task_run_notebooks():
     """
-    Convert notebooks to HTML & PDF (webpdf). 
-    No latex from nbconvert, so no pandoc needed here.
+    Execute the notebooks concurrently and export HTML & PDF (webpdf) from a single
+    execution of each. The notebooks read the cached pipeline artifacts instead of
+    pulling and computing again, and a notebook whose source and upstream data are
+    unchanged is skipped. No latex from nbconvert, so no pandoc needed here.
     """
-    for nb in NOTEBOOKS:
-        nb_path = Path("./notebooks") / f"{nb}.ipynb"
-
-        # 1) HTML
-        out_html = OUTPUT_DIR / f"{nb}.html"
-        yield {
-            "name": f"{nb}_html",
-            "actions": [
-                f"jupyter nbconvert --execute --to html "
-                f"--output-dir={OUTPUT_DIR} {nb_path}"
-            ],
-            "file_dep": [nb_path],
-            "targets": [out_html],
-            "clean": True,
-        }
-
-        # 2) PDF via webpdf
-        out_pdf = OUTPUT_DIR / f"{nb}.pdf"
-        yield {
-            "name": f"{nb}_pdf",
-            "actions": [
-                f"jupyter nbconvert --execute --to webpdf --allow-chromium-download "
-                f"--output-dir={OUTPUT_DIR} {nb_path}"
-            ],
-            "file_dep": [nb_path],
-            "targets": [out_pdf],
-            "clean": True,
-        }
+    def notebooks_up_to_date():
+        return not stale_notebooks(NOTEBOOKS)
+
+    def run():
+        run_notebooks(NOTEBOOKS)
+
+    return {
+        "actions": [run],
+        "file_dep": [Path("./notebooks") / f"{nb}.ipynb" for nb in NOTEBOOKS] + [
+            "src/notebook_runner.py",
+        ] + notebook_inputs(),
+        "targets": [OUTPUT_DIR / f"{nb}{suffix}" for nb in NOTEBOOKS for suffix in (".html", ".pdf")]
+                   + [executed_notebook(nb) for nb in NOTEBOOKS],
+        "uptodate": [notebooks_up_to_date],
+        "clean": True,
+    }
 
 
+@reported
 def task_create_figures():
     """
-    Create and save LaTeX tables and PNG figures for the final report (if they don't exist).
+    Create and save LaTeX and HTML tables and PNG figures for the final report.
+    Each output records a fingerprint of the products, parameters and code behind it
+    and is only re-rendered when that fingerprint changes.
     """
 
-    # Define expected output files (both .tex and .png)
+    from create_figures import RENDER_DEPENDENCIES
+
+    # Define expected output files (.tex, .html and .png)
     expected_outputs = [
         OUTPUT_DIR / "sector_settlement_summary.tex",
         OUTPUT_DIR / "paper_table1_replication_paper.tex",
         OUTPUT_DIR / "paper_table1_replication_current.tex",
+        OUTPUT_DIR / "final_paper.html",
+        OUTPUT_DIR / "final_current.html",
         OUTPUT_DIR / "all_commodities_settlement.png",
+        OUTPUT_DIR / "continuous_front_futures.png",
         OUTPUT_DIR / "commodity_correlation_heatmap.png",
+        OUTPUT_DIR / "rolling_commodity_correlation.png",
         OUTPUT_DIR / "commodity_coverage_heatmap.png",
         OUTPUT_DIR / "sample_future_curves_basis_1986.png",
         OUTPUT_DIR / "sample_future_curves_basis_2060.png"
     ]
 
-    # Run the script to generate missing figures
+    def figures_up_to_date():
+        from create_figures import stale_outputs
+        return not stale_outputs()
+
+    # Run the script to generate stale figures
     action = ["python src/create_figures.py"]
 
     return {
         "actions": action,
+        "file_dep": [
+            DATA_DIR / "df_all.parquet",
+            summary_file("paper"),
+            summary_file("current"),
+            continuous_file(),
+            rolling_correlation_file(),
+        ] + RENDER_DEPENDENCIES,
         "targets": expected_outputs,
-        "uptodate": [True],  # Mark task as complete if outputs exist
+        "uptodate": [figures_up_to_date],
         "clean": True,
     }
 
 
+@reported
+def task_term_structure_atlas():
+    """
+    Render the term-structure atlas (one page of yearly futures-curve panels per
+    product) into OUTPUT_DIR/term_structure_atlas from the term-structure cube.
+    """
+    return {
+        "actions": ["python src/cli.py atlas"],
+        "file_dep": [TERM_STRUCTURE_FILE, TERM_STRUCTURE_FILE.with_suffix(".json"), "src/create_figures.py",
+                     "src/calc_term_structure.py", "src/cli.py"],
+    }
+
+
+@reported
 def task_init_sphinx():
     """
     Creates a minimal Sphinx + MyST-NB project in docs/ automatically,
@@ -245,6 +355,7 @@ Welcome to ProjectDocs
         "clean": True,
     }
 
+@reported
 def task_sphinx_latexpdf():
     """
     Build LaTeX & PDF from notebooks using Sphinx + MyST-NB,
@@ -289,6 +400,7 @@ def task_sphinx_latexpdf():
     }
 
 
+@reported
 def task_final_report_latex_to_pdf():
     """
     Compile the final report LaTeX file to PDF using latexmk.
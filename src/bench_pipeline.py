@@ -0,0 +1,255 @@
+""" Stage-by-stage benchmarks of the Table 1 pipeline on synthetic products, with the
+original row-by-row implementations kept as references the fast stages must agree with"""
+
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from settings import config
+from calc_format_futures_data import (parse_contrdate, futures_series_to_monthly,
+                                      extract_first_through_12th_contracts, compute_futures_stats)
+from synthetic_futures import synthetic_product
+
+OUTPUT_DIR = Path(config("OUTPUT_DIR"))
+BENCH_DIR = OUTPUT_DIR / "benchmarks"
+BENCH_SCALES = (30, 300, 3000)
+STAGES = ["to_monthly", "first_through_12th", "stats"]
+STATS_KEYS = ["N", "mean_basis", "freq_bw", "excess_return_mean", "excess_return_std", "sharpe_ratio"]
+
+
+def reference_futures_series_to_monthly(df):
+    """
+    Original futures_series_to_monthly: groupby tail and a per-row contrdate parse.
+    """
+    df = df.sort_values(["futcode", "date_"])
+    monthly_df = df.groupby(["futcode", df["date_"].dt.to_period("M")]).tail(1).copy()
+
+    monthly_df["contr_period"] = monthly_df["contrdate"].apply(parse_contrdate)
+    monthly_df["obs_period"]   = monthly_df["date_"].dt.to_period("M")
+
+    monthly_df = monthly_df.drop(columns=["date_", "contrdate"])
+    monthly_df = monthly_df.sort_values(by=["obs_period","contr_period"])
+    return monthly_df
+
+
+def reference_extract_first_through_12th_contracts(monthly_df):
+    """
+    Original extract_first_through_12th_contracts: one lookup per observation month
+    and maturity.
+    """
+    temp = monthly_df.set_index(["obs_period", "contr_period"])["settlement"]
+
+    first_through_12th_contracts_df = pd.DataFrame(index=monthly_df['obs_period'].unique())
+
+    for i in range(1, 13):
+        first_through_12th_contracts_df[f"{i}mth_settlement"] = first_through_12th_contracts_df.index.to_series().apply(
+            lambda op: temp.get((op, op + i), float("nan"))
+        )
+
+    return first_through_12th_contracts_df
+
+
+def reference_compute_futures_stats(first_through_12th_contracts_df, monthly_df):
+    """
+    Original compute_futures_stats: row-wise applies for T1/T2 and a groupby apply for
+    the per-contract returns.
+    """
+    basis_df = pd.DataFrame(index=first_through_12th_contracts_df.index)
+    first_through_12th_contracts_df['T1'] = first_through_12th_contracts_df.apply(
+        lambda row: next((i for i in range(1, 13) if not pd.isna(row[f"{i}mth_settlement"])), np.nan),
+        axis=1
+    )
+    first_through_12th_contracts_df['T2'] = first_through_12th_contracts_df.apply(
+        lambda row: next((i for i in range(12, 0, -1) if not pd.isna(row[f"{i}mth_settlement"])), np.nan),
+        axis=1
+    )
+    basis_df['T1'] = first_through_12th_contracts_df['T1']
+    basis_df['T2'] = first_through_12th_contracts_df['T2']
+    basis_df['month_diff'] = basis_df['T2'] - basis_df['T1']
+
+    basis_df['settlement_T1'] = first_through_12th_contracts_df.apply(
+        lambda row: row[f"{int(row['T1'])}mth_settlement"] if not pd.isna(row['T1']) else np.nan,
+        axis=1
+    )
+    basis_df['settlement_T2'] = first_through_12th_contracts_df.apply(
+        lambda row: row[f"{int(row['T2'])}mth_settlement"] if not pd.isna(row['T1']) else np.nan,
+        axis=1
+    )
+
+    basis_df['basis'] = (np.log(basis_df['settlement_T1']) - np.log(basis_df['settlement_T2'])) / basis_df['month_diff'] * 100
+    basis_df = basis_df.dropna()
+
+    excess_return_df = monthly_df.groupby("futcode")[["obs_period", "settlement"]].apply(
+        lambda x: (x.sort_values(by="obs_period").iloc[-1]["settlement"] / x.sort_values(by="obs_period").iloc[0]["settlement"] - 1) * 100
+    ).reset_index(name="excess_return")
+
+    er_mean = excess_return_df["excess_return"].mean()
+    er_std = excess_return_df["excess_return"].std()
+    sharpe = 100 * er_mean / er_std if er_std != 0 else np.nan
+    return {
+        "N": len(basis_df),
+        "mean_basis": basis_df["basis"].mean(),
+        "freq_bw": (basis_df["basis"] > 0).mean() * 100,
+        "excess_return_mean": er_mean,
+        "excess_return_std": er_std,
+        "sharpe_ratio": sharpe
+    }
+
+
+def check_equivalence(data_df):
+    """
+    Run every stage of one product with the fast and the reference implementation and
+    assert that they agree.
+
+    Parameters
+    ----------
+    data_df : pandas.DataFrame
+        Daily rows of one product (as from fetch_wrds_fut_contract).
+
+    Raises
+    ------
+    AssertionError
+        Naming the first stage whose outputs differ.
+    """
+    fast_monthly = futures_series_to_monthly(data_df)
+    ref_monthly = reference_futures_series_to_monthly(data_df)
+    try:
+        pd.testing.assert_frame_equal(fast_monthly.reset_index(drop=True), ref_monthly.reset_index(drop=True))
+    except AssertionError as e:
+        raise AssertionError(f"to_monthly differs from reference: {e}")
+
+    fast_wide = extract_first_through_12th_contracts(fast_monthly)
+    ref_wide = reference_extract_first_through_12th_contracts(ref_monthly)
+    try:
+        pd.testing.assert_frame_equal(fast_wide, ref_wide, check_dtype=False)
+    except AssertionError as e:
+        raise AssertionError(f"first_through_12th differs from reference: {e}")
+
+    fast_stats = compute_futures_stats(fast_wide.copy(), fast_monthly)
+    ref_stats = reference_compute_futures_stats(ref_wide.copy(), ref_monthly)
+    for key in STATS_KEYS:
+        if not np.isclose(fast_stats[key], ref_stats[key], equal_nan=True):
+            raise AssertionError(f"stats['{key}'] differs from reference: {fast_stats[key]} != {ref_stats[key]}")
+
+
+def _time_stages(data_df, implementation):
+    """
+    Seconds spent in each stage for one product.
+    """
+    if implementation == "fast":
+        to_monthly, wide, stats = futures_series_to_monthly, extract_first_through_12th_contracts, compute_futures_stats
+    else:
+        to_monthly, wide, stats = (reference_futures_series_to_monthly, reference_extract_first_through_12th_contracts,
+                                   reference_compute_futures_stats)
+    seconds = {}
+    t = time.perf_counter()
+    monthly_df = to_monthly(data_df)
+    seconds["to_monthly"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    wide_df = wide(monthly_df)
+    seconds["first_through_12th"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    stats(wide_df, monthly_df)
+    seconds["stats"] = time.perf_counter() - t
+    return seconds
+
+
+def benchmark_stages(scales=BENCH_SCALES, reference_max_products=30, check_products=3, strict=False,
+                     **synthetic_kwargs):
+    """
+    Time each pipeline stage over scales of synthetic products.
+
+    Products are generated one at a time (generation is timed separately), so memory
+    stays bounded at any scale. The reference implementations are timed on the first
+    reference_max_products products of each scale and extrapolated per product.
+
+    Parameters
+    ----------
+    scales : iterable of int, optional
+        Numbers of products (default is 30, 300 and 3000).
+    reference_max_products : int, optional
+        Products per scale also timed with the reference implementations (default is 30).
+    check_products : int, optional
+        Products per scale checked for fast-vs-reference equivalence (default is 3).
+    strict : bool, optional
+        Raise on the first equivalence failure instead of logging it and recording
+        equivalent=False in the results (default is False).
+    **synthetic_kwargs
+        Passed to synthetic_product (e.g. n_years, contracts_per_year).
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per scale, stage and implementation: products timed, daily rows,
+        total seconds, seconds per product, and for the fast rows the speedup over the
+        reference and whether the equivalence checks passed.
+
+    Raises
+    ------
+    AssertionError
+        If strict is True and a fast stage disagrees with its reference.
+    """
+    records = []
+    for n_products in scales:
+        totals = {impl: dict.fromkeys(STAGES + ["generate"], 0.0) for impl in ("fast", "reference")}
+        n_timed = {"fast": 0, "reference": 0}
+        rows = 0
+        equivalent = True
+        for i in range(n_products):
+            t = time.perf_counter()
+            _, data_df = synthetic_product(i, **synthetic_kwargs)
+            totals["fast"]["generate"] += time.perf_counter() - t
+            rows += len(data_df)
+
+            implementations = ["fast"] + (["reference"] if i < reference_max_products else [])
+            for impl in implementations:
+                for stage, seconds in _time_stages(data_df, impl).items():
+                    totals[impl][stage] += seconds
+                n_timed[impl] += 1
+            if i < check_products:
+                try:
+                    check_equivalence(data_df)
+                except AssertionError as e:
+                    if strict:
+                        raise AssertionError(f"Product {i} at scale {n_products}: {e}") from e
+                    logging.error(f"Product {i} at scale {n_products}: {e}")
+                    equivalent = False
+
+        for stage in ["generate"] + STAGES:
+            fast_per_product = totals["fast"][stage] / n_timed["fast"]
+            record = {"products": n_products, "rows": rows, "stage": stage, "implementation": "fast",
+                      "seconds": totals["fast"][stage], "per_product_s": fast_per_product}
+            if stage != "generate" and n_timed["reference"]:
+                ref_per_product = totals["reference"][stage] / n_timed["reference"]
+                record.update(speedup=ref_per_product / fast_per_product, equivalent=equivalent)
+                records.append(record)
+                records.append({"products": n_products, "rows": rows, "stage": stage,
+                                "implementation": "reference", "seconds": totals["reference"][stage],
+                                "per_product_s": ref_per_product, "timed_products": n_timed["reference"]})
+            else:
+                records.append(record)
+    return pd.DataFrame(records)
+
+
+def save_benchmarks(results, path=None):
+    """
+    Save benchmark results as JSON under OUTPUT_DIR/benchmarks (one file per run), so
+    runs before and after a change can be compared.
+    """
+    if path is None:
+        BENCH_DIR.mkdir(parents=True, exist_ok=True)
+        path = BENCH_DIR / f"bench_{datetime.now():%Y%m%d_%H%M%S}.json"
+    Path(path).write_text(results.to_json(orient="records", indent=1))
+    return Path(path)
+
+
+if __name__ == "__main__":
+    scales = [int(s) for s in sys.argv[1:]] or BENCH_SCALES
+    results = benchmark_stages(scales)
+    print(results.to_string(index=False))
+    print(f"Saved {save_benchmarks(results)}")
@@ -0,0 +1,194 @@
+""" A small aggregate cube (sector x product x year x month) of mergeable settlement
+moments, from which the sector summary tables are rolled up instead of recomputed"""
+
+import pandas as pd
+import numpy as np
+from pull_futures_data import *
+from calc_format_futures_data import futures_series_to_monthly
+from product_registry import product_field_map
+from columnar_store import write_table, read_table, SETTLEMENT_CUBE_SCHEMA
+
+CUBE_FILE = DATA_DIR / "settlement_cube.parquet"
+CUBE_KEYS = ["Sector", "product_code", "year", "obs_period"]
+# m2 is the sum of squared deviations from the cell mean; storing centered moments
+# instead of raw sums of squares keeps the variance exact for large price levels
+MOMENTS = ["count", "mean", "m2", "min", "max"]
+
+
+def build_settlement_cube(monthly_df):
+    """
+    Aggregate monthly settlements into one cell of moments per sector, product and month.
+
+    Parameters
+    ----------
+    monthly_df : pandas.DataFrame
+        Output of futures_series_to_monthly with a 'product_code' column.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Columns ['Sector', 'product_code', 'year', 'obs_period', 'count', 'mean', 'm2',
+        'min', 'max']. NaN settlements are excluded from every moment.
+        Products missing from the product registry keep a NaN Sector.
+    """
+    if monthly_df.empty:
+        return pd.DataFrame(columns=CUBE_KEYS + MOMENTS)
+
+    cells = pd.DataFrame({
+        "Sector": monthly_df["product_code"].map(product_field_map("sector", include_disabled=True)),
+        "product_code": monthly_df["product_code"],
+        "year": monthly_df["obs_period"].dt.year,
+        "obs_period": monthly_df["obs_period"],
+        "settlement": monthly_df["settlement"],
+    })
+    grouped = cells.groupby(CUBE_KEYS, dropna=False)["settlement"]
+    count = grouped.count()
+    cube = pd.DataFrame({
+        "count": count,
+        "mean": grouped.mean(),
+        "m2": (grouped.var(ddof=0) * count).fillna(0.0),
+        "min": grouped.min(),
+        "max": grouped.max(),
+    })
+    # a cube of unregistered products only would otherwise get a float Sector level
+    return cube.reset_index().astype({"Sector": object})
+
+
+def _combine_moments(cells, by, dropna=False):
+    """
+    Combine cells into one set of moments per group of `by`, with the parallel form of
+    Chan et al.'s update: each cell's m2 is shifted by count * (cell mean - group mean)**2.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Indexed by `by`, columns MOMENTS. Groups with a NaN key are dropped if dropna.
+    """
+    cells = cells.assign(weighted=cells["count"] * cells["mean"].fillna(0.0))
+    grouped = cells.groupby(by, dropna=dropna)
+    total = grouped["count"].transform("sum")
+    group_mean = grouped["weighted"].transform("sum") / total.where(total > 0)
+    cells["m2"] = cells["m2"] + (cells["count"] * (cells["mean"] - group_mean) ** 2).fillna(0.0)
+
+    combined = cells.groupby(by, dropna=dropna).agg(
+        count=("count", "sum"),
+        weighted=("weighted", "sum"),
+        m2=("m2", "sum"),
+        min=("min", "min"),
+        max=("max", "max"),
+    )
+    n = combined["count"]
+    combined["mean"] = combined["weighted"] / n.where(n > 0)
+    return combined[MOMENTS]
+
+
+def merge_settlement_cubes(*cubes):
+    """
+    Merge cubes holding different observations of the same cells: counts add, means
+    and m2 combine exactly (see _combine_moments), min/max take the extremes.
+
+    Parameters
+    ----------
+    *cubes : pandas.DataFrame
+        Cubes built by build_settlement_cube.
+
+    Returns
+    -------
+    pandas.DataFrame
+        A single cube covering the union of all cells.
+    """
+    stacked = pd.concat([c for c in cubes if not c.empty], ignore_index=True)
+    if stacked.empty:
+        return pd.DataFrame(columns=CUBE_KEYS + MOMENTS)
+    return _combine_moments(stacked, CUBE_KEYS).reset_index()
+
+
+def update_settlement_cube(cube, new_monthly_df):
+    """
+    Fold newly arrived monthly rows into an existing cube without touching other months.
+
+    Every (product, month) present in new_monthly_df replaces that cell of the cube, so
+    re-ingesting a month (e.g. after a corrected pull) is not counted twice; the new
+    rows must therefore hold all of that product's contracts for the month.
+
+    Parameters
+    ----------
+    cube : pandas.DataFrame
+        Existing cube.
+    new_monthly_df : pandas.DataFrame
+        New rows in the futures_series_to_monthly format.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Updated cube.
+    """
+    new_cells = build_settlement_cube(new_monthly_df)
+    if new_cells.empty:
+        return cube
+    replaced = pd.MultiIndex.from_frame(cube[["product_code", "obs_period"]]).isin(
+        pd.MultiIndex.from_frame(new_cells[["product_code", "obs_period"]])
+    )
+    updated = pd.concat([cube[~replaced], new_cells], ignore_index=True)
+    return updated.sort_values(["product_code", "obs_period"], ignore_index=True)
+
+
+def rollup_settlement_cube(cube, by="Sector", start=None, end=None):
+    """
+    Roll cube cells up to summary statistics.
+
+    Parameters
+    ----------
+    cube : pandas.DataFrame
+        Cube built by build_settlement_cube.
+    by : str or list of str, optional
+        Any of the cube keys (default is 'Sector').
+    start, end : str or Period, optional
+        Inclusive monthly bounds on obs_period.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Columns [by..., 'mean', 'std', 'min', 'max', 'count'] with the sample (ddof=1)
+        standard deviation.
+    """
+    if start is not None:
+        cube = cube[cube["obs_period"] >= pd.Period(start, freq="M")]
+    if end is not None:
+        cube = cube[cube["obs_period"] <= pd.Period(end, freq="M")]
+
+    rolled = _combine_moments(cube, by, dropna=True)
+    n = rolled["count"]
+    rolled["std"] = np.sqrt(rolled["m2"] / (n - 1).where(n > 1))
+    return rolled[["mean", "std", "min", "max", "count"]].reset_index()
+
+
+def load_settlement_cube(rebuild=False):
+    """
+    Checks if the settlement cube is cached next to df_all.parquet and is at least as
+    recent. If so, reads it; otherwise builds it from the daily store and saves it.
+
+    Parameters
+    ----------
+    rebuild : bool, optional
+        Force a rebuild even if a cached file exists.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Cube built by build_settlement_cube.
+    """
+    fresh = CUBE_FILE.exists() and (
+        not DATA_FILE.exists() or CUBE_FILE.stat().st_mtime >= DATA_FILE.stat().st_mtime
+    )
+    if fresh and not rebuild:
+        cube = read_table(CUBE_FILE)
+        if not cube.empty and list(cube.columns) == CUBE_KEYS + MOMENTS:
+            return cube
+
+    df_all = load_combined_futures_data()
+    if df_all.empty:
+        return pd.DataFrame(columns=CUBE_KEYS + MOMENTS)
+    cube = build_settlement_cube(futures_series_to_monthly(df_all))
+    write_table(cube, CUBE_FILE, SETTLEMENT_CUBE_SCHEMA)
+    return cube
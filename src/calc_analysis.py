@@ -5,21 +5,18 @@ import os
 from pathlib import Path
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib import cm
 from pull_futures_data import *
 from calc_format_futures_data import *
-from IPython.display import HTML
-import seaborn as sns
+from calc_continuous_futures import load_monthly_excess_returns
+from calc_correlation import correlation_frame
+from coverage_index import load_coverage_index, coverage_matrix, coverage_counts
+from calc_aggregate_cube import load_settlement_cube, rollup_settlement_cube
+from downsample import downsample_series
+from product_registry import product_codes, product_label, product_name
 import warnings
-import matplotlib
-from matplotlib.colors import ListedColormap
 
-warnings.filterwarnings(
-    "ignore",
-    message=".*The get_cmap function was deprecated.*",
-    category=matplotlib.MatplotlibDeprecationWarning
-)
+# matplotlib, seaborn and IPython are imported by the functions that draw or render,
+# so numeric use of this module does not load them
 warnings.filterwarnings(
     "ignore",
     message=".*Glyph.*missing from font.*|.*The get_cmap function was deprecated.*",
@@ -28,7 +25,7 @@ warnings.filterwarnings(
 warnings.filterwarnings(
     "ignore",
     message=".*Glyph.*missing from font.*|.*The get_cmap function was deprecated.*",
-    category=matplotlib.MatplotlibDeprecationWarning
+    category=DeprecationWarning  # MatplotlibDeprecationWarning derives from it
     )
 
 DATA_DIR = Path("../_data")
@@ -36,73 +33,6 @@ DATA_DIR.mkdir(exist_ok=True)
 DATA_FILE = DATA_DIR / "df_all.parquet"
 
 
-CORRELATION_MAP = {
-    3160: "Barley (WA)",
-    289:  "Butter (02)",
-    3161: "Canola (WC)",
-    1980: "Cocoa (CC)",
-    2038: "Coffee (KC)",
-    3247: "Corn (C-)",
-    1992: "Cotton (CT)",
-    361:  "Lumber (LB)",
-    385:  "Oats (O-)",
-    2036: "Orange juice (JO)",
-    379:  "Rough rice (RR)",
-    3256: "Soybean meal (SM)",
-    396:  "Soybeans (S-)",
-    430:  "Wheat (W-)",
-    1986: "Crude oil (CL)",
-    2091: "Gasoline (RB)",
-    2029: "Heating oil (HO)",
-    2060: "Natural gas (NG)",
-    3847: "Propane (PN)",
-    2032: "Unleaded gas (HU)",
-    3250: "Feeder cattle (FC)",
-    2676: "Lean hogs (LH)",
-    2675: "Live cattle (LC)",
-    3126: "Aluminum (AL)",
-    2087: "Coal (CO)",
-    2026: "Copper (HG)",
-    2020: "Gold (GC)",
-    2065: "Palladium (PA)",
-    2074: "Platinum (PL)",
-    2108: "Silver (SI)"
-}
-
-PRODUCT_NAME_MAP = {
-    3160: "Barley",               
-    289:  "Butter",               
-    3161: "Canola",               
-    1980: "Cocoa",                
-    2038: "Coffee",               
-    3247: "Corn",                 
-    1992: "Cotton",               
-    361:  "Lumber",               
-    385:  "Oats",                 
-    2036: "Orange Juice",         
-    379:  "Rough Rice",           
-    3256: "Soybean Meal",         
-    396:  "Soybeans",             
-    430:  "Wheat",                
-    1986: "Crude Oil",            
-    2091: "Gasoline",             
-    2029: "Heating Oil",          
-    2060: "Natural Gas",          
-    3847: "Propane",              
-    2032: "Unleaded Gas",         
-    3250: "Feeder Cattle",        
-    2676: "Lean Hogs",            
-    2675: "Live Cattle",          
-    3126: "Aluminum",             
-    2087: "Coal",                 
-    2026: "Copper",               
-    2020: "Gold",                 
-    2065: "Palladium",            
-    2074: "Platinum",             
-    2108: "Silver"                
-}
-
-
 def plot_all_commodities_settlement_time_series(
     main_title="Monthly Settlement Prices by Commodity",
     caption_text=(
@@ -111,7 +41,11 @@ def plot_all_commodities_settlement_time_series(
         "deviation among settlement prices."
     ),
     figure_size=(16, 9),
-    legend_columns=1
+    legend_columns=1,
+    max_points=None,
+    downsample_method="minmax",
+    start=None,
+    end=None
 ):
     """
     Plots a multi-line time series of monthly settlement prices for all commodities.
@@ -126,14 +60,23 @@ def plot_all_commodities_settlement_time_series(
         Size of the figure in inches (default is (16, 9)).
     legend_columns : int, optional
         Number of columns used in the legend (default is 1).
+    max_points : int, optional
+        Points kept per commodity after shape-preserving downsampling (default is
+        PLOT_MAX_POINTS from settings; 0 plots every point).
+    downsample_method : str, optional
+        'minmax' (first/min/max/last per bucket, default) or 'lttb'.
+    start, end : str or Timestamp, optional
+        Date window sliced from the local store (default is all of it).
 
     Returns
     -------
     None
         Displays the plot inline if in a Jupyter environment.
     """
+    import matplotlib.pyplot as plt
+    from matplotlib import cm
 
-    df_all = load_combined_futures_data()
+    df_all = load_futures_window(start, end, whole_contracts=False)
     if df_all.empty:
         print("No data found from WRDS or local file.")
         return
@@ -164,7 +107,7 @@ def plot_all_commodities_settlement_time_series(
         return
 
     rename_dict = {
-        code: PRODUCT_NAME_MAP.get(code, f"Code {code}")
+        code: product_name(code)
         for code in pivot_df.columns
     }
     pivot_df.rename(columns=rename_dict, inplace=True)
@@ -186,12 +129,14 @@ def plot_all_commodities_settlement_time_series(
     # Setting up distinct line styles
     style_list = ["-", "--", "-.", ":", (0, (3, 5, 1, 5)), (0, (3, 1, 1, 1))]
 
+    dates = pivot_df.index.to_timestamp()  # Convert Period -> Timestamp
     for i, commodity in enumerate(commodity_names):
         color = color_list[i]
         linestyle = style_list[i % len(style_list)]
+        x_vals, y_vals = downsample_series(dates, pivot_df[commodity], max_points, downsample_method)
         ax.plot(
-            pivot_df.index.to_timestamp(),  # Convert Period -> Timestamp
-            pivot_df[commodity],
+            x_vals,
+            y_vals,
             label=commodity,
             color=color,
             linestyle=linestyle,
@@ -287,7 +232,9 @@ def sector_settlement_summary_all_periods(
         "like coal and gold. Agricultural is the next widest range of settlement prices, likely due to the size/quantity "
         "of the contract with commodities such as lumber and corn. This table is meant to give the user a grasp "
         "of the prices and the deviation of those prices."
-    )
+    ),
+    start=None,
+    end=None
 ):
     """
     Builds a styled HTML table of aggregated settlement stats by Sector.
@@ -300,26 +247,24 @@ def sector_settlement_summary_all_periods(
         Table title (default is "Combined Period Settlement Summary").
     caption : str, optional
         Text placed under the table (explanatory notes).
+    start, end : str or Period, optional
+        First and last observation month aggregated (default is every month).
 
     Returns
     -------
     IPython.display.HTML
         A styled HTML table or a message if no data is available.
     """
-    df_all = load_combined_futures_data()
-    if df_all.empty:
+    from IPython.display import HTML
+    cube = load_settlement_cube()
+    if cube.empty:
         return HTML("<p>No data found from WRDS or local file.</p>")
 
-    monthly_df = futures_series_to_monthly(df_all)
-    monthly_df["Sector"] = monthly_df["product_code"].map(sector_map)
-    monthly_df = monthly_df.dropna(subset=["Sector"])
-    if monthly_df.empty:
+    if cube["Sector"].isna().all():
         return HTML("<p>No valid monthly data with Sectors available.</p>")
 
     agg_stats = (
-        monthly_df.groupby("Sector")["settlement"]
-        .agg(["mean", "std", "min", "max", "count"])
-        .reset_index()
+        rollup_settlement_cube(cube, by="Sector", start=start, end=end)
         .rename(
             columns={
                 "mean": "Mean Settlement",
@@ -428,7 +373,11 @@ def plot_commodity_correlation_heatmap_pairwise(
     figure_size=(14, 12),
     annot=True,
     min_coverage=200,
-    exclude_codes=None
+    exclude_codes=None,
+    method="pearson",
+    use_returns=False,
+    start=None,
+    end=None
 ):
     """
     Generates a correlation heatmap of settlement prices for selected commodities.
@@ -447,17 +396,26 @@ def plot_commodity_correlation_heatmap_pairwise(
         Minimum monthly observations required for inclusion (default is 200).
     exclude_codes : set of int, optional
         Commodity codes to explicitly exclude from the plot.
+    method : str, optional
+        'pearson' (default) or 'spearman' pairwise-complete correlation.
+    use_returns : bool, optional
+        Correlate monthly excess returns instead of settlement price levels (default is False).
+    start, end : str or Timestamp, optional
+        Date window sliced from the local store; coverage is counted inside it
+        (default is all of the store).
 
     Returns
     -------
     None
         Displays the heatmap inline if in a Jupyter environment.
     """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
     if exclude_codes is None:
         exclude_codes = set()
 
-    df_all = load_combined_futures_data()
+    df_all = load_futures_window(start, end, whole_contracts=False)
     if df_all.empty:
         print("No data found from WRDS or local file.")
         return
@@ -467,12 +425,8 @@ def plot_commodity_correlation_heatmap_pairwise(
         print("No monthly data after converting from daily.")
         return
 
-    coverage_df = (
-        monthly_df.groupby("product_code")["obs_period"]
-        .nunique()
-        .reset_index(name="monthly_count")
-    )
-    drop_codes = coverage_df.loc[coverage_df["monthly_count"] < min_coverage, "product_code"]
+    monthly_count = coverage_counts(load_coverage_index(loader=load_combined_futures_data), start, end)
+    drop_codes = monthly_count.index[monthly_count < min_coverage]
     drop_codes = set(drop_codes).union(exclude_codes)
     monthly_df = monthly_df[~monthly_df["product_code"].isin(drop_codes)]
     if monthly_df.empty:
@@ -481,26 +435,26 @@ def plot_commodity_correlation_heatmap_pairwise(
         )
         return
 
-    monthly_df["date_dt"] = monthly_df["obs_period"].apply(lambda p: p.asfreq("M").to_timestamp())
-    pivot_df = monthly_df.pivot_table(
-        index="date_dt",
-        columns="product_code",
-        values="settlement",
-        aggfunc="mean"
-    )
-    if pivot_df.empty:
+    if use_returns:
+        corr_source = load_monthly_excess_returns()
+        corr_source = corr_source[
+            corr_source["product_code"].isin(monthly_df["product_code"].unique())
+            & corr_source["obs_period"].isin(monthly_df["obs_period"].unique())
+        ]
+        value_col = "excess_return"
+    else:
+        corr_source, value_col = monthly_df, "settlement"
+
+    corr_matrix, _ = correlation_frame(corr_source, value_col=value_col, method=method)
+    if corr_matrix.empty:
         print("After pivot, the DataFrame is empty.")
         return
 
-    pivot_df = pivot_df.resample("M").mean().sort_index()
-
     rename_dict = {
-        code: CORRELATION_MAP.get(code, f"Code {code}")
-        for code in pivot_df.columns
+        code: product_label(code)
+        for code in corr_matrix.columns
     }
-    pivot_df.rename(columns=rename_dict, inplace=True)
-
-    corr_matrix = pivot_df.corr(method="pearson")
+    corr_matrix = corr_matrix.rename(index=rename_dict, columns=rename_dict)
     if corr_matrix.isna().all().all():
         print("All correlations are NaN after filtering.")
         return
@@ -604,7 +558,9 @@ def plot_commodity_coverage_heatmap(
     xtick_subsample=12,
     show_only_year=True,
     presence_color="#003c80",
-    absence_color="#fafafa"
+    absence_color="#fafafa",
+    start=None,
+    end=None
 ):
     """
     Creates a block-style coverage heatmap for all commodities,
@@ -626,47 +582,29 @@ def plot_commodity_coverage_heatmap(
         Color used for "has data" cells (default is "#003c80").
     absence_color : str, optional
         Color used for "no data" cells (default is "#fafafa").
+    start, end : str or Timestamp, optional
+        First and last month shown (default is every month with data).
 
     Returns
     -------
     None
         Displays the heatmap inline if in a Jupyter environment.
     """
-    # Adds broilers to show that it is missing
-    CORRELATION_MAP[19] = "Broilers (BR)"
-
-    df_all = load_combined_futures_data()
-    if df_all.empty:
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from matplotlib.colors import ListedColormap
+    coverage = load_coverage_index(loader=load_combined_futures_data)
+    if len(coverage["products"]) == 0:
         print("No data found from WRDS or local file.")
         return
 
-    monthly_df = futures_series_to_monthly(df_all)
-    if monthly_df.empty:
-        print("After converting daily → monthly, no data remains.")
-        return
-
-    coverage = monthly_df[["product_code", "obs_period"]].drop_duplicates()
-    coverage["has_data"] = 1
-
-    coverage_pivot = coverage.pivot(
-        index="product_code",
-        columns="obs_period",
-        values="has_data"
-    ).fillna(0)
-
-    coverage_pivot = coverage_pivot.reindex(
-        sorted(coverage_pivot.columns),
-        axis=1
-    )
-
-    all_defined_codes = set(CORRELATION_MAP.keys())
-    pivot_codes = set(coverage_pivot.index)
-    missing_codes = all_defined_codes - pivot_codes
-    for code in missing_codes:
-        coverage_pivot.loc[code] = 0
+    coverage_pivot = coverage_matrix(coverage, product_codes=product_codes(include_disabled=True),
+                                     start=start, end=end)
+    # keep only the months in which at least one commodity has data
+    coverage_pivot = coverage_pivot.loc[:, coverage_pivot.any(axis=0)]
 
     new_index = [
-        CORRELATION_MAP.get(code, f"Code {code}")
+        product_label(code)
         for code in coverage_pivot.index
     ]
     coverage_pivot.index = new_index
@@ -0,0 +1,293 @@
+""" Functions for building continuous (rolled) futures series and monthly excess-return
+panels out of the daily settlement store, for reuse by the analysis and figure modules"""
+
+import pandas as pd
+import numpy as np
+from pull_futures_data import *
+from calc_format_futures_data import parse_contrdates, futures_series_to_monthly, front_contract_returns
+from columnar_store import write_table, read_table, CONTINUOUS_SCHEMA, RETURN_PANEL_SCHEMA
+
+ROLL_RULES = ("expiry", "month_end", "volume")
+RETURN_PANEL_FILE = DATA_DIR / "monthly_excess_returns.parquet"
+
+
+def _cache_is_fresh(path):
+    """
+    True if a derived file exists and is not older than the daily store it was built from.
+    """
+    if not path.exists():
+        return False
+    return not DATA_FILE.exists() or path.stat().st_mtime >= DATA_FILE.stat().st_mtime
+
+
+def continuous_file(roll_rule="expiry", roll_days=5):
+    """
+    Location of the persisted continuous series for a given roll rule.
+    """
+    if roll_rule in ("expiry", "volume"):
+        return DATA_DIR / f"continuous_futures_{roll_rule}{roll_days}.parquet"
+    return DATA_DIR / f"continuous_futures_{roll_rule}.parquet"
+
+
+def _eligible_contracts(df, roll_rule="expiry", roll_days=5):
+    """
+    Flag, for every daily row, whether that contract can still be held on that date.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Daily rows with 'date_', 'contr_ord' (contract month as year*12+month) and 'expiry'.
+    roll_rule : str, optional
+        'expiry' : roll roll_days business days before lasttrddate (default).
+        'month_end' : roll at the end of the month before the contract month (or expiry month).
+        'volume' : any unexpired contract; the volume switch is applied afterwards.
+    roll_days : int, optional
+        Business days before lasttrddate for the 'expiry' rule (default is 5).
+
+    Returns
+    -------
+    numpy.ndarray
+        Boolean mask aligned with df.
+    """
+    dates = df["date_"].to_numpy(dtype="datetime64[D]")
+    expiry = df["expiry"].to_numpy(dtype="datetime64[D]")
+
+    if roll_rule == "expiry":
+        roll_date = np.busday_offset(expiry, -roll_days, roll="backward")
+        return dates < roll_date
+    if roll_rule == "month_end":
+        expiry_ord = df["expiry"].dt.year * 12 + df["expiry"].dt.month
+        cutoff = np.minimum(expiry_ord, df["contr_ord"])
+        date_ord = df["date_"].dt.year * 12 + df["date_"].dt.month
+        return (date_ord < cutoff).to_numpy()
+    if roll_rule == "volume":
+        return dates <= expiry
+    raise ValueError(f"Unknown roll rule {roll_rule!r}; expected one of {ROLL_RULES}")
+
+
+def _fill_quote_gaps(df):
+    """
+    Add a row without settlement or volume for every trading day of the product on
+    which a contract is not quoted between its first and last quote, so that a missing
+    quote does not drop the contract from that day's ranking and roll the series back
+    and forth.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Daily rows with 'product_code', 'futcode' and 'date_'.
+
+    Returns
+    -------
+    pandas.DataFrame
+        df followed by the gap rows (settlement and volume NaN).
+    """
+    # position of each row's date in its product's trading calendar (consecutive per product)
+    days = df.groupby(["product_code", "date_"], sort=True).ngroup().to_numpy()
+    calendar_dates = np.empty(days.max() + 1, dtype="datetime64[ns]")
+    calendar_dates[days] = df["date_"].to_numpy()
+
+    order = np.lexsort((days, df["futcode"].to_numpy()))
+    futcodes, days = df["futcode"].to_numpy()[order], days[order]
+    same = np.r_[False, futcodes[1:] == futcodes[:-1]]
+    missing = np.where(same, np.diff(days, prepend=0) - 1, 0).clip(min=0)
+    if not missing.any():
+        return df
+
+    source = np.repeat(order, missing)
+    offset = np.arange(missing.sum()) - np.repeat(np.cumsum(missing) - missing, missing)
+    gap_days = np.repeat(days - missing, missing) + offset
+    gaps = df.iloc[source].copy()
+    gaps["date_"] = calendar_dates[gap_days]
+    gaps["settlement"] = np.nan
+    if "volume" in gaps.columns:
+        gaps["volume"] = np.nan
+    return pd.concat([df, gaps], ignore_index=True)
+
+
+def build_continuous_futures(df_all, nth=1, roll_rule="expiry", roll_days=5):
+    """
+    Build rolled Nth-contract series for every product in one vectorized pass.
+
+    On each date the eligible contracts of a product are ranked by contract month and the
+    Nth one is held. Daily returns always come from the contract held on the previous
+    date, so a roll never books the price gap between two contracts as a return. A day
+    on which the held contract has no quote is left out of its series rather than
+    rolled over.
+
+    Parameters
+    ----------
+    df_all : pandas.DataFrame
+        Daily store as returned by load_combined_futures_data. Must contain
+        ['product_code', 'futcode', 'date_', 'contrdate', 'settlement'];
+        'lasttrddate' and 'volume' are used when present.
+    nth : int or iterable of int, optional
+        Contract position(s) to follow, 1 being the front contract (default is 1).
+    roll_rule : str, optional
+        'expiry' (default), 'month_end' or 'volume'. See _eligible_contracts. Under
+        'volume' the series rolls to a later contract once it has had the highest
+        volume for roll_days consecutive trading days, and never rolls back.
+    roll_days : int, optional
+        Business days before lasttrddate used by the 'expiry' rule, or days of volume
+        leadership needed by the 'volume' rule (default is 5).
+
+    Returns
+    -------
+    pandas.DataFrame
+        Columns ['product_code', 'nth', 'date_', 'futcode', 'contr_period', 'settlement',
+        'roll', 'ret', 'cum_index']. 'ret' is the daily excess return of the rolled position
+        (decimal) and 'cum_index' its compounded value starting at 1.
+    """
+    nths = [nth] if np.isscalar(nth) else list(nth)
+    if roll_rule == "volume" and "volume" not in df_all.columns:
+        raise ValueError("The 'volume' roll rule needs a 'volume' column in the daily store.")
+
+    columns = ["product_code", "futcode", "date_", "contrdate", "settlement"]
+    columns += [c for c in ("lasttrddate", "volume") if c in df_all.columns]
+    df = df_all.loc[df_all["settlement"].notna(), columns].copy()
+    if df.empty:
+        return pd.DataFrame(columns=["product_code", "nth", "date_", "futcode", "contr_period",
+                                     "settlement", "roll", "ret", "cum_index"])
+
+    df["contr_period"] = parse_contrdates(df["contrdate"])
+    df["contr_ord"] = df["contr_period"].dt.year * 12 + df["contr_period"].dt.month
+
+    # without a stored lasttrddate, the last day of the contract month stands in for expiry
+    month_end = df["contr_period"].dt.to_timestamp(how="end").dt.normalize()
+    if "lasttrddate" in df.columns:
+        df["expiry"] = pd.to_datetime(df["lasttrddate"]).fillna(month_end)
+    else:
+        df["expiry"] = month_end
+
+    prices = df.set_index(["futcode", "date_"])["settlement"]
+    prices = prices[~prices.index.duplicated(keep="last")]
+
+    held = _fill_quote_gaps(df)
+    held = held[_eligible_contracts(held, roll_rule, roll_days)]
+    held = held.sort_values(["product_code", "date_", "contr_ord"], kind="stable")
+
+    if roll_rule == "volume":
+        # front = latest contract to lead volume for roll_days days in a row, so a one-off
+        # spike in a far contract is ignored; never rolling back to an earlier month
+        front = (
+            held[held["volume"].notna()]
+            .sort_values(["product_code", "date_", "volume"], ascending=[True, True, False], kind="stable")
+            .drop_duplicates(subset=["product_code", "date_"])[["product_code", "date_", "contr_ord"]]
+        )
+        run = front["contr_ord"].ne(front.groupby("product_code")["contr_ord"].shift()).cumsum()
+        led = front["contr_ord"].where(front.groupby(run).cumcount() + 1 >= roll_days)
+        front["front_ord"] = led.groupby(front["product_code"]).ffill().groupby(front["product_code"]).cummax()
+        held = held.merge(front[["product_code", "date_", "front_ord"]], on=["product_code", "date_"], how="left")
+        held["front_ord"] = held.groupby("product_code")["front_ord"].ffill()
+        held = held[held["contr_ord"] >= held["front_ord"].fillna(-np.inf)]
+
+    held = held.assign(nth=held.groupby(["product_code", "date_"]).cumcount() + 1)
+    held = held[held["nth"].isin(nths) & held["settlement"].notna()]
+    held = held.sort_values(["product_code", "nth", "date_"], kind="stable").reset_index(drop=True)
+
+    # price of yesterday's contract on the next series date
+    series = held.groupby(["product_code", "nth"], sort=False)
+    held["next_date"] = series["date_"].shift(-1)
+    next_price = prices.reindex(pd.MultiIndex.from_arrays([held["futcode"], held["next_date"]]))
+    forward_ret = next_price.to_numpy() / held["settlement"].to_numpy() - 1
+
+    held["ret"] = pd.Series(forward_ret, index=held.index).groupby(
+        [held["product_code"], held["nth"]], sort=False
+    ).shift(1)
+    held["roll"] = held["futcode"].ne(series["futcode"].shift(1)) & series["futcode"].shift(1).notna()
+    held["cum_index"] = (1 + held["ret"].fillna(0)).groupby(
+        [held["product_code"], held["nth"]], sort=False
+    ).cumprod()
+
+    return held[["product_code", "nth", "date_", "futcode", "contr_period",
+                 "settlement", "roll", "ret", "cum_index"]]
+
+
+def load_continuous_futures_data(nth=(1, 2), roll_rule="expiry", roll_days=5, rebuild=False):
+    """
+    Checks if a continuous series for this roll rule already exists locally.
+    If so, reads it; otherwise builds it from the daily store and saves it as parquet.
+
+    Parameters
+    ----------
+    nth : int or iterable of int, optional
+        Contract positions required (default is (1, 2)).
+    roll_rule : str, optional
+        'expiry' (default), 'month_end' or 'volume'.
+    roll_days : int, optional
+        Business days before lasttrddate used by the 'expiry' rule, or days of volume
+        leadership needed by the 'volume' rule (default is 5).
+    rebuild : bool, optional
+        Force a rebuild even if a persisted file exists.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Output of build_continuous_futures restricted to the requested positions.
+    """
+    nths = [nth] if np.isscalar(nth) else list(nth)
+    path = continuous_file(roll_rule, roll_days)
+
+    if _cache_is_fresh(path) and not rebuild:
+        continuous_df = read_table(path)
+        if not continuous_df.empty and set(nths).issubset(continuous_df["nth"].unique()):
+            return continuous_df[continuous_df["nth"].isin(nths)].reset_index(drop=True)
+
+    df_all = load_combined_futures_data()
+    continuous_df = build_continuous_futures(df_all, nth=nths, roll_rule=roll_rule, roll_days=roll_days)
+    if not continuous_df.empty:
+        write_table(continuous_df, path, CONTINUOUS_SCHEMA)
+    return continuous_df
+
+
+def build_monthly_excess_return_panel(df_all):
+    """
+    Tidy obs_period x product_code panel of monthly fully-collateralized excess returns.
+
+    All products are reduced to month-end in a single pass and each month's return is
+    taken from the front contract held over that month (see front_contract_returns).
+
+    Parameters
+    ----------
+    df_all : pandas.DataFrame
+        Daily store as returned by load_combined_futures_data.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Columns ['obs_period', 'product_code', 'futcode', 'excess_return'], with
+        excess_return in decimal form, sorted by obs_period and product_code.
+    """
+    if df_all.empty:
+        return pd.DataFrame(columns=["obs_period", "product_code", "futcode", "excess_return"])
+
+    monthly_df = futures_series_to_monthly(df_all.dropna(subset=["settlement"]))
+    panel = front_contract_returns(monthly_df, by="product_code")
+    panel = panel[["obs_period", "product_code", "futcode", "excess_return"]]
+    return panel.sort_values(["obs_period", "product_code"]).reset_index(drop=True)
+
+
+def load_monthly_excess_returns(rebuild=False):
+    """
+    Checks if the monthly excess-return panel is cached next to df_all.parquet and is
+    at least as recent. If so, reads it; otherwise builds it and saves it as parquet.
+
+    Parameters
+    ----------
+    rebuild : bool, optional
+        Force a rebuild even if a cached file exists.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Output of build_monthly_excess_return_panel.
+    """
+    if _cache_is_fresh(RETURN_PANEL_FILE) and not rebuild:
+        panel = read_table(RETURN_PANEL_FILE)
+        if not panel.empty:
+            return panel
+
+    panel = build_monthly_excess_return_panel(load_combined_futures_data())
+    if not panel.empty:
+        write_table(panel, RETURN_PANEL_FILE, RETURN_PANEL_SCHEMA)
+    return panel
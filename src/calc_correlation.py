@@ -0,0 +1,476 @@
+""" Correlation routines working on dense month x product matrices with a validity mask,
+used by the correlation heatmaps in calc_analysis.py and create_figures.py"""
+
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from settings import config
+
+DATA_DIR = Path(config("DATA_DIR"))
+ROLLING_WINDOW = 36
+
+
+def dense_product_matrix(df, value_col="settlement", period_col="obs_period", product_col="product_code"):
+    """
+    Build a dense period x product matrix from a tidy frame, averaging duplicate cells.
+
+    Every period between the first and last observation gets a row (empty periods are
+    all-NaN), which matches pivoting and resampling to a regular calendar.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Tidy frame with a Period column, a product column and a numeric value column.
+    value_col : str, optional
+        Column holding the values (default is 'settlement').
+    period_col : str, optional
+        Period column used as the row axis (default is 'obs_period').
+    product_col : str, optional
+        Column used as the column axis (default is 'product_code').
+
+    Returns
+    -------
+    tuple of (numpy.ndarray, pandas.PeriodIndex, numpy.ndarray)
+        Values (NaN where missing), the row periods and the sorted product codes.
+    """
+    df = df[df[value_col].notna()]
+    periods = df[period_col].array
+    if len(df) == 0:
+        return np.empty((0, 0)), pd.PeriodIndex([], freq="M"), np.array([])
+
+    ordinals = periods.asi8
+    first, last = ordinals.min(), ordinals.max()
+    row = ordinals - first
+    products, col = np.unique(df[product_col].to_numpy(), return_inverse=True)
+
+    n_rows, n_cols = last - first + 1, len(products)
+    flat = row * n_cols + col
+    sums = np.bincount(flat, weights=df[value_col].to_numpy(dtype=float), minlength=n_rows * n_cols)
+    counts = np.bincount(flat, minlength=n_rows * n_cols)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        values = np.where(counts > 0, sums / counts, np.nan).reshape(n_rows, n_cols)
+
+    index = pd.period_range(start=pd.Period(ordinal=first, freq=periods.freq), periods=n_rows)
+    return values, index, products
+
+
+def _sorted_tie_runs(sorted_values):
+    """
+    For each position of row-wise sorted values, the first and last positions of its
+    run of equal values (NaNs each form their own run).
+    """
+    n_cols = sorted_values.shape[1]
+    position = np.arange(n_cols)
+    starts = np.ones(sorted_values.shape, dtype=bool)
+    starts[:, 1:] = sorted_values[:, 1:] != sorted_values[:, :-1]
+    ends = np.ones(sorted_values.shape, dtype=bool)
+    ends[:, :-1] = starts[:, 1:]
+    first = np.maximum.accumulate(np.where(starts, position, 0), axis=1)
+    last = np.minimum.accumulate(np.where(ends, position, n_cols - 1)[:, ::-1], axis=1)[:, ::-1]
+    return first, last
+
+
+def _subset_ranks(inside_sorted, first=None, last=None):
+    """
+    Ranks within a subset of positions, in sorted order (rows are series): the running
+    count of the subset, or with ties the average c + (k + 1) / 2 over a run at
+    positions first..last holding k positions of the subset after c earlier ones.
+    """
+    count = np.cumsum(inside_sorted, axis=1, dtype=np.int32)
+    if first is None:
+        return count
+    before = count - inside_sorted
+    return (np.take_along_axis(before, first, axis=1) + 1 + np.take_along_axis(count, last, axis=1)) / 2
+
+
+def _pairwise_spearman(values, mask, min_periods=1):
+    """
+    Spearman correlations with each pair ranked over the rows where both columns are
+    valid, as pandas.DataFrame.corr(method='spearman') does.
+
+    Every column is sorted once. The ranks of a column within any subset of its rows are
+    then running counts of the subset along that sort, so a pair whose coverage differs
+    is re-ranked with a cumulative sum instead of a sort, and a pair with the same
+    coverage keeps the columns' own ranks.
+    """
+    # products as rows, so each series is contiguous and gathers are flat takes
+    series, valid = np.where(mask, values, np.nan).T, mask.T
+    n_cols, n_rows = series.shape
+    offsets = (np.arange(n_cols) * n_rows)[:, None]
+    order = np.argsort(series, axis=1, kind="stable")
+    unsort = np.argsort(order, axis=1, kind="stable")
+    order_flat, unsort_flat = order + offsets, unsort + offsets
+    first, last = _sorted_tie_runs(np.take(series, order_flat))
+    tied = (first != np.arange(n_rows)).any(axis=1)
+    own_ranks = np.take(_subset_ranks(np.take(valid, order_flat), first, last), unsort_flat)
+    subset_ranks = np.empty(series.shape)
+
+    corr = np.full((n_cols, n_cols), np.nan)
+    for i in range(n_cols):
+        joint = valid[i] & valid
+        pairs = joint[i:]
+        n = pairs.sum(axis=1)
+        x, y = own_ranks[i], own_ranks[i:]
+
+        # column i ranked over each pair's rows, where the other column misses some of them
+        if (pairs != valid[i]).any():
+            runs = (first[[i]], last[[i]]) if tied[i] else ()
+            x = _subset_ranks(pairs[:, order[i]], *runs)[:, unsort[i]]
+
+        # every other column ranked over its rows that i also covers
+        if (pairs != valid[i:]).any():
+            subset_ranks[i:] = _subset_ranks(np.take(joint, order_flat[i:]))
+            ties = i + np.flatnonzero(tied[i:])
+            if len(ties):
+                subset_ranks[ties] = _subset_ranks(np.take(joint, order_flat[ties]), first[ties], last[ties])
+            y = np.take(subset_ranks, unsort_flat[i:])
+
+        # ranks of n rows average (n + 1) / 2
+        center = ((n + 1) / 2)[:, None]
+        x = (x - center) * pairs
+        y = (y - center) * pairs
+        sxx, syy = np.einsum("ij,ij->i", x, x), np.einsum("ij,ij->i", y, y)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            row = np.einsum("ij,ij->i", x, y) / np.sqrt(sxx * syy)
+        undefined = (n < max(min_periods, 2)) | (sxx <= 1e-12) | (syy <= 1e-12)
+        corr[i, i:] = corr[i:, i] = np.where(undefined, np.nan, np.clip(row, -1.0, 1.0))
+    return corr
+
+
+def pairwise_correlation(values, mask=None, method="pearson", min_periods=1):
+    """
+    Pairwise-complete correlation matrix computed with matrix products.
+
+    Each pair (i, j) only uses the rows where both columns are valid, which is the same
+    definition as pandas.DataFrame.corr, but all pairs are obtained from a handful of
+    (T x P)^T (T x P) products instead of a per-pair loop.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        T x P matrix (rows are periods, columns are products).
+    mask : numpy.ndarray of bool, optional
+        T x P validity mask. Defaults to ~isnan(values).
+    method : str, optional
+        'pearson' (default) or 'spearman'. Spearman ranks each pair over the rows where
+        both columns are valid (see _pairwise_spearman).
+    min_periods : int, optional
+        Minimum overlapping observations required for a pair (default is 1).
+
+    Returns
+    -------
+    tuple of (numpy.ndarray, numpy.ndarray)
+        P x P correlation matrix (NaN where undefined) and P x P overlap counts.
+    """
+    values = np.asarray(values, dtype=float)
+    if mask is None:
+        mask = ~np.isnan(values)
+    mask = mask & ~np.isnan(values)
+
+    if method not in ("pearson", "spearman"):
+        raise ValueError(f"Unknown correlation method {method!r}; expected 'pearson' or 'spearman'")
+
+    m = mask.astype(float)
+    if method == "spearman":
+        return _pairwise_spearman(values, mask, min_periods), (m.T @ m).astype(int)
+
+    n_valid = m.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        col_mean = np.where(n_valid > 0, np.where(mask, values, 0.0).sum(axis=0) / n_valid, 0.0)
+    # centering by the column mean keeps the sums of squares well conditioned
+    x = np.where(mask, values - col_mean, 0.0)
+
+    counts = m.T @ m
+    sum_x = x.T @ m
+    sum_xx = (x * x).T @ m
+    sum_xy = x.T @ x
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sum_xy - sum_x * sum_x.T / counts
+        var_x = sum_xx - sum_x ** 2 / counts
+        corr = cov / np.sqrt(var_x * var_x.T)
+
+    tiny = 1e-12 * np.maximum(np.abs(sum_xx), 1.0)
+    undefined = (counts < max(min_periods, 2)) | (var_x <= tiny) | (var_x.T <= tiny.T)
+    corr = np.clip(corr, -1.0, 1.0)
+    corr[undefined] = np.nan
+    return corr, counts.astype(int)
+
+
+def correlation_frame(df, value_col="settlement", method="pearson", min_periods=1,
+                      period_col="obs_period", product_col="product_code"):
+    """
+    Pairwise-complete correlations between products of a tidy frame.
+
+    Works for settlement levels (monthly_df with value_col='settlement') as well as
+    returns (the monthly excess-return panel with value_col='excess_return').
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Tidy frame with period, product and value columns.
+    value_col : str, optional
+        Column to correlate (default is 'settlement').
+    method : str, optional
+        'pearson' (default) or 'spearman'.
+    min_periods : int, optional
+        Minimum overlapping observations required for a pair (default is 1).
+    period_col, product_col : str, optional
+        Names of the period and product columns.
+
+    Returns
+    -------
+    tuple of (pandas.DataFrame, pandas.DataFrame)
+        Correlation matrix and overlap counts, both indexed by product code.
+    """
+    values, _, products = dense_product_matrix(df, value_col, period_col, product_col)
+    corr, counts = pairwise_correlation(values, method=method, min_periods=min_periods)
+    corr_df = pd.DataFrame(corr, index=products, columns=products)
+    counts_df = pd.DataFrame(counts, index=products, columns=products)
+    return corr_df, counts_df
+
+
+def rolling_correlation(values, window=36, mask=None, min_periods=None, dtype=np.float32, packed=False):
+    """
+    Rolling-window pairwise-complete Pearson correlation tensor.
+
+    The window is maintained with running sums of x, x^2, xy and pair counts: each step
+    adds the entering row and subtracts the leaving one (outer products, O(P^2)), instead
+    of recomputing the whole window.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        T x P matrix (rows are periods, columns are products).
+    window : int, optional
+        Window length in periods (default is 36).
+    mask : numpy.ndarray of bool, optional
+        T x P validity mask. Defaults to ~isnan(values).
+    min_periods : int, optional
+        Minimum overlapping observations in the window for a pair (default is window).
+    dtype : numpy dtype, optional
+        Storage type of the returned tensor (default is float32).
+    packed : bool, optional
+        Keep only the upper triangle of each symmetric slice, diagonal included (see
+        unpack_correlation); half the memory of the full tensor (default is False).
+
+    Returns
+    -------
+    numpy.ndarray
+        T x P x P tensor; slice t holds the correlations of the window ending at t.
+        Packed, T x P(P+1)/2 in numpy.triu_indices(P) order.
+    """
+    values = np.asarray(values, dtype=float)
+    if mask is None:
+        mask = ~np.isnan(values)
+    mask = mask & ~np.isnan(values)
+    if min_periods is None:
+        min_periods = window
+
+    n_periods, n_products = values.shape
+    n_valid = mask.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        col_mean = np.where(n_valid > 0, np.where(mask, values, 0.0).sum(axis=0) / n_valid, 0.0)
+    x = np.where(mask, values - col_mean, 0.0)
+    m = mask.astype(float)
+
+    counts = np.zeros((n_products, n_products))
+    sum_x = np.zeros((n_products, n_products))
+    sum_xx = np.zeros((n_products, n_products))
+    sum_xy = np.zeros((n_products, n_products))
+    upper = np.triu_indices(n_products)
+    shape = (n_periods, len(upper[0])) if packed else (n_periods, n_products, n_products)
+    out = np.full(shape, np.nan, dtype=dtype)
+
+    for t in range(n_periods):
+        counts += np.outer(m[t], m[t])
+        sum_x += np.outer(x[t], m[t])
+        sum_xx += np.outer(x[t] ** 2, m[t])
+        sum_xy += np.outer(x[t], x[t])
+        if t >= window:
+            old = t - window
+            counts -= np.outer(m[old], m[old])
+            sum_x -= np.outer(x[old], m[old])
+            sum_xx -= np.outer(x[old] ** 2, m[old])
+            sum_xy -= np.outer(x[old], x[old])
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = sum_xy - sum_x * sum_x.T / counts
+            var_x = sum_xx - sum_x ** 2 / counts
+            corr = cov / np.sqrt(var_x * var_x.T)
+        tiny = 1e-9 * np.maximum(np.abs(sum_xx), 1.0)
+        undefined = (np.rint(counts) < max(min_periods, 2)) | (var_x <= tiny) | (var_x.T <= tiny.T)
+        corr = np.clip(corr, -1.0, 1.0)
+        corr[undefined] = np.nan
+        out[t] = corr[upper] if packed else corr
+    return out
+
+
+def unpack_correlation(packed, n_products):
+    """
+    Full T x P x P tensor from the packed upper triangles of rolling_correlation.
+
+    Examples
+    --------
+    >>> unpack_correlation(np.array([[1.0, 0.5, 1.0]]), 2)[0]
+    array([[1. , 0.5],
+           [0.5, 1. ]])
+    """
+    rows, cols = np.triu_indices(n_products)
+    tensor = np.empty((packed.shape[0], n_products, n_products), dtype=packed.dtype)
+    tensor[:, rows, cols] = packed
+    tensor[:, cols, rows] = packed
+    return tensor
+
+
+def rolling_correlation_frame(df, window=36, value_col="settlement", min_periods=None,
+                              period_col="obs_period", product_col="product_code", packed=False):
+    """
+    Rolling correlation tensor for a tidy frame (settlement levels or returns).
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Tidy frame with period, product and value columns.
+    window : int, optional
+        Window length in periods (default is 36).
+    value_col : str, optional
+        Column to correlate (default is 'settlement').
+    min_periods : int, optional
+        Minimum overlapping observations in the window for a pair (default is window).
+    period_col, product_col : str, optional
+        Names of the period and product columns.
+    packed : bool, optional
+        Return the packed upper triangles (see rolling_correlation).
+
+    Returns
+    -------
+    tuple of (numpy.ndarray, pandas.PeriodIndex, numpy.ndarray)
+        T x P x P tensor (or its packed form), the window end periods and the product codes.
+    """
+    values, index, products = dense_product_matrix(df, value_col, period_col, product_col)
+    tensor = rolling_correlation(values, window=window, min_periods=min_periods, packed=packed)
+    return tensor, index, products
+
+
+def rolling_correlation_file(window=ROLLING_WINDOW):
+    """
+    Location of the saved rolling correlation tensor of monthly excess returns.
+    """
+    return DATA_DIR / f"rolling_correlation_{window}.npz"
+
+
+def save_rolling_return_correlation(panel, window=ROLLING_WINDOW, min_periods=None, path=None):
+    """
+    Rolling correlation tensor of a monthly excess-return panel, saved for the figures.
+
+    Parameters
+    ----------
+    panel : pandas.DataFrame
+        Tidy panel from load_monthly_excess_returns.
+    window : int, optional
+        Window length in months (default is ROLLING_WINDOW).
+    min_periods : int, optional
+        Minimum overlapping months in the window for a pair (default is window).
+    path : pathlib.Path, optional
+        Target file (default is rolling_correlation_file(window)).
+
+    Returns
+    -------
+    pathlib.Path
+        The written file.
+    """
+    tensor, index, products = rolling_correlation_frame(panel, window=window, value_col="excess_return",
+                                                        min_periods=min_periods, packed=True)
+    return save_rolling_correlation(tensor, index, products, path=path, window=window)
+
+
+def load_rolling_return_correlation(window=ROLLING_WINDOW, rebuild=False, packed=False):
+    """
+    Checks if the saved rolling correlation tensor of the monthly excess returns is at
+    least as recent as the return panel and the daily store. If so, reads it; otherwise
+    rebuilds it (refreshing the panel if needed) and saves it.
+
+    Parameters
+    ----------
+    window : int, optional
+        Window length in months (default is ROLLING_WINDOW).
+    rebuild : bool, optional
+        Force a rebuild even if a saved tensor exists.
+    packed : bool, optional
+        Return the packed upper triangles (see load_rolling_correlation).
+
+    Returns
+    -------
+    tuple of (numpy.ndarray, pandas.PeriodIndex, numpy.ndarray)
+        As load_rolling_correlation.
+    """
+    from calc_continuous_futures import DATA_FILE, RETURN_PANEL_FILE, load_monthly_excess_returns
+
+    path = rolling_correlation_file(window)
+    inputs = [f.stat().st_mtime for f in (DATA_FILE, RETURN_PANEL_FILE) if f.exists()]
+    if rebuild or not path.exists() or path.stat().st_mtime < max(inputs, default=0.0):
+        save_rolling_return_correlation(load_monthly_excess_returns(), window=window)
+    return load_rolling_correlation(path, packed=packed)
+
+
+def save_rolling_correlation(tensor, index, products, path=None, window=None):
+    """
+    Save a rolling correlation tensor with its axes as a compressed .npz file. Only
+    the upper triangle of each symmetric slice is stored.
+
+    Parameters
+    ----------
+    tensor : numpy.ndarray
+        T x P x P tensor from rolling_correlation, or its packed form.
+    index : pandas.PeriodIndex
+        Window end periods.
+    products : numpy.ndarray
+        Product codes labelling both product axes.
+    path : pathlib.Path, optional
+        Target file (default is rolling_correlation_file(window)).
+    window : int, optional
+        Window length, stored as metadata and used in the default file name.
+
+    Returns
+    -------
+    pathlib.Path
+        The written file.
+    """
+    if path is None:
+        path = rolling_correlation_file(window)
+    if tensor.ndim == 3:
+        tensor = tensor[(slice(None),) + np.triu_indices(tensor.shape[1])]
+    np.savez_compressed(
+        path,
+        corr_upper=tensor,
+        periods=index.astype(str).to_numpy(dtype=str),
+        freq=np.array(index.freqstr),
+        products=np.asarray(products),
+        window=np.array(-1 if window is None else window),
+    )
+    return Path(path)
+
+
+def load_rolling_correlation(path, packed=False):
+    """
+    Load a tensor written by save_rolling_correlation.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        File written by save_rolling_correlation.
+    packed : bool, optional
+        Return the stored upper triangles, T x P(P+1)/2 in numpy.triu_indices(P) order,
+        instead of the full tensor (default is False).
+
+    Returns
+    -------
+    tuple of (numpy.ndarray, pandas.PeriodIndex, numpy.ndarray)
+        T x P x P tensor (or its packed form), the window end periods and the product codes.
+    """
+    with np.load(path) as stored:
+        index = pd.PeriodIndex(stored["periods"], freq=str(stored["freq"]))
+        products = stored["products"]
+        tensor = stored["corr_upper"]
+    return (tensor if packed else unpack_correlation(tensor, len(products))), index, products
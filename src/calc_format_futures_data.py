@@ -1,43 +1,36 @@
 from pull_futures_data import *
+from columnar_store import write_table, read_table, arrow_schema
+from instrumentation import timed, timer
+from product_registry import product_codes, get_product, product_by_wrds_name
 
 """All of the functions below are associated with the assembly of data towards replciating
 the commodity table by Fan Yang"""
 
-sector_map = {
-    3160: "Agriculture",
-    289:  "Agriculture",
-    3161: "Agriculture",
-    1980: "Agriculture",
-    2038: "Agriculture",
-    3247: "Agriculture",
-    1992: "Agriculture",
-    361:  "Agriculture",
-    385:  "Agriculture",
-    2036: "Agriculture",
-    379:  "Agriculture",
-    3256: "Agriculture",
-    396:  "Agriculture",
-    430:  "Agriculture",
-    1986: "Energy",
-    2091: "Energy",
-    2029: "Energy",
-    2060: "Energy",
-    3847: "Energy",   
-    2032: "Energy",   
-    3250: "Livestock",
-    2676: "Livestock",
-    2675: "Livestock",
-    3126: "Metals",
-    2087: "Metals",   
-    2026: "Metals",   
-    2020: "Metals",   
-    2065: "Metals",   
-    2074: "Metals",   
-    2108: "Metals"    
-}
+PERIODS_PER_YEAR = {"B": 252, "D": 252, "W": 52, "M": 12, "Q": 4, "A": 1, "Y": 1}
+
+
+def periods_per_year(freq="M"):
+    """
+    Number of sampling periods in one year for a pandas period frequency.
+
+    Parameters
+    ----------
+    freq : str, optional
+        Pandas period alias such as 'W', 'W-FRI', 'M' (default) or 'Q'.
+
+    Returns
+    -------
+    int
+        Annualization factor (e.g. 52 for weekly, 12 for monthly).
+    """
+    key = str(freq).upper()[:1]
+    if key not in PERIODS_PER_YEAR:
+        raise ValueError(f"Unsupported sampling frequency: {freq}")
+    return PERIODS_PER_YEAR[key]
 
 
-def futures_series_to_monthly(df):
+@timed()
+def futures_series_to_monthly(df, freq="M"):
     """
     Convert a daily futures DataFrame into a monthly frequency by taking
     the last available daily row for each (futcode, month). Also parses
@@ -47,20 +40,34 @@ def futures_series_to_monthly(df):
     ----------
     df : pandas.DataFrame
         Must contain columns ['futcode', 'date_', 'contrdate', 'settlement'].
+    freq : str, optional
+        Pandas period alias used for sampling: 'W' (weekly), 'M' (default, month-end)
+        or 'Q' (quarter-end).
 
     Returns
     -------
     pandas.DataFrame
         Monthly data with columns ['futcode', 'contr_period', 'obs_period', 'settlement'].
-        Each row corresponds to the last daily entry in that month for the given futcode.
+        Each row corresponds to the last daily entry in that period for the given futcode.
+        Other frequencies also keep 'obs_month', the calendar month of that entry, from
+        which maturities are measured (a week's last quote may fall before the month
+        the week ends in).
     """
 
-    
     df = df.sort_values(["futcode", "date_"])
-    monthly_df = df.groupby(["futcode", df["date_"].dt.to_period("M")]).tail(1).copy()
+    periods = df["date_"].dt.to_period(freq)
 
-    monthly_df["contr_period"] = monthly_df["contrdate"].apply(parse_contrdate)
-    monthly_df["obs_period"]   = monthly_df["date_"].dt.to_period("M")
+    # rows are sorted, so the last row of each (futcode, period) is the one whose successor differs
+    is_last = (
+        df["futcode"].ne(df["futcode"].shift(-1)).to_numpy()
+        | periods.ne(periods.shift(-1)).to_numpy()
+    )
+    monthly_df = df[is_last].copy()
+
+    monthly_df["contr_period"] = parse_contrdates(monthly_df["contrdate"])
+    monthly_df["obs_period"]   = periods[is_last]
+    if freq != "M":
+        monthly_df["obs_month"] = monthly_df["date_"].dt.to_period("M")
 
     monthly_df = monthly_df.drop(columns=["date_", "contrdate"])
     monthly_df = monthly_df.sort_values(by=["obs_period","contr_period"])
@@ -87,6 +94,47 @@ def parse_contrdate(c):
     year = (2000 + yy) if yy < 50 else (1900 + yy)
     return pd.Period(freq='M', year=year, month=mm)
 
+@timed()
+def parse_contrdates(contrdates):
+    """
+    Vectorized version of parse_contrdate for a whole column of contract dates.
+
+    Only the distinct strings are parsed, then broadcast back to every row.
+
+    Parameters
+    ----------
+    contrdates : pandas.Series
+        Contract dates in the format 'MMYY' or 'MM/YY'.
+
+    Returns
+    -------
+    pandas.Series
+        Monthly Period series aligned with the input index.
+    """
+    codes, uniques = pd.factorize(contrdates.astype(str).str.replace("/", "", regex=False))
+    mm = np.array([int(c[:2]) for c in uniques], dtype=int)
+    yy = np.array([int(c[2:]) for c in uniques], dtype=int)
+    year = np.where(yy < 50, 2000 + yy, 1900 + yy)
+    parsed = pd.PeriodIndex.from_fields(year=year, month=mm, freq="M")
+    return pd.Series(parsed.take(codes), index=contrdates.index)
+
+def _maturity_months(monthly_df):
+    """
+    Months between each row's observation month and its contract month.
+
+    Observation periods coarser or finer than a month (weekly, quarterly) use the
+    month of the row's last quote ('obs_month'), or the month the period ends in
+    when that column is absent.
+    """
+    if "obs_month" in monthly_df:
+        obs_month = monthly_df["obs_month"]
+    else:
+        obs_month = monthly_df["obs_period"].dt.asfreq("M")
+    contr = monthly_df["contr_period"]
+    maturity = (contr.dt.year - obs_month.dt.year) * 12 + (contr.dt.month - obs_month.dt.month)
+    return maturity.rename("maturity")
+
+@timed()
 def extract_first_through_12th_contracts(monthly_df):
     """
     Constructs a wide DataFrame of monthly settlement prices for the 1st through 12th contracts.
@@ -106,20 +154,69 @@ def extract_first_through_12th_contracts(monthly_df):
         Each cell contains that month's settlement price if available, else NaN.
     """
 
-    temp = monthly_df.set_index(["obs_period", "contr_period"])["settlement"]
-
-    first_through_12th_contracts_df = pd.DataFrame(index=monthly_df['obs_period'].unique())
+    maturity = _maturity_months(monthly_df)
+    in_range = maturity.between(1, 12)
 
-    for i in range(1, 13):
-        first_through_12th_contracts_df[f"{i}mth_settlement"] = first_through_12th_contracts_df.index.to_series().apply(
-            lambda op: temp.get((op, op + i), float("nan"))  # or np.nan
-        )
+    first_through_12th_contracts_df = (
+        monthly_df.loc[in_range]
+        .groupby(["obs_period", maturity[in_range]])["settlement"]
+        .last()
+        .unstack()
+        .reindex(index=monthly_df["obs_period"].unique(), columns=range(1, 13))
+    )
+    first_through_12th_contracts_df.columns = [f"{i}mth_settlement" for i in range(1, 13)]
+    first_through_12th_contracts_df.index.name = None
 
     return first_through_12th_contracts_df
 
 
+@timed()
+def front_contract_returns(monthly_df, by=None):
+    """
+    Period-over-period excess returns from holding the front (nearest) contract.
 
-def compute_futures_stats(first_through_12th_contracts_df, monthly_df):
+    For each obs_period t, the held contract is the nearest one (maturity >= 1 at t-1)
+    that is observed in both t-1 and t and still trades after t, so the return never
+    spans a roll and covers the whole period: a contract expiring during t would only
+    contribute the part of t before its last trading day, which biases annualized
+    figures towards the coarser frequencies.
+
+    Parameters
+    ----------
+    monthly_df : pandas.DataFrame
+        Output of futures_series_to_monthly (any sampling frequency).
+    by : str, optional
+        Extra grouping column (e.g. 'product_code') when several products are stacked.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Columns [by,] 'obs_period', 'futcode', 'excess_return' (decimal, not %).
+    """
+    keys = [by] if by else []
+    df = monthly_df.assign(maturity=_maturity_months(monthly_df))
+    df = df.sort_values(["futcode", "obs_period"], kind="stable")
+
+    grouped = df.groupby("futcode", sort=False)
+    prev_obs = grouped["obs_period"].shift()
+    df["prev_maturity"] = grouped["maturity"].shift()
+    df["excess_return"] = df["settlement"] / grouped["settlement"].shift() - 1
+
+    # a contract's last period is cut short by its expiry, unless the sample ends there
+    last_period = df.groupby(keys)["obs_period"].transform("max") if keys else df["obs_period"].max()
+    expires = grouped["obs_period"].shift(-1).isna() & (df["obs_period"] < last_period)
+
+    held = df[(prev_obs == df["obs_period"] - 1) & (df["prev_maturity"] >= 1) & ~expires]
+    held = (
+        held.sort_values(keys + ["obs_period", "prev_maturity"], kind="stable")
+        .drop_duplicates(subset=keys + ["obs_period"])
+    )
+    return held[keys + ["obs_period", "futcode", "excess_return"]].reset_index(drop=True)
+
+
+
+@timed()
+def compute_futures_stats(first_through_12th_contracts_df, monthly_df, freq="M", maturities=(1, 12), basis="span"):
     """
     Compute basis, frequency of backwardation, and basic returns stats.
 
@@ -129,6 +226,16 @@ def compute_futures_stats(first_through_12th_contracts_df, monthly_df):
         Wide DataFrame of monthly settlement prices with columns like "1mth_settlement" ... "12mth_settlement".
     monthly_df : pandas.DataFrame
         Monthly-level data used to compute excess returns.
+    freq : str, optional
+        Sampling frequency of monthly_df ('W', 'M' (default) or 'Q'), used to annualize
+        the front-contract return statistics.
+    maturities : tuple of (int, int), optional
+        Nearest and farthest contract maturity in months (within 1-12) the basis is
+        measured between (default is (1, 12)).
+    basis : str, optional
+        'span' (default): between the nearest and the farthest contract observed within
+        maturities, as in the paper; 'fixed': between exactly those two maturities,
+        skipping months where either is missing.
 
     Returns
     -------
@@ -140,53 +247,78 @@ def compute_futures_stats(first_through_12th_contracts_df, monthly_df):
             'excess_return_mean' : float (annual excess return)
             'excess_return_std' : float (std dev of annual excess return)
             'sharpe_ratio' : float (risk-adjusted return measure)
+            'excess_return_ann_mean' : float (annualized mean front-contract return, in %)
+            'excess_return_ann_std' : float (annualized std of front-contract return, in %)
+            'sharpe_ratio_ann' : float (annualized front-contract Sharpe ratio)
     """
 
-    basis_df = pd.DataFrame(index=first_through_12th_contracts_df.index)
-    first_through_12th_contracts_df['T1'] = first_through_12th_contracts_df.apply(
-        lambda row: next((i for i in range(1, 13) if not pd.isna(row[f"{i}mth_settlement"])), np.nan),
-        axis=1
-    )
-    first_through_12th_contracts_df['T2'] = first_through_12th_contracts_df.apply(
-        lambda row: next((i for i in range(12, 0, -1) if not pd.isna(row[f"{i}mth_settlement"])), np.nan),
-        axis=1
-    )
-    basis_df['T1'] = first_through_12th_contracts_df['T1']
-    basis_df['T2'] = first_through_12th_contracts_df['T2']
-    basis_df['month_diff'] = basis_df['T2'] - basis_df['T1']
-
-    basis_df['settlement_T1'] = first_through_12th_contracts_df.apply(
-        lambda row: row[f"{int(row['T1'])}mth_settlement"] if not pd.isna(row['T1']) else np.nan,
-        axis=1
-    )
-    basis_df['settlement_T2'] = first_through_12th_contracts_df.apply(
-        lambda row: row[f"{int(row['T2'])}mth_settlement"] if not pd.isna(row['T1']) else np.nan,
-        axis=1
-    )
-
-    basis_df['basis'] = (np.log(basis_df['settlement_T1']) - np.log(basis_df['settlement_T2'])) / basis_df['month_diff'] * 100
-    basis_df = basis_df.dropna()
+    with timer("compute_futures_stats.basis"):
+        near, far = maturities
+        if not 1 <= near < far <= 12:
+            raise ValueError(f"Basis maturities must satisfy 1 <= near < far <= 12, got {maturities}")
+        settlements = first_through_12th_contracts_df[
+            [f"{i}mth_settlement" for i in range(near, far + 1)]
+        ].to_numpy(dtype=float)
+        valid = ~np.isnan(settlements)
+        rows = np.arange(len(settlements))
+        if basis == "span":
+            has_any = valid.any(axis=1)
+            first_idx = valid.argmax(axis=1)
+            last_idx = valid.shape[1] - 1 - valid[:, ::-1].argmax(axis=1)
+        elif basis == "fixed":
+            has_any = valid[:, 0] & valid[:, -1]
+            first_idx = np.zeros(len(settlements), dtype=int)
+            last_idx = np.full(len(settlements), far - near)
+        else:
+            raise ValueError(f"Unknown basis definition: {basis}")
+
+        first_through_12th_contracts_df['T1'] = np.where(has_any, first_idx + near, np.nan)
+        first_through_12th_contracts_df['T2'] = np.where(has_any, last_idx + near, np.nan)
+
+        basis_df = pd.DataFrame(index=first_through_12th_contracts_df.index)
+        basis_df['T1'] = first_through_12th_contracts_df['T1']
+        basis_df['T2'] = first_through_12th_contracts_df['T2']
+        basis_df['month_diff'] = basis_df['T2'] - basis_df['T1']
+
+        basis_df['settlement_T1'] = np.where(has_any, settlements[rows, first_idx], np.nan)
+        basis_df['settlement_T2'] = np.where(has_any, settlements[rows, last_idx], np.nan)
+
+        basis_df['basis'] = (np.log(basis_df['settlement_T1']) - np.log(basis_df['settlement_T2'])) / basis_df['month_diff'] * 100
+        basis_df = basis_df.dropna()
+
+        freq_bw = (basis_df["basis"] > 0).mean() * 100
+        n_valid = len(basis_df)
+
+    with timer("compute_futures_stats.returns"):
+        ordered = monthly_df.sort_values(by="obs_period", kind="stable")
+        first_settlement = ordered.drop_duplicates("futcode", keep="first").set_index("futcode")["settlement"]
+        last_settlement = ordered.drop_duplicates("futcode", keep="last").set_index("futcode")["settlement"]
+        excess_return_df = ((last_settlement / first_settlement - 1) * 100).reset_index(name="excess_return")
+
+        er_mean = excess_return_df["excess_return"].mean()
+        er_std = excess_return_df["excess_return"].std()
 
-    freq_bw = (basis_df["basis"] > 0).mean() * 100
-    n_valid = len(basis_df)
-    
-    excess_return_df = monthly_df.groupby("futcode").apply(
-        lambda x: (x.sort_values(by="obs_period").iloc[-1]["settlement"] / x.sort_values(by="obs_period").iloc[0]["settlement"] - 1) * 100
-    ).reset_index(name="excess_return")
-
-    er_mean = excess_return_df["excess_return"].mean()
-    er_std = excess_return_df["excess_return"].std()
     sharpe = 100 * er_mean / er_std if er_std != 0 else np.nan
+
+    # per-period front-contract returns, annualized for the sampling frequency
+    n_periods = periods_per_year(freq)
+    front_returns = front_contract_returns(monthly_df)["excess_return"]
+    ann_mean = front_returns.mean() * n_periods * 100
+    ann_std = front_returns.std() * np.sqrt(n_periods) * 100
+    sharpe_ann = ann_mean / ann_std if ann_std != 0 else np.nan
     return {
         "N": n_valid,
         "mean_basis": basis_df["basis"].mean(),
         "freq_bw": freq_bw,
         "excess_return_mean": er_mean,
         "excess_return_std": er_std,
-        "sharpe_ratio": sharpe
+        "sharpe_ratio": sharpe,
+        "excess_return_ann_mean": ann_mean,
+        "excess_return_ann_std": ann_std,
+        "sharpe_ratio_ann": sharpe_ann
     }
 
-def process_single_product(product_contract_code, time_period='paper'):
+def process_single_product(product_contract_code, time_period='paper', freq="M", start=None, end=None):
     """
     Compute stats for a single product code.
 
@@ -199,6 +331,10 @@ def process_single_product(product_contract_code, time_period='paper'):
         Commodity's contract code.
     time_period : str, optional
         'paper' (default) or 'current' date range.
+    freq : str, optional
+        Sampling frequency passed to futures_series_to_monthly ('W', 'M' (default) or 'Q').
+    start, end : str or Timestamp, optional
+        Override the first and last date of the time period.
 
     Returns
     -------
@@ -207,21 +343,49 @@ def process_single_product(product_contract_code, time_period='paper'):
         Returns None if no valid data is found.
     """
 
-    info_df = fetch_wrds_contract_info(product_contract_code, time_period)
+    info_df = fetch_wrds_contract_info(product_contract_code, time_period, start, end)
     if info_df.empty:
         return None
     futcodes_contrdates = info_df.set_index("futcode")["contrdate"].to_dict()
-    data_contracts = fetch_wrds_fut_contract(futcodes_contrdates, time_period)
+    data_contracts = fetch_wrds_fut_contract(futcodes_contrdates, time_period, product_contract_code, start, end)
     if data_contracts.empty:
         return None
     
-    monthly_df = futures_series_to_monthly(data_contracts)
+    commodity_name = info_df["contrname"].unique()[0]
+    contract_code = info_df["contrcode"].unique()[0]
+    return summarize_product_data(data_contracts, commodity_name, contract_code, freq=freq)
+
+
+@timed()
+def summarize_product_data(data_contracts, commodity_name, contract_code, freq="M", maturities=(1, 12),
+                           basis="span"):
+    """
+    Table 1 statistics of one product from its daily contract data.
+
+    Parameters
+    ----------
+    data_contracts : pandas.DataFrame
+        Daily rows of the product's contracts (as from fetch_wrds_fut_contract).
+    commodity_name : str
+        WRDS contract name.
+    contract_code : int
+        Commodity's contract code.
+    freq : str, optional
+        Sampling frequency passed to futures_series_to_monthly ('W', 'M' (default) or 'Q').
+    maturities, basis : optional
+        Basis definition, as in compute_futures_stats.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Single-row DataFrame of calculated stats, as returned by process_single_product.
+    """
+    monthly_df = futures_series_to_monthly(data_contracts, freq=freq)
     first_through_12th_contracts_df = extract_first_through_12th_contracts(monthly_df)
 
-    stats = compute_futures_stats(first_through_12th_contracts_df, monthly_df)
+    stats = compute_futures_stats(first_through_12th_contracts_df, monthly_df, freq=freq,
+                                  maturities=maturities, basis=basis)
     
-    commodity_name = info_df["contrname"].unique()[0]
-    contract_code = info_df["contrcode"].unique()[0]
     return pd.DataFrame({
         "Commodity": [commodity_name],
         "Contract Code": [contract_code],
@@ -230,41 +394,39 @@ def process_single_product(product_contract_code, time_period='paper'):
         "Freq. of Backwardation (%)": [stats["freq_bw"]],
         "E(Re) (Mean Annual Excess Return)": [stats["excess_return_mean"]],
         "σ(Re) (Std Dev of Excess Return)": [stats["excess_return_std"]],
-        "Sharpe Ratio": [stats["sharpe_ratio"]]
+        "Sharpe Ratio": [stats["sharpe_ratio"]],
+        "E(Re) Annualized (%)": [stats["excess_return_ann_mean"]],
+        "σ(Re) Annualized (%)": [stats["excess_return_ann_std"]],
+        "Sharpe Ratio Annualized": [stats["sharpe_ratio_ann"]]
     })
 
-DISPLAY_NAME_MAP = {
-    "WESTERN BARLEY": ("Barley", "WA"),
-    "BUTTER (CASH)": ("Butter", "02"),
-    "CANOLA": ("Canola", "WC"),
-    "COCOA": ("Cocoa", "CC"),
-    "COFFEE 'C'": ("Coffee", "KC"),
-    "CORN": ("Corn", "C-"),
-    "COTTON #2": ("Cotton", "CT"),
-    "LUMBER": ("Lumber", "LB"),
-    "OATS": ("Oats", "O-"),
-    "ORANGE JUICE (FCOJ-A)": ("Orange juice", "JO"),
-    "RICE (ROUGH)": ("Rough rice", "RR"),
-    "SOYBEAN MEAL": ("Soybean meal", "SM"),
-    "SOYBEANS": ("Soybeans", "S-"),
-    "WHEAT": ("Wheat", "W-"),
-    "CRUDE OIL (LIGHT SWEET)": ("Crude oil", "CL"),
-    "GASOLINE RBOB": ("Gasoline", "RB"),
-    "HEATING OIL (NEW YORK)": ("Heating oil", "HO"),
-    "Mont Belvieu LDH Propane (OPIS) Swap Pit":("Propane", "PN"),
-    "NATURAL GAS": ("Natural gas", "NG"),
-    "FEEDER CATTLE COMP.": ("Feeder cattle", "FC"),
-    "LEAN HOGS COMP.": ("Lean hogs", "LH"),
-    "LIVE CATTLE COMP.": ("Live cattle", "LC"),
-    "GASOLINE UNLEADED (NEW YORK)": ("Unleaded gas", "HU"), 
-    "ALUMINIUM": ("Aluminum", "AL"),
-    "COAL": ("Coal", "CO"),  
-    "COPPER (HIGH GRADE)": ("Copper", "HG"),
-    "GOLD (100 OZ)": ("Gold", "GC"),
-    "PALLADIUM": ("Palladium", "PA"),
-    "PLATINUM": ("Platinum", "PL"),
-    "SILVER (5000 OZ)": ("Silver", "SI")
-}
+
+def product_summary_file(product_contract_code, time_period="paper"):
+    """
+    Location of one product's Table 1 row for a time period.
+    """
+    return PRODUCT_DIR / f"summary_{time_period}_{product_contract_code}.parquet"
+
+
+def summarize_product_file(product_contract_code, time_period="paper", freq="M"):
+    """
+    Compute one product's Table 1 row from its pulled artifact (see pull_product_to_file)
+    and save it as its own parquet file (empty if the product has no data).
+
+    Returns
+    -------
+    None
+        Writes product_summary_file(product_contract_code, time_period).
+    """
+    data_contracts = read_table(product_data_file(product_contract_code, time_period))
+    if data_contracts.empty:
+        row = pd.DataFrame()
+    else:
+        row = summarize_product_data(
+            data_contracts, data_contracts["contrname"].iloc[0], product_contract_code, freq=freq
+        )
+    write_table(row, product_summary_file(product_contract_code, time_period))
+
 
 format_dict = {
     "Basis": "{:.2f}",
@@ -275,26 +437,99 @@ format_dict = {
 }
 
 
-def main_summary(time_period="paper"):
+def main_summary(time_period="paper", freq="M", start=None, end=None):
     """
     A function for mapping and formatting the desired table results, as close as possible
     to the paper.
 
+    The daily rows of the window are sliced out of the local store (see
+    load_futures_window), so only a missing store is pulled from WRDS.
+
     Parameters
     ----------
     time_period : str, optional
-        'paper' (default) or 'current' for the date coverage.
+        'paper' (default) or 'current' for the date coverage and the products included;
+        None for every product, with start and end on one side of the paper/current
+        boundary (see check_store_window).
+    freq : str, optional
+        Sampling frequency for the settlement series ('W', 'M' (default) or 'Q').
+    start, end : str or Timestamp, optional
+        Override the first and last date of the time period (e.g. start='1990-01-01',
+        end='2000-12-31').
 
     Returns
     -------
     pandas.DataFrame
         Summary table for multiple commodities, containing stats like Basis, Freq. of bw., E[Re], σ[Re], Sharpe ratio.
     """
-    product_list = [
-        3160, 289, 3161, 1980, 2038, 3247, 1992, 361, 385, 2036,
-        379, 3256, 396, 430, 1986, 2091, 2029, 2060, 3847, 2032,
-        3250, 2676, 2675, 3126, 2087, 2026, 2020, 2065, 2074, 2108
-    ]
+    start, end = resolve_window(time_period, start, end)
+    return window_summary(start, end, freq=freq, time_period=time_period)
+
+
+def window_summary(start=None, end=None, freq="M", product_list=None, time_period=None, df_all=None,
+                   maturities=(1, 12), basis="span"):
+    """
+    Table 1 for any date window from the local daily store.
+
+    Parameters
+    ----------
+    start, end : str or Timestamp, optional
+        First and last date of the window (default is open-ended). As in the WRDS
+        pulls, only contracts that start and expire inside the window are used, so the
+        window must lie on one side of the paper/current boundary (see
+        check_store_window).
+    freq : str, optional
+        Sampling frequency for the settlement series ('W', 'M' (default) or 'Q').
+    product_list : list of int, optional
+        Products to include (default is the registry's products for time_period).
+    time_period : str, optional
+        Period the window stands for, if any (see assemble_summary).
+    df_all : pandas.DataFrame, optional
+        Daily store already in memory to slice the window from, so many windows (e.g.
+        rolling decades) share one read; default is to read the window from disk.
+    maturities, basis : optional
+        Basis definition, as in compute_futures_stats.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Summary table, as returned by assemble_summary.
+    """
+    if product_list is None:
+        product_list = product_codes(time_period)
+    if df_all is None:
+        window = load_futures_window(start, end, product_list)
+    else:
+        window = slice_futures_window(df_all, start, end, product_list)
+    by_product = dict(tuple(window.groupby("product_code", sort=False)))
+    rows = {}
+    for code in product_list:
+        if code not in by_product:
+            rows[code] = None
+            continue
+        product = get_product(code)
+        commodity_name = product["wrds_name"] if product else str(code)
+        rows[code] = summarize_product_data(by_product[code], commodity_name, code, freq=freq,
+                                            maturities=maturities, basis=basis)
+    return assemble_summary(rows, time_period)
+
+
+def assemble_summary(rows, time_period="paper"):
+    """
+    Stack per-product Table 1 rows into the summary table returned by main_summary.
+
+    Parameters
+    ----------
+    rows : dict
+        Product code -> single-row DataFrame (None or empty if the product has no data).
+    time_period : str, optional
+        'paper' (default), 'current' or None for a window that is neither.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Summary table with Sector attached and display column names.
+    """
     summary_table = pd.DataFrame(columns=[
         "Commodity",
         "Contract Code",
@@ -303,12 +538,16 @@ def main_summary(time_period="paper"):
         "Freq. of Backwardation (%)",
         "E(Re) (Mean Annual Excess Return)",
         "σ(Re) (Std Dev of Excess Return)",
-        "Sharpe Ratio"
+        "Sharpe Ratio",
+        "E(Re) Annualized (%)",
+        "σ(Re) Annualized (%)",
+        "Sharpe Ratio Annualized"
     ])
-    for code in product_list:
-        row = process_single_product(code, time_period)
-        if row is not None:
-            row["Sector"] = sector_map.get(code, "")
+    for code, row in rows.items():
+        if row is not None and not row.empty:
+            row = row.copy()
+            product = get_product(code)
+            row["Sector"] = product["sector"] if product else ""
             summary_table = pd.concat([summary_table, row], ignore_index=True)
     if time_period == "current":
         summary_table = summary_table[~(
@@ -319,10 +558,113 @@ def main_summary(time_period="paper"):
         "Freq. of Backwardation (%)": "Freq. of bw.",
         "E(Re) (Mean Annual Excess Return)": "E[Re]",
         "σ(Re) (Std Dev of Excess Return)": "σ[Re]",
-        "Sharpe Ratio": "Sharpe ratio"
+        "Sharpe Ratio": "Sharpe ratio",
+        "E(Re) Annualized (%)": "E[Re] ann.",
+        "σ(Re) Annualized (%)": "σ[Re] ann.",
+        "Sharpe Ratio Annualized": "Sharpe ratio ann."
     }, inplace=True)
     return summary_table
 
+
+def merge_product_summaries(time_period="paper", product_list=None):
+    """
+    Assemble and save the Table 1 result of a time period from the per-product rows
+    written by summarize_product_file.
+
+    Parameters
+    ----------
+    time_period : str, optional
+        'paper' (default) or 'current'.
+    product_list : list of int, optional
+        Products to include (default is the registry's products for the period).
+
+    Returns
+    -------
+    pandas.DataFrame
+        Typed summary table, as returned by load_summary.
+    """
+    if product_list is None:
+        product_list = product_codes(time_period)
+    rows = {code: read_table(product_summary_file(code, time_period)) for code in product_list}
+    return save_summary(assemble_summary(rows, time_period), time_period)
+
+
+# Column types of the persisted Table 1 results (final_paper / final_current)
+SUMMARY_SCHEMA = {
+    "Commodity": "string",
+    "Contract Code": "Int64",
+    "N": "Int64",
+    "Basis": "float64",
+    "Freq. of bw.": "float64",
+    "E[Re]": "float64",
+    "σ[Re]": "float64",
+    "Sharpe ratio": "float64",
+    "Sector": "string",
+    "E[Re] ann.": "float64",
+    "σ[Re] ann.": "float64",
+    "Sharpe ratio ann.": "float64",
+}
+SUMMARY_ARROW_SCHEMA = arrow_schema(SUMMARY_SCHEMA)
+
+# Front-contract return statistics annualized for the sampling frequency, comparable
+# across 'W', 'M' and 'Q'; not part of the paper's Table 1 layout
+ANNUALIZED_COLUMNS = ["E[Re] ann.", "σ[Re] ann.", "Sharpe ratio ann."]
+
+
+def summary_file(time_period="paper"):
+    """
+    Location of the persisted main_summary result for a time period.
+    """
+    return DATA_DIR / f"final_{time_period}.parquet"
+
+
+def save_summary(summary_table, time_period="paper"):
+    """
+    Persist a main_summary result as typed parquet (see SUMMARY_SCHEMA), plus
+    final_{time_period}.csv when EXPORT_CSV is enabled in settings.
+
+    Parameters
+    ----------
+    summary_table : pandas.DataFrame
+        Output of main_summary.
+    time_period : str, optional
+        'paper' (default) or 'current'.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The typed table that was written.
+    """
+    typed = summary_table.reset_index(drop=True).reindex(columns=list(SUMMARY_SCHEMA)).astype(SUMMARY_SCHEMA)
+    write_table(typed, summary_file(time_period), SUMMARY_ARROW_SCHEMA,
+                csv_path=DATA_DIR / f"final_{time_period}.csv")
+    return typed
+
+
+def load_summary(time_period="paper", rebuild=False):
+    """
+    Checks if the Table 1 result for this time period was already computed and saved.
+    If so, reads it; otherwise runs main_summary once and saves it, so every output
+    format (CSV, HTML, LaTeX) is produced from the same computation.
+
+    Parameters
+    ----------
+    time_period : str, optional
+        'paper' (default) or 'current'.
+    rebuild : bool, optional
+        Recompute even if a saved result exists.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Typed main_summary result.
+    """
+    path = summary_file(time_period)
+    if path.exists() and not rebuild:
+        return read_table(path)
+    return save_summary(main_summary(time_period), time_period)
+
+
 def rename_for_display(df):
     """
     Formatting the Index by replacing the commodity name with a user-friendly version
@@ -341,11 +683,10 @@ def rename_for_display(df):
     df = df.copy()
     df["Symbol"] = ""
     for i in df.index:
-        orig_name = df.at[i, "Commodity"]
-        if orig_name in DISPLAY_NAME_MAP:
-            new_name, new_sym = DISPLAY_NAME_MAP[orig_name]
-            df.at[i, "Commodity"] = new_name
-            df.at[i, "Symbol"] = new_sym
+        product = product_by_wrds_name(df.at[i, "Commodity"])
+        if product is not None:
+            df.at[i, "Commodity"] = product["display_name"]
+            df.at[i, "Symbol"] = product["symbol"]
     return df
 
 def final_table(df):
@@ -433,8 +774,8 @@ def final_table(df):
 
 
 if __name__ == "__main__":
-    table_paper = main_summary(time_period="paper")
-    table_current = main_summary(time_period="current")
+    table_paper = load_summary(time_period="paper")
+    table_current = load_summary(time_period="current")
 
     final_paper = final_table(table_paper)
     final_current = final_table(table_current)
@@ -0,0 +1,191 @@
+""" Robustness sweeps of Table 1: a grid of (date window, basis definition, sampling
+frequency) settings evaluated in a process pool against one shared copy of the daily
+store, returned as a single long-format table"""
+
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from calc_format_futures_data import *
+
+# Settings of one sweep configuration, and the statistics reported for each product
+CONFIG_COLUMNS = ["start", "end", "freq", "basis", "near", "far"]
+SWEEP_STATS = ["N", "mean_basis", "freq_bw", "excess_return_mean", "excess_return_std", "sharpe_ratio",
+               "excess_return_ann_mean", "excess_return_ann_std", "sharpe_ratio_ann"]
+# Columns of the daily store the statistics need
+SWEEP_STORE_COLUMNS = ["futcode", "date_", "settlement", "contrdate", "startdate", "lasttrddate", "product_code"]
+
+_SHARED = {}
+
+
+def rolling_windows(start, end, years=10, step_years=1):
+    """
+    Windows of `years` years starting at start and every step_years after it, up to
+    the last one that ends by end.
+
+    Examples
+    --------
+    >>> [(str(s.date()), str(e.date())) for s, e in rolling_windows("1990-01-01", "2001-12-31", years=10)]
+    [('1990-01-01', '1999-12-31'), ('1991-01-01', '2000-12-31'), ('1992-01-01', '2001-12-31')]
+    """
+    end = pd.Timestamp(end)
+    windows = []
+    first = pd.Timestamp(start)
+    while True:
+        last = first + pd.DateOffset(years=years) - pd.Timedelta(days=1)
+        if last > end:
+            return windows
+        windows.append((first, last))
+        first = first + pd.DateOffset(years=step_years)
+
+
+def sweep_grid(windows, bases=(("span", (1, 12)),), freqs=("M",)):
+    """
+    Every combination of windows, basis definitions and sampling frequencies.
+
+    Parameters
+    ----------
+    windows : list of tuple
+        (start, end) dates; either may be None for an open bound.
+    bases : list of tuple, optional
+        (basis, (near, far)) pairs as in compute_futures_stats (default is the paper's
+        nearest-to-farthest basis over maturities 1-12).
+    freqs : list of str, optional
+        Sampling frequencies ('W', 'M' or 'Q'; default is monthly only).
+
+    Returns
+    -------
+    list of dict
+        One configuration per combination, with keys CONFIG_COLUMNS.
+    """
+    return [
+        {"start": start, "end": end, "freq": freq, "basis": basis, "near": near, "far": far}
+        for (start, end), (basis, (near, far)), freq in product(windows, bases, freqs)
+    ]
+
+
+def _write_shared_store(df_all, path):
+    """
+    Write the columns of the daily store a sweep needs as an uncompressed Arrow IPC
+    file, which every worker memory-maps instead of receiving its own copy.
+    """
+    table = pa.Table.from_pandas(df_all[SWEEP_STORE_COLUMNS], preserve_index=False)
+    with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _init_sweep_worker(path):
+    """
+    Process pool initializer: memory-map the shared store.
+    """
+    _SHARED["store"] = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+
+
+def _evaluate_window(task):
+    """
+    Statistics of every product for one window and frequency, under each basis
+    definition. The monthly series and the maturity pivot are computed once and
+    shared by the basis definitions.
+
+    Parameters
+    ----------
+    task : tuple
+        (start, end, freq, bases, product_list), bases as in sweep_grid.
+
+    Returns
+    -------
+    list of dict
+        One record per product and basis definition.
+    """
+    start, end, freq, bases, product_list = task
+    store = _SHARED["store"]
+    filters = window_filters(start, end, product_list)
+    if filters:
+        store = store.filter(pq.filters_to_expression(filters))
+    window = store.to_pandas().drop_duplicates(subset=["futcode", "date_"], ignore_index=True)
+
+    records = []
+    for code, data_contracts in window.groupby("product_code", sort=False):
+        monthly_df = futures_series_to_monthly(data_contracts, freq=freq)
+        first_through_12th_contracts_df = extract_first_through_12th_contracts(monthly_df)
+        for basis, (near, far) in bases:
+            stats = compute_futures_stats(first_through_12th_contracts_df, monthly_df, freq=freq,
+                                          maturities=(near, far), basis=basis)
+            records.append({"start": start, "end": end, "freq": freq, "basis": basis, "near": near, "far": far,
+                            "product_code": code, **{key: stats[key] for key in SWEEP_STATS}})
+    return records
+
+
+def run_sweep(configs, product_list=None, df_all=None, max_workers=None):
+    """
+    Evaluate Table 1 statistics for every configuration of a sweep.
+
+    The daily rows covering all the windows are loaded once and written to a
+    memory-mapped Arrow file shared by the workers; each worker then evaluates one
+    (window, frequency) pair with all of its basis definitions.
+
+    Parameters
+    ----------
+    configs : list of dict
+        Configurations as returned by sweep_grid. Each window must lie on one side of
+        the paper/current boundary of the store (see check_store_window).
+    product_list : list of int, optional
+        Products to include (default is every registered product).
+    df_all : pandas.DataFrame, optional
+        Daily store already in memory (default reads the windows from df_all.parquet,
+        see load_futures_window).
+    max_workers : int, optional
+        Size of the process pool (default is one per window and frequency, capped at the
+        CPU count); 1 evaluates in this process.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Long format, one row per configuration, product and statistic: CONFIG_COLUMNS,
+        'product_code', 'statistic' (one of SWEEP_STATS) and 'value'.
+    """
+    if product_list is None:
+        product_list = product_codes()
+    tasks = {}
+    for config in configs:
+        key = (config["start"], config["end"], config["freq"])
+        tasks.setdefault(key, []).append((config["basis"], (config["near"], config["far"])))
+    tasks = [(start, end, freq, bases, product_list) for (start, end, freq), bases in tasks.items()]
+    for start, end, *_ in tasks:
+        check_store_window(start, end)
+    if not tasks:
+        return pd.DataFrame(columns=CONFIG_COLUMNS + ["product_code", "statistic", "value"])
+
+    starts = [config["start"] for config in configs]
+    ends = [config["end"] for config in configs]
+    first = None if any(s is None for s in starts) else min(pd.Timestamp(s) for s in starts)
+    last = None if any(e is None for e in ends) else max(pd.Timestamp(e) for e in ends)
+    if df_all is None:
+        df_all = load_futures_window(first, last, product_list, whole_contracts=False)
+    else:
+        df_all = slice_futures_window(df_all, first, last, product_list, whole_contracts=False)
+
+    workers = max_workers or min(len(tasks), os.cpu_count() or 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sweep_store.arrow"
+        _write_shared_store(df_all, path)
+        del df_all
+        if workers == 1:
+            _init_sweep_worker(path)
+            try:
+                results = [_evaluate_window(task) for task in tasks]
+            finally:
+                _SHARED.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker,
+                                     initargs=(path,)) as pool:
+                results = list(pool.map(_evaluate_window, tasks))
+
+    wide = pd.DataFrame([record for records in results for record in records],
+                        columns=CONFIG_COLUMNS + ["product_code"] + SWEEP_STATS)
+    return wide.melt(id_vars=CONFIG_COLUMNS + ["product_code"], value_vars=SWEEP_STATS,
+                     var_name="statistic", value_name="value")
@@ -0,0 +1,355 @@
+""" Vectorized extraction of futures curves (obs month x maturity) as plain arrays, ready to be
+drawn as line segments for the sample-curve figures and the term-structure atlas, and the
+term-structure cube: every product's curves as one dense product x obs month x maturity
+array, saved as .npy with JSON metadata and loaded memory-mapped"""
+
+import json
+import pandas as pd
+import numpy as np
+from pull_futures_data import *
+from calc_format_futures_data import extract_first_through_12th_contracts, futures_series_to_monthly
+
+TERM_STRUCTURE_FILE = DATA_DIR / "term_structure_cube.npy"
+N_MATURITIES = 12
+
+
+def product_curves(monthly_df, product_code, start=None, end=None):
+    """
+    1st-12th contract settlements of one product, one row per observation month.
+
+    Parameters
+    ----------
+    monthly_df : pandas.DataFrame
+        Output of futures_series_to_monthly with a 'product_code' column.
+    product_code : int
+        Product to extract.
+    start, end : str or Period, optional
+        Inclusive monthly bounds on the observation month.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Output of extract_first_through_12th_contracts, sorted by observation month.
+    """
+    product_df = monthly_df[monthly_df["product_code"] == product_code]
+    if start is not None:
+        product_df = product_df[product_df["obs_period"] >= pd.Period(start, freq="M")]
+    if end is not None:
+        product_df = product_df[product_df["obs_period"] <= pd.Period(end, freq="M")]
+    if product_df.empty:
+        return pd.DataFrame(columns=[f"{i}mth_settlement" for i in range(1, 13)])
+    return extract_first_through_12th_contracts(product_df).sort_index()
+
+
+def curve_segments(curves_df):
+    """
+    All curves of a first-through-12th table as arrays, one polyline per observation month.
+
+    Point i of the curve observed in month t is placed at month t + i, as in the sample
+    curve figures. The basis is the average monthly log slope between the first and the
+    last maturity, in percent.
+
+    Parameters
+    ----------
+    curves_df : pandas.DataFrame
+        Output of extract_first_through_12th_contracts (or product_curves), indexed by
+        monthly Period.
+
+    Returns
+    -------
+    dict
+        Keys:
+            'obs_period' : pandas.PeriodIndex of the N observation months
+            'x' : numpy.ndarray of datetime64[D], N x M point dates (first day of month)
+            'y' : numpy.ndarray of float, N x M settlements (NaN where missing)
+            'basis' : numpy.ndarray of float, N basis values (NaN if an endpoint is missing)
+    """
+    values = curves_df.to_numpy(dtype=float)
+    n_maturities = values.shape[1]
+    # monthly Period ordinals and datetime64[M] share the same epoch (1970-01)
+    ordinals = curves_df.index.asi8[:, None] + np.arange(n_maturities)
+    x = ordinals.astype("datetime64[M]").astype("datetime64[D]")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        basis = (np.log(values[:, -1]) - np.log(values[:, 0])) / (n_maturities - 1) * 100
+    return {"obs_period": curves_df.index, "x": x, "y": values, "basis": basis}
+
+
+def _metadata_file(path):
+    return Path(path).with_suffix(".json")
+
+
+def _product_index(products):
+    return {int(code): i for i, code in enumerate(products)}
+
+
+def build_term_structure_cube(monthly_df, n_maturities=N_MATURITIES):
+    """
+    Dense cube of settlements by product, observation month and maturity.
+
+    Cell [p, t, m] holds the settlement of product p's contract maturing m + 1 months
+    after observation month t, as in extract_first_through_12th_contracts (the last
+    non-missing one if several contracts share that month), NaN where there is none.
+
+    Parameters
+    ----------
+    monthly_df : pandas.DataFrame
+        Monthly output of futures_series_to_monthly with a 'product_code' column.
+    n_maturities : int, optional
+        Maturities kept, 1 to n_maturities months (default is 12).
+
+    Returns
+    -------
+    dict
+        Keys:
+            'values' : numpy.ndarray of float64, P x T x n_maturities
+            'products' : numpy.ndarray of int64, sorted product codes (axis 0)
+            'months' : pandas.PeriodIndex of T consecutive months (axis 1)
+            'maturities' : numpy.ndarray of int64, 1..n_maturities (axis 2)
+            'product_index' : dict, product code -> position on axis 0
+    """
+    maturities = np.arange(1, n_maturities + 1)
+    df = monthly_df.dropna(subset=["settlement"])
+    obs = pd.PeriodIndex(df["obs_period"]).asfreq("M").asi8
+    maturity = pd.PeriodIndex(df["contr_period"]).asi8 - obs
+    in_range = (maturity >= 1) & (maturity <= n_maturities)
+    if not in_range.any():
+        return {"values": np.full((0, 0, n_maturities), np.nan), "products": np.array([], dtype=np.int64),
+                "months": pd.PeriodIndex([], freq="M"), "maturities": maturities, "product_index": {}}
+
+    obs, maturity = obs[in_range], maturity[in_range]
+    codes = df["product_code"].to_numpy(dtype=np.int64)[in_range]
+    settlements = df["settlement"].to_numpy(dtype=float)[in_range]
+    products, product_idx = np.unique(codes, return_inverse=True)
+    first, last = obs.min(), obs.max()
+    shape = (len(products), last - first + 1, n_maturities)
+
+    # rows are in obs/contract order, so keep the last row landing in each cell
+    cell = np.ravel_multi_index((product_idx, obs - first, maturity - 1), shape)
+    _, last_in_cell = np.unique(cell[::-1], return_index=True)
+    keep = len(cell) - 1 - last_in_cell
+    values = np.full(shape, np.nan)
+    values.flat[cell[keep]] = settlements[keep]
+    months = pd.period_range(start=pd.Period(ordinal=first, freq="M"), periods=shape[1], freq="M")
+    return {"values": values, "products": products, "months": months, "maturities": maturities,
+            "product_index": _product_index(products)}
+
+
+def save_term_structure_cube(cube, path=TERM_STRUCTURE_FILE):
+    """
+    Save a cube as an .npy array plus a JSON file of its axes next to it.
+
+    Returns
+    -------
+    pathlib.Path
+        The written .npy file.
+    """
+    path = Path(path)
+    np.save(path, np.ascontiguousarray(cube["values"], dtype=np.float64))
+    metadata = {
+        "shape": list(cube["values"].shape),
+        "dtype": "float64",
+        "products": [int(code) for code in cube["products"]],
+        "first_month": str(cube["months"][0]) if len(cube["months"]) else None,
+        "n_months": len(cube["months"]),
+        "maturities": [int(m) for m in cube["maturities"]],
+    }
+    _metadata_file(path).write_text(json.dumps(metadata, indent=1))
+    return path
+
+
+def read_term_structure_cube(path=TERM_STRUCTURE_FILE, mmap_mode="r"):
+    """
+    Open a cube written by save_term_structure_cube.
+
+    The array is memory-mapped (read-only by default), so opening it takes constant
+    time whatever its size and processes opening the same file share its pages.
+
+    Returns
+    -------
+    dict
+        As returned by build_term_structure_cube, with 'values' a numpy.memmap.
+    """
+    metadata = json.loads(_metadata_file(path).read_text())
+    values = np.load(path, mmap_mode=mmap_mode)
+    if list(values.shape) != metadata["shape"]:
+        raise ValueError(f"{path} has shape {values.shape}, its metadata says {metadata['shape']}")
+    if metadata["first_month"] is None:
+        months = pd.PeriodIndex([], freq="M")
+    else:
+        months = pd.period_range(start=metadata["first_month"], periods=metadata["n_months"], freq="M")
+    products = np.array(metadata["products"], dtype=np.int64)
+    return {
+        "values": values,
+        "products": products,
+        "months": months,
+        "maturities": np.array(metadata["maturities"], dtype=np.int64),
+        "product_index": _product_index(products),
+    }
+
+
+def load_term_structure_cube(rebuild=False, path=TERM_STRUCTURE_FILE):
+    """
+    Checks if the term-structure cube is saved and at least as recent as df_all.parquet.
+    If so, opens it memory-mapped; otherwise builds it from the daily store, saves it
+    and opens the saved copy.
+
+    Parameters
+    ----------
+    rebuild : bool, optional
+        Force a rebuild even if a saved cube exists.
+    path : pathlib.Path, optional
+        Cube location (default is DATA_DIR / "term_structure_cube.npy").
+
+    Returns
+    -------
+    dict
+        As returned by read_term_structure_cube.
+    """
+    path = Path(path)
+    fresh = path.exists() and _metadata_file(path).exists() and (
+        not DATA_FILE.exists() or path.stat().st_mtime >= DATA_FILE.stat().st_mtime
+    )
+    if not fresh or rebuild:
+        df_all = load_combined_futures_data()
+        monthly_df = futures_series_to_monthly(df_all) if not df_all.empty else pd.DataFrame(
+            columns=["product_code", "obs_period", "contr_period", "settlement"])
+        save_term_structure_cube(build_term_structure_cube(monthly_df), path)
+    return read_term_structure_cube(path)
+
+
+def cube_curves(cube, product_code, start=None, end=None):
+    """
+    1st-12th contract settlements of one product from the cube, in the layout of
+    product_curves. Months in which the product has no 1-12 month contract are left out.
+
+    Parameters
+    ----------
+    cube : dict
+        As returned by load_term_structure_cube.
+    product_code : int
+        Product to extract.
+    start, end : str or Period, optional
+        Inclusive monthly bounds on the observation month.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Indexed by monthly Period, columns '1mth_settlement' ... (a copy of the cube rows).
+    """
+    columns = [f"{m}mth_settlement" for m in cube["maturities"]]
+    p = cube["product_index"].get(int(product_code))
+    if p is None:
+        return pd.DataFrame(columns=columns)
+    months = cube["months"]
+    lo = 0 if start is None else months.searchsorted(pd.Period(start, freq="M"), side="left")
+    hi = len(months) if end is None else months.searchsorted(pd.Period(end, freq="M"), side="right")
+    values = cube["values"][p, lo:hi]
+    observed = ~np.isnan(values).all(axis=1)
+    return pd.DataFrame(np.array(values[observed]), index=months[lo:hi][observed], columns=columns)
+
+
+def _positions(cube, product_codes, months):
+    """
+    Axis-0 and axis-1 positions of product codes and observation months, and whether
+    each month lies inside the cube.
+
+    Raises
+    ------
+    KeyError
+        If a product is not in the cube.
+    """
+    try:
+        p = np.array([cube["product_index"][int(code)] for code in np.atleast_1d(product_codes)], dtype=np.int64)
+    except KeyError as e:
+        raise KeyError(f"Product {e.args[0]} is not in the term-structure cube") from None
+    months = pd.PeriodIndex(np.atleast_1d(np.asarray(months, dtype=object)), freq="M")
+    first = cube["months"][0].ordinal if len(cube["months"]) else 0
+    t = months.asi8 - first
+    inside = (t >= 0) & (t < len(cube["months"])) & ~months.isna()
+    return p, np.where(inside, t, 0), inside
+
+
+def get_curve(cube, product_code, month):
+    """
+    Settlement curve of one product in one observation month, in constant time.
+
+    Parameters
+    ----------
+    cube : dict
+        As returned by load_term_structure_cube.
+    product_code : int
+        Product, e.g. 1986 for crude oil.
+    month : str, Period or Timestamp
+        Observation month, e.g. '2008-03'.
+
+    Returns
+    -------
+    numpy.ndarray
+        Settlements of the 1 to 12 month contracts (NaN where missing, all NaN for a
+        month outside the cube); a view of the cube, read-only when memory-mapped.
+
+    Raises
+    ------
+    KeyError
+        If the product is not in the cube.
+    """
+    p = cube["product_index"].get(int(product_code))
+    if p is None:
+        raise KeyError(f"Product {product_code} is not in the term-structure cube")
+    months = cube["months"]
+    t = pd.Period(month, freq="M").ordinal - months[0].ordinal if len(months) else -1
+    if not 0 <= t < len(months):
+        return np.full(len(cube["maturities"]), np.nan)
+    return cube["values"][p, t]
+
+
+def get_point(cube, product_code, month, maturity):
+    """
+    Settlement of one product's contract maturing `maturity` months after the
+    observation month (NaN if there is none), in constant time.
+    """
+    if not 1 <= maturity <= len(cube["maturities"]):
+        raise ValueError(f"Maturity must be between 1 and {len(cube['maturities'])}, got {maturity}")
+    return float(get_curve(cube, product_code, month)[maturity - 1])
+
+
+def get_curves(cube, product_codes, months):
+    """
+    Vectorized get_curve: one curve per (product, month) pair.
+
+    Parameters
+    ----------
+    cube : dict
+        As returned by load_term_structure_cube.
+    product_codes : int or array-like of int
+        Products, broadcast against months.
+    months : str, Period, Timestamp or array-like of them
+        Observation months.
+
+    Returns
+    -------
+    numpy.ndarray
+        N x 12 settlements, one row per pair (a copy of the cube rows).
+    """
+    p, t, inside = _positions(cube, product_codes, months)
+    p, t, inside = np.broadcast_arrays(p, t, inside)
+    curves = np.asarray(cube["values"][p, t])
+    curves[~inside] = np.nan
+    return curves
+
+
+def get_points(cube, product_codes, months, maturities):
+    """
+    Vectorized get_point: one settlement per (product, month, maturity) triple.
+
+    Returns
+    -------
+    numpy.ndarray
+        N settlements (NaN where missing).
+    """
+    maturities = np.atleast_1d(np.asarray(maturities, dtype=np.int64))
+    if ((maturities < 1) | (maturities > len(cube["maturities"]))).any():
+        raise ValueError(f"Maturities must be between 1 and {len(cube['maturities'])}")
+    p, t, inside = _positions(cube, product_codes, months)
+    p, t, inside, m = np.broadcast_arrays(p, t, inside, maturities)
+    return np.where(inside, cube["values"][p, t, m - 1], np.nan)
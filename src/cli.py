@@ -0,0 +1,220 @@
+""" Command line entry point for the pipeline outside of doit.
+
+    python src/cli.py pull [--period paper current] [--products 3160 289] [--force]
+    python src/cli.py refresh [--period ...] [--force]
+    python src/cli.py summarize [--period ...] [--from-cache]
+    python src/cli.py summarize --start 1990-01-01 --end 2000-12-31 [--freq W]
+    python src/cli.py figures [--outputs name.png ...] [--force] [--workers N]
+    python src/cli.py curve --product 1986 --month 2008-03 [2008-09 ...]
+    python src/cli.py atlas [--products 1986 2060] [--start 1990-01 --end 2000-12] [--workers N]
+    python src/cli.py bench [--scales 30 300 3000] [--strict]
+
+Only argparse is imported up front; each subcommand imports what it needs, so that
+`summarize --from-cache` loads neither WRDS nor matplotlib, seaborn or IPython"""
+
+import argparse
+import sys
+
+TIME_PERIODS = ["paper", "current"]
+
+
+def cmd_pull(args):
+    """
+    Pull every product (or --products) per period from WRDS into its own file, skipping
+    products already pulled unless --force, then rebuild the clean files and df_all.
+    """
+    from pull_futures_data import product_data_file, pull_product_to_file, save_clean_futures_data
+    from product_registry import product_codes
+    from wrds_query_log import print_query_summary
+
+    for time_period in args.period:
+        for code in args.products or product_codes(time_period):
+            if args.force or not product_data_file(code, time_period).exists():
+                pull_product_to_file(code, time_period)
+    print_query_summary()
+    save_clean_futures_data(TIME_PERIODS)
+
+
+def cmd_refresh(args):
+    """
+    Pull what is missing (everything with --force) and recompute the Table 1 results.
+    """
+    cmd_pull(args)
+    args.from_cache = False
+    args.start = args.end = None
+    cmd_summarize(args)
+
+
+def _summary_text(df):
+    """
+    Table 1 as plain text, with display names and the same ordering as final_table,
+    followed by the annualized front-contract statistics when present.
+    """
+    from calc_format_futures_data import rename_for_display, ANNUALIZED_COLUMNS
+
+    df = rename_for_display(df)
+    columns = ["Sector", "Commodity", "Symbol", "N", "Basis", "Freq. of bw.", "E[Re]", "σ[Re]", "Sharpe ratio"]
+    columns += [c for c in ANNUALIZED_COLUMNS if c in df.columns]
+    df = df[columns].sort_values(["Sector", "Commodity"], ignore_index=True)
+    return df.to_string(index=False, float_format=lambda x: f"{x:.2f}")
+
+
+def cmd_summarize(args):
+    """
+    Print Table 1 per period: from the saved results with --from-cache, otherwise
+    recomputed from the per-product files. With --start/--end, print Table 1 of that
+    window instead, sliced from the local store (df_all.parquet) without pulling; a
+    window crossing the boundary between the paper and current pulls is refused.
+    """
+    from columnar_store import read_table
+
+    if args.start or args.end:
+        if args.from_cache:
+            sys.exit("--from-cache only applies to the saved 'paper' and 'current' results.")
+        from calc_format_futures_data import window_summary
+        try:
+            df = window_summary(args.start, args.end, freq=args.freq)
+        except ValueError as e:
+            sys.exit(str(e))
+        print(f"=== {args.start or 'FIRST DATE'} TO {args.end or 'LAST DATE'} ===")
+        print(_summary_text(df) if not df.empty else "No results.")
+        return
+
+    for time_period in args.period:
+        if args.from_cache:
+            from calc_format_futures_data import summary_file
+            path = summary_file(time_period)
+            if not path.exists():
+                sys.exit(f"No saved results at {path}; run `summarize` without --from-cache first.")
+            df = read_table(path)
+        else:
+            from product_registry import product_codes
+            from calc_format_futures_data import summarize_product_file, merge_product_summaries
+            for code in product_codes(time_period):
+                summarize_product_file(code, time_period)
+            df = merge_product_summaries(time_period)
+        print(f"=== {time_period.upper()} PERIOD ===")
+        print(_summary_text(df) if not df.empty else "No results.")
+
+
+def cmd_figures(args):
+    """
+    Render the report figures and tables whose inputs changed (all with --force).
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    from create_figures import render_figures, FIGURE_OUTPUTS
+
+    outputs = None
+    if args.outputs:
+        unknown = sorted(set(args.outputs) - set(FIGURE_OUTPUTS))
+        if unknown:
+            sys.exit(f"Unknown outputs: {', '.join(unknown)}; choose from {', '.join(FIGURE_OUTPUTS)}.")
+        outputs = {name: FIGURE_OUTPUTS[name] for name in args.outputs}
+    render_figures(outputs=outputs, max_workers=args.workers, force=args.force)
+
+
+def cmd_curve(args):
+    """
+    Print a product's futures curves for the given observation months, read from the
+    term-structure cube (built from the local store if stale).
+    """
+    import pandas as pd
+    from calc_term_structure import load_term_structure_cube, get_curves
+    from product_registry import product_label
+
+    cube = load_term_structure_cube()
+    if args.product not in cube["product_index"]:
+        sys.exit(f"Product {args.product} has no curves in the local store.")
+    curves = pd.DataFrame(get_curves(cube, args.product, args.month).T,
+                          index=pd.Index(cube["maturities"], name="maturity (months)"), columns=args.month)
+    print(product_label(args.product))
+    print(curves.to_string(float_format=lambda x: f"{x:.2f}"))
+
+
+def cmd_atlas(args):
+    """
+    Render the term-structure atlas, one page of yearly curve panels per product.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    from create_figures import plot_term_structure_atlas_png
+
+    pages = plot_term_structure_atlas_png(product_list=args.products, start=args.start, end=args.end,
+                                          max_workers=args.workers)
+    print(f"Rendered {len(pages)} atlas pages" + (f" in {pages[0].parent}" if pages else ""))
+
+
+def cmd_bench(args):
+    """
+    Benchmark the pipeline stages on synthetic products and save the results.
+    """
+    from bench_pipeline import benchmark_stages, save_benchmarks
+
+    results = benchmark_stages(args.scales, strict=args.strict)
+    print(results.to_string(index=False))
+    print(f"Saved {save_benchmarks(results)}")
+
+
+def build_parser():
+    """
+    Argument parser with one subparser per command.
+    """
+    parser = argparse.ArgumentParser(prog="cli.py", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def with_period(sub):
+        sub.add_argument("--period", nargs="+", choices=TIME_PERIODS, default=TIME_PERIODS,
+                         help="time periods (default: both)")
+        return sub
+
+    pull = with_period(commands.add_parser("pull", help="pull products from WRDS into _data"))
+    pull.add_argument("--products", nargs="+", type=int, help="product codes (default: data_manual/products.csv)")
+    pull.add_argument("--force", action="store_true", help="pull products already on disk again")
+    pull.set_defaults(func=cmd_pull)
+
+    refresh = with_period(commands.add_parser("refresh", help="pull missing data and recompute Table 1"))
+    refresh.add_argument("--products", nargs="+", type=int, help="product codes (default: data_manual/products.csv)")
+    refresh.add_argument("--force", action="store_true", help="pull every product again")
+    refresh.set_defaults(func=cmd_refresh)
+
+    summarize = with_period(commands.add_parser("summarize", help="print Table 1"))
+    summarize.add_argument("--from-cache", action="store_true", help="print the saved results without recomputing")
+    summarize.add_argument("--start", help="first date of a custom window, e.g. 1990-01-01")
+    summarize.add_argument("--end", help="last date of a custom window, e.g. 2000-12-31")
+    summarize.add_argument("--freq", default="M", choices=["W", "M", "Q"],
+                           help="sampling frequency of a custom window (default: M)")
+    summarize.set_defaults(func=cmd_summarize)
+
+    figures = commands.add_parser("figures", help="render the report figures and tables")
+    figures.add_argument("--outputs", nargs="+", help="output file names (default: all)")
+    figures.add_argument("--force", action="store_true", help="render even if up to date")
+    figures.add_argument("--workers", type=int, help="parallel render processes")
+    figures.set_defaults(func=cmd_figures)
+
+    curve = commands.add_parser("curve", help="print a product's futures curves from the local store")
+    curve.add_argument("--product", type=int, required=True, help="product code, e.g. 1986")
+    curve.add_argument("--month", nargs="+", required=True, help="observation months, e.g. 2008-03")
+    curve.set_defaults(func=cmd_curve)
+
+    atlas = commands.add_parser("atlas", help="render the term-structure atlas of every product")
+    atlas.add_argument("--products", nargs="+", type=int, help="product codes (default: every product with curves)")
+    atlas.add_argument("--start", help="first observation month, e.g. 1990-01")
+    atlas.add_argument("--end", help="last observation month, e.g. 2000-12")
+    atlas.add_argument("--workers", type=int, help="parallel render processes")
+    atlas.set_defaults(func=cmd_atlas)
+
+    bench = commands.add_parser("bench", help="benchmark pipeline stages on synthetic data")
+    bench.add_argument("--scales", nargs="+", type=int, default=[30, 300, 3000], help="numbers of products")
+    bench.add_argument("--strict", action="store_true", help="stop on the first fast-vs-reference mismatch")
+    bench.set_defaults(func=cmd_bench)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
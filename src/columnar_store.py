@@ -0,0 +1,152 @@
+""" Explicit parquet schemas and a single writer/reader for the artifacts passed between
+pipeline stages, so intermediate data reloads quickly and with exactly the same types"""
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from settings import config
+
+PARQUET_COMPRESSION = config("PARQUET_COMPRESSION")
+PARQUET_ROW_GROUP_SIZE = config("PARQUET_ROW_GROUP_SIZE")
+EXPORT_CSV = config("EXPORT_CSV")
+
+# Daily settlements as pulled from WRDS (per-product artifacts, clean_futures_*, df_all)
+FUTURES_SCHEMA = pa.schema([
+    ("futcode", pa.int64()),
+    ("date_", pa.timestamp("ns")),
+    ("settlement", pa.float64()),
+    ("volume", pa.float64()),
+    ("contrdate", pa.string()),
+    ("startdate", pa.timestamp("ns")),
+    ("lasttrddate", pa.timestamp("ns")),
+    ("product_code", pa.int64()),
+])
+
+# Per-product artifacts also carry the WRDS contract name, repeated on every row
+PRODUCT_FUTURES_SCHEMA = FUTURES_SCHEMA.append(pa.field("contrname", pa.dictionary(pa.int32(), pa.string())))
+
+def period_field(name, freq="M"):
+    """
+    Field holding a pandas Period column, stored as the start timestamp of each period
+    and converted back by read_table.
+    """
+    return pa.field(name, pa.timestamp("ns"), metadata={"period": freq})
+
+
+# Rolled Nth-contract series (calc_continuous_futures.build_continuous_futures)
+CONTINUOUS_SCHEMA = pa.schema([
+    ("product_code", pa.int64()),
+    ("nth", pa.int64()),
+    ("date_", pa.timestamp("ns")),
+    ("futcode", pa.int64()),
+    period_field("contr_period"),
+    ("settlement", pa.float64()),
+    ("roll", pa.bool_()),
+    ("ret", pa.float64()),
+    ("cum_index", pa.float64()),
+])
+
+# Monthly front-contract excess returns (calc_continuous_futures.build_monthly_excess_return_panel)
+RETURN_PANEL_SCHEMA = pa.schema([
+    period_field("obs_period"),
+    ("product_code", pa.int64()),
+    ("futcode", pa.int64()),
+    ("excess_return", pa.float64()),
+])
+
+# Moments of monthly settlements per sector, product and month (calc_aggregate_cube)
+SETTLEMENT_CUBE_SCHEMA = pa.schema([
+    ("Sector", pa.string()),
+    ("product_code", pa.int64()),
+    ("year", pa.int64()),
+    period_field("obs_period"),
+    ("count", pa.int64()),
+    ("mean", pa.float64()),
+    ("m2", pa.float64()),
+    ("min", pa.float64()),
+    ("max", pa.float64()),
+])
+
+# Arrow types of the pandas dtypes used by typed frames such as the Table 1 summary
+ARROW_TYPES = {"string": pa.string(), "Int64": pa.int64(), "float64": pa.float64()}
+
+
+def arrow_schema(dtypes):
+    """
+    Parquet schema of a frame typed with a {column: pandas dtype} mapping, so the
+    mapping is the single definition of the columns.
+
+    Examples
+    --------
+    >>> print(arrow_schema({"Commodity": "string", "N": "Int64"}))
+    Commodity: string
+    N: int64
+    """
+    return pa.schema([(name, ARROW_TYPES[dtype]) for name, dtype in dtypes.items()])
+
+
+def write_table(df, path, schema=None, csv_path=None):
+    """
+    Write a frame as parquet with an explicit schema, compression and row-group size.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Frame to write. With a schema, its columns are cast to the schema (missing
+        columns are written as nulls, extra columns are dropped).
+    path : pathlib.Path
+        Parquet file to write.
+    schema : pyarrow.Schema, optional
+        Column names and types (default is the types pandas infers).
+    csv_path : pathlib.Path, optional
+        Also export the frame as CSV here when EXPORT_CSV is enabled in settings.
+
+    Returns
+    -------
+    pathlib.Path
+        The written parquet file.
+    """
+    if schema is not None:
+        present = pa.schema([field for field in schema if field.name in df.columns])
+        periods = {field.name: df[field.name].dt.to_timestamp() for field in present
+                   if field.metadata and b"period" in field.metadata
+                   and isinstance(df[field.name].dtype, pd.PeriodDtype)}
+        df = df.assign(**periods)
+        table = pa.Table.from_pandas(df[present.names], schema=present, preserve_index=False)
+        for field in schema:
+            if field.name not in df.columns:
+                table = table.append_column(field, pa.nulls(len(df), field.type))
+        table = table.select(schema.names)
+    else:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(table, path, compression=PARQUET_COMPRESSION, row_group_size=PARQUET_ROW_GROUP_SIZE)
+    if csv_path is not None and EXPORT_CSV:
+        df.to_csv(csv_path, index=False)
+    return Path(path)
+
+
+def read_table(path, columns=None, filters=None):
+    """
+    Read a parquet artifact written by write_table back into pandas.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        Parquet file.
+    columns : list of str, optional
+        Subset of columns to read (only those column chunks are decoded).
+    filters : list of tuple, optional
+        Row predicates such as [("date_", ">=", start)], applied while reading so row
+        groups outside them are skipped (pyarrow filter syntax).
+
+    Returns
+    -------
+    pandas.DataFrame
+        Columns written as period fields (see period_field) come back as Periods.
+    """
+    df = pd.read_parquet(path, columns=columns, filters=filters)
+    for field in pq.read_schema(path):
+        if field.metadata and b"period" in field.metadata and field.name in df.columns:
+            df[field.name] = df[field.name].dt.to_period(field.metadata[b"period"].decode())
+    return df
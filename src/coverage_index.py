@@ -0,0 +1,248 @@
+""" Bitmap coverage index: one packed bitset per product over trading days and months,
+built when the daily store is written, so coverage questions never touch settlement data"""
+
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from settings import config
+
+DATA_DIR = Path(config("DATA_DIR"))
+DATA_FILE = DATA_DIR / "df_all.parquet"
+COVERAGE_FILE = DATA_DIR / "coverage_index.npz"
+
+
+def build_coverage_index(df_all):
+    """
+    Build per-product coverage bitsets from the daily store.
+
+    Parameters
+    ----------
+    df_all : pandas.DataFrame
+        Daily store with at least ['product_code', 'date_'].
+
+    Returns
+    -------
+    dict
+        Keys:
+            'products' : numpy.ndarray of product codes (sorted)
+            'days' : numpy.ndarray of datetime64[D], the union trading-day calendar
+            'first_month' : numpy.datetime64 (month precision) of the first month
+            'n_months' : int, number of calendar months covered by the month axis
+            'day_bits' : numpy.ndarray of uint8, products x packed trading days
+            'month_bits' : numpy.ndarray of uint8, products x packed months
+    """
+    dates = pd.to_datetime(df_all["date_"]).to_numpy(dtype="datetime64[D]")
+    products, product_idx = np.unique(df_all["product_code"].to_numpy(), return_inverse=True)
+    days, day_idx = np.unique(dates, return_inverse=True)
+
+    months = dates.astype("datetime64[M]").astype(np.int64)
+    first_month = months.min() if len(months) else 0
+    n_months = int(months.max() - first_month + 1) if len(months) else 0
+
+    day_hits = np.zeros((len(products), len(days)), dtype=bool)
+    day_hits[product_idx, day_idx] = True
+    month_hits = np.zeros((len(products), n_months), dtype=bool)
+    month_hits[product_idx, months - first_month] = True
+
+    return {
+        "products": products,
+        "days": days,
+        "first_month": np.datetime64(int(first_month), "M"),
+        "n_months": n_months,
+        "day_bits": np.packbits(day_hits, axis=1),
+        "month_bits": np.packbits(month_hits, axis=1),
+    }
+
+
+def save_coverage_index(index, path=COVERAGE_FILE):
+    """
+    Persist a coverage index as a compressed .npz file.
+    """
+    np.savez_compressed(path, **{k: np.asarray(v) for k, v in index.items()})
+    return Path(path)
+
+
+def load_coverage_index(df_all=None, loader=None, path=COVERAGE_FILE):
+    """
+    Checks if a coverage index at least as recent as df_all.parquet exists locally.
+    If so, reads it; otherwise builds it and saves it.
+
+    Parameters
+    ----------
+    df_all : pandas.DataFrame, optional
+        Daily store to build from if the index must be rebuilt.
+    loader : callable, optional
+        Called to obtain the daily store when neither df_all nor df_all.parquet is
+        available (e.g. load_combined_futures_data, which pulls from WRDS).
+    path : pathlib.Path, optional
+        Index location (default is DATA_DIR / "coverage_index.npz").
+
+    Returns
+    -------
+    dict
+        Coverage index as described in build_coverage_index.
+    """
+    path = Path(path)
+    fresh = path.exists() and (not DATA_FILE.exists() or path.stat().st_mtime >= DATA_FILE.stat().st_mtime)
+    if fresh:
+        with np.load(path) as stored:
+            index = {k: stored[k] for k in stored.files}
+        index["n_months"] = int(index["n_months"])
+        index["first_month"] = index["first_month"][()]
+        return index
+
+    if df_all is None and DATA_FILE.exists():
+        df_all = pd.read_parquet(DATA_FILE, columns=["product_code", "date_"])
+    elif df_all is None and loader is not None:
+        df_all = loader()
+    if df_all is None or df_all.empty:
+        return build_coverage_index(pd.DataFrame({"product_code": [], "date_": pd.to_datetime([])}))
+    index = build_coverage_index(df_all)
+    save_coverage_index(index, path)
+    return index
+
+
+def _axis(index, level):
+    """
+    Return (packed bits, axis length, axis labels) for the 'day' or 'month' level.
+    """
+    if level == "day":
+        return index["day_bits"], len(index["days"]), pd.DatetimeIndex(index["days"])
+    if level == "month":
+        months = pd.period_range(start=pd.Period(index["first_month"], freq="M"),
+                                 periods=index["n_months"], freq="M")
+        return index["month_bits"], index["n_months"], months
+    raise ValueError(f"Unknown coverage level {level!r}; expected 'day' or 'month'")
+
+
+def _unpack(bits, lo, hi):
+    """
+    Unpack only the bytes spanning bit positions [lo, hi) and return those bits as bool.
+    """
+    first_byte, last_byte = lo // 8, (hi + 7) // 8
+    unpacked = np.unpackbits(bits[:, first_byte:last_byte], axis=1)
+    return unpacked[:, lo - first_byte * 8:hi - first_byte * 8].astype(bool)
+
+
+def _bounds(labels, start, end):
+    """
+    Bit positions [lo, hi) of the labels that fall inside [start, end].
+    """
+    if isinstance(labels, pd.PeriodIndex):
+        start = None if start is None else pd.Period(start, freq="M")
+        end = None if end is None else pd.Period(end, freq="M")
+    else:
+        start = None if start is None else pd.Timestamp(start)
+        end = None if end is None else pd.Timestamp(end)
+    lo = 0 if start is None else labels.searchsorted(start, side="left")
+    hi = len(labels) if end is None else labels.searchsorted(end, side="right")
+    return int(lo), int(hi)
+
+
+def products_with_data(index, start=None, end=None, level="day"):
+    """
+    Product codes with at least one observation in [start, end].
+
+    Parameters
+    ----------
+    index : dict
+        Coverage index from load_coverage_index.
+    start, end : str or Timestamp, optional
+        Inclusive bounds (open-ended if omitted).
+    level : str, optional
+        'day' (default) or 'month' resolution.
+
+    Returns
+    -------
+    numpy.ndarray
+        Product codes with data in the window.
+    """
+    bits, _, labels = _axis(index, level)
+    lo, hi = _bounds(labels, start, end)
+    if hi <= lo:
+        return index["products"][:0]
+    return index["products"][_unpack(bits, lo, hi).any(axis=1)]
+
+
+def coverage_counts(index, start=None, end=None, level="month"):
+    """
+    Number of covered months (or trading days) per product in [start, end].
+
+    Returns
+    -------
+    pandas.Series
+        Counts indexed by product code.
+    """
+    bits, _, labels = _axis(index, level)
+    lo, hi = _bounds(labels, start, end)
+    counts = _unpack(bits, lo, hi).sum(axis=1) if hi > lo else np.zeros(len(index["products"]), dtype=int)
+    return pd.Series(counts, index=index["products"], name="coverage")
+
+
+def coverage_gaps(index, product_code, level="month"):
+    """
+    Runs of missing months (or trading days) between a product's first and last observation.
+
+    Parameters
+    ----------
+    index : dict
+        Coverage index from load_coverage_index.
+    product_code : int
+        Product to inspect.
+    level : str, optional
+        'month' (default) or 'day'.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Columns ['start', 'end', 'length'], one row per gap.
+    """
+    bits, n, labels = _axis(index, level)
+    position = np.searchsorted(index["products"], product_code)
+    if position >= len(index["products"]) or index["products"][position] != product_code:
+        return pd.DataFrame(columns=["start", "end", "length"])
+
+    row = _unpack(bits[position:position + 1], 0, n)[0]
+    covered = np.flatnonzero(row)
+    if len(covered) == 0:
+        return pd.DataFrame(columns=["start", "end", "length"])
+
+    inner = row[covered[0]:covered[-1] + 1]
+    edges = np.diff(np.r_[0, (~inner).astype(np.int8), 0])
+    starts = np.flatnonzero(edges == 1) + covered[0]
+    ends = np.flatnonzero(edges == -1) + covered[0] - 1
+    return pd.DataFrame({"start": labels[starts], "end": labels[ends], "length": ends - starts + 1})
+
+
+def coverage_matrix(index, product_codes=None, level="month", start=None, end=None):
+    """
+    0/1 coverage matrix (products x periods), ready for a heatmap.
+
+    Parameters
+    ----------
+    index : dict
+        Coverage index from load_coverage_index.
+    product_codes : iterable of int, optional
+        Rows to return; codes absent from the index get an all-zero row.
+        Defaults to every product in the index.
+    level : str, optional
+        'month' (default) or 'day'.
+    start, end : str or Timestamp, optional
+        Inclusive bounds of the period axis.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Index = product codes, columns = months (Period) or trading days.
+    """
+    bits, _, labels = _axis(index, level)
+    lo, hi = _bounds(labels, start, end)
+    matrix = pd.DataFrame(
+        _unpack(bits, lo, hi).astype(float) if hi > lo else np.zeros((len(index["products"]), 0)),
+        index=index["products"],
+        columns=labels[lo:hi],
+    )
+    if product_codes is not None:
+        codes = list(dict.fromkeys(list(index["products"]) + list(product_codes)))
+        matrix = matrix.reindex(codes, fill_value=0.0)
+    return matrix
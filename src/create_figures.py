@@ -3,19 +3,34 @@ This script is used to create figures (both png and tex files) for the final rep
 """
 
 
+import os
+import time
 import pandas as pd
 from settings import config
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import warnings
 import logging
 from pull_futures_data import *
 from calc_format_futures_data import *
+from calc_continuous_futures import load_monthly_excess_returns, load_continuous_futures_data, continuous_file
+from calc_correlation import correlation_frame, ROLLING_WINDOW, rolling_correlation_file, load_rolling_return_correlation
+from coverage_index import load_coverage_index, coverage_matrix, coverage_counts
+from calc_aggregate_cube import load_settlement_cube, rollup_settlement_cube
+from downsample import downsample_series
+from product_registry import REGISTRY_FILE, product_codes, product_label, product_name
+from calc_term_structure import (product_curves, curve_segments, load_term_structure_cube, read_term_structure_cube,
+                                 cube_curves)
+from output_fingerprint import (load_product_fingerprints, output_fingerprint, read_manifest,
+                                write_manifest, is_up_to_date)
 import seaborn as sns
 import matplotlib.pyplot as plt
 from matplotlib import cm
 from matplotlib.colors import ListedColormap
 import matplotlib
 import matplotlib.dates as mdates
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
 
 
 warnings.filterwarnings("ignore", category=FutureWarning)
@@ -40,73 +55,187 @@ warnings.filterwarnings(
 DATA_DIR = Path(config("DATA_DIR"))
 OUTPUT_DIR = Path(config("OUTPUT_DIR"))
 
+# Data loaded once per process and shared with the render workers
+_SHARED = {}
 
+# Renderers that fall back to WRDS when their saved inputs are missing; they run in the
+# main process so that workers never share the parent's database connection
+WRDS_RENDERERS = {"paper_table1_replication_latex", "final_table_html"}
 
-CORRELATION_MAP = {
-    3160: "Barley (WA)",
-    289:  "Butter (02)",
-    3161: "Canola (WC)",
-    1980: "Cocoa (CC)",
-    2038: "Coffee (KC)",
-    3247: "Corn (C-)",
-    1992: "Cotton (CT)",
-    361:  "Lumber (LB)",
-    385:  "Oats (O-)",
-    2036: "Orange juice (JO)",
-    379:  "Rough rice (RR)",
-    3256: "Soybean meal (SM)",
-    396:  "Soybeans (S-)",
-    430:  "Wheat (W-)",
-    1986: "Crude oil (CL)",
-    2091: "Gasoline (RB)",
-    2029: "Heating oil (HO)",
-    2060: "Natural gas (NG)",
-    3847: "Propane (PN)",
-    2032: "Unleaded gas (HU)",
-    3250: "Feeder cattle (FC)",
-    2676: "Lean hogs (LH)",
-    2675: "Live cattle (LC)",
-    3126: "Aluminum (AL)",
-    2087: "Coal (CO)",
-    2026: "Copper (HG)",
-    2020: "Gold (GC)",
-    2065: "Palladium (PA)",
-    2074: "Platinum (PL)",
-    2108: "Silver (SI)"
-}
+# Code and manual data every renderer can reach; their content enters each output's
+# fingerprint, so an edit to a helper module or to the registry re-renders the outputs
+SRC_DIR = Path(__file__).resolve().parent
+RENDER_DEPENDENCIES = [SRC_DIR / f"{module}.py" for module in (
+    "create_figures", "pull_futures_data", "calc_format_futures_data", "calc_continuous_futures",
+    "calc_correlation", "coverage_index", "calc_aggregate_cube", "downsample", "product_registry",
+    "calc_term_structure", "columnar_store", "output_fingerprint", "settings",
+)] + [REGISTRY_FILE]
 
-PRODUCT_NAME_MAP = {
-    3160: "Barley",               
-    289:  "Butter",               
-    3161: "Canola",               
-    1980: "Cocoa",                
-    2038: "Coffee",               
-    3247: "Corn",                 
-    1992: "Cotton",               
-    361:  "Lumber",               
-    385:  "Oats",                 
-    2036: "Orange Juice",         
-    379:  "Rough Rice",           
-    3256: "Soybean Meal",         
-    396:  "Soybeans",             
-    430:  "Wheat",                
-    1986: "Crude Oil",            
-    2091: "Gasoline",             
-    2029: "Heating Oil",          
-    2060: "Natural Gas",          
-    3847: "Propane",              
-    2032: "Unleaded Gas",         
-    3250: "Feeder Cattle",        
-    2676: "Lean Hogs",            
-    2675: "Live Cattle",          
-    3126: "Aluminum",             
-    2087: "Coal",                 
-    2026: "Copper",               
-    2020: "Gold",                 
-    2065: "Palladium",            
-    2074: "Platinum",             
-    2108: "Silver"                
-}
+
+def _shared_monthly_data():
+    """
+    Daily store and its monthly reduction, loaded once per process.
+
+    Returns
+    -------
+    tuple of (pandas.DataFrame, pandas.DataFrame)
+        df_all and futures_series_to_monthly(df_all) (empty frames if no data).
+    """
+    if "monthly_df" not in _SHARED:
+        df_all = load_combined_futures_data()
+        _SHARED["df_all"] = df_all
+        _SHARED["monthly_df"] = futures_series_to_monthly(df_all) if not df_all.empty else pd.DataFrame()
+    return _SHARED["df_all"], _SHARED["monthly_df"]
+
+
+def _init_render_worker(shared):
+    """
+    Process pool initializer: non-interactive backend and the parent's loaded data.
+    """
+    matplotlib.use("Agg")
+    _SHARED.update(shared)
+
+
+def _timed_render(func_name, kwargs=None):
+    """
+    Run one figure/table function by name and return its wall time in seconds.
+    """
+    start = time.perf_counter()
+    globals()[func_name](**(kwargs or {}))
+    return func_name, time.perf_counter() - start
+
+
+def _pending_renders(outputs, force=False):
+    """
+    Group the stale outputs into render jobs.
+
+    An output is stale when its file is missing or its recorded fingerprint (data of
+    the products it depends on, renderer parameters, renderer code, the saved results
+    it reads and RENDER_DEPENDENCIES) differs from the current one. Outputs written by the same call are grouped in one job.
+
+    Returns
+    -------
+    list of dict
+        Jobs with keys 'func', 'kwargs' and 'files' (filename -> new fingerprint).
+    """
+    fingerprints = load_product_fingerprints(loader=load_combined_futures_data)
+    manifest = read_manifest()
+    jobs = {}
+    for filename, (func, kwargs, products) in outputs.items():
+        fingerprint = output_fingerprint(fingerprints, products, kwargs, func,
+                                         files=FIGURE_FILE_INPUTS.get(filename, []) + RENDER_DEPENDENCIES)
+        if not force and is_up_to_date(OUTPUT_DIR / filename, fingerprint, manifest):
+            continue
+        key = (func.__name__, repr(sorted(kwargs.items())))
+        job = jobs.setdefault(key, {"func": func.__name__, "kwargs": kwargs, "files": {}})
+        job["files"][filename] = fingerprint
+    return list(jobs.values())
+
+
+def stale_outputs(outputs=None):
+    """
+    Filenames of the outputs that are missing or whose input fingerprint changed.
+    """
+    jobs = _pending_renders(FIGURE_OUTPUTS if outputs is None else outputs)
+    return [filename for job in jobs for filename in job["files"]]
+
+
+def render_figures(outputs=None, max_workers=None, force=False):
+    """
+    Render every stale output, independent figures in parallel processes.
+
+    Outputs whose input fingerprint matches the one recorded when they were last
+    written are skipped, so a change to one product only re-renders the outputs that
+    include it. The daily store, its monthly reduction and the derived caches
+    (coverage index, settlement cube) are loaded once in the parent and handed to the
+    workers, which then only rasterize and encode. Functions that still query WRDS
+    run in the main process.
+
+    Parameters
+    ----------
+    outputs : dict, optional
+        Output filename -> (function, keyword arguments, product codes or None for
+        every product). One call may write several files. Default is FIGURE_OUTPUTS.
+    max_workers : int, optional
+        Size of the process pool (default is one per figure, capped at the CPU count).
+    force : bool, optional
+        Re-render every output regardless of fingerprints (default is False).
+
+    Returns
+    -------
+    dict
+        Output filenames of each job -> render wall time in seconds.
+    """
+    outputs = FIGURE_OUTPUTS if outputs is None else outputs
+    jobs = _pending_renders(outputs, force=force)
+    stale = {filename for job in jobs for filename in job["files"]}
+    for filename in outputs:
+        if filename in stale:
+            logging.info(f"Generating {filename}...")
+        else:
+            logging.info(f"Skipping {filename}, inputs unchanged.")
+
+    manifest = read_manifest()
+    timings = {}
+
+    def finish(job, seconds, started):
+        label = ", ".join(job["files"])
+        timings[label] = seconds
+        logging.info(f"Rendered {label} in {seconds:.2f}s")
+        for filename, fingerprint in job["files"].items():
+            path = OUTPUT_DIR / filename
+            # renderers log and swallow their errors, so only record files actually written
+            if path.exists() and path.stat().st_mtime >= started:
+                manifest[filename] = fingerprint
+
+    parallel = [job for job in jobs if job["func"] not in WRDS_RENDERERS]
+    if parallel:
+        df_all, _ = _shared_monthly_data()
+        if not df_all.empty:
+            load_coverage_index(df_all=df_all)
+            load_settlement_cube()
+
+        matplotlib.use("Agg")
+        workers = max_workers or min(len(parallel), os.cpu_count() or 1)
+        started = time.time()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker,
+                                 initargs=(_SHARED,)) as pool:
+            futures = {pool.submit(_timed_render, job["func"], job["kwargs"]): job for job in parallel}
+            for future in as_completed(futures):
+                _, seconds = future.result()
+                finish(futures[future], seconds, started)
+
+    for job in jobs:
+        if job["func"] in WRDS_RENDERERS:
+            started = time.time()
+            _, seconds = _timed_render(job["func"], job["kwargs"])
+            finish(job, seconds, started)
+
+    write_manifest(manifest)
+    return timings
+
+
+def final_table_html(time_period="paper"):
+    """
+    Writes the styled Table 1 of one time period (final_table) as final_<period>.html,
+    from the saved result.
+
+    Parameters
+    ----------
+    time_period : str, optional
+        'paper' (default) or 'current'.
+
+    Returns
+    -------
+    None
+        Writes the HTML table to OUTPUT_DIR.
+    """
+    try:
+        output_path = OUTPUT_DIR / f"final_{time_period}.html"
+        output_path.write_text(final_table(load_summary(time_period=time_period)).to_html(), encoding="utf-8")
+        logging.info(f"HTML table saved to {output_path}")
+    except Exception as e:
+        logging.error(f"An error occurred while generating the HTML table: {e}")
 
 
 def sector_settlement_summary_all_periods_latex(
@@ -130,22 +259,17 @@ def sector_settlement_summary_all_periods_latex(
     """
 
     try:
-        df_all = load_combined_futures_data()
-        if df_all.empty:
+        cube = load_settlement_cube()
+        if cube.empty:
             logging.warning("No data found from WRDS or local file.")
             return
 
-        monthly_df = futures_series_to_monthly(df_all)
-        monthly_df["Sector"] = monthly_df["product_code"].map(sector_map)
-        monthly_df = monthly_df.dropna(subset=["Sector"])
-        if monthly_df.empty:
+        if cube["Sector"].isna().all():
             logging.warning("No valid monthly data with Sectors available.")
             return
 
         agg_stats = (
-            monthly_df.groupby("Sector")["settlement"]
-            .agg(["mean", "std", "min", "max", "count"])
-            .reset_index()
+            rollup_settlement_cube(cube, by="Sector")
             .rename(
                 columns={
                     "mean": "Mean Settlement",
@@ -204,8 +328,8 @@ def paper_table1_replication_latex():
     """
     try:
         # Generate tables
-        table_paper = main_summary(time_period="paper")
-        table_current = main_summary(time_period="current")
+        table_paper = load_summary(time_period="paper")
+        table_current = load_summary(time_period="current")
 
         # Define output file paths
         output_files = {
@@ -220,6 +344,7 @@ def paper_table1_replication_latex():
 
         for filename, df in output_files.items():
             output_path = OUTPUT_DIR / filename
+            df = df.drop(columns=ANNUALIZED_COLUMNS, errors="ignore")
 
             
             # Format numbers before saving
@@ -235,7 +360,7 @@ def paper_table1_replication_latex():
 
             for col, fmt in format_dict.items():
                 if col in df.columns:
-                    df[col] = df[col].apply(lambda x: fmt.format(x))
+                    df[col] = df[col].astype("float64").apply(lambda x: fmt.format(x))
 
             df.rename(columns=column_replacements, inplace=True)
             df["Commodity"] = df["Commodity"].str.replace("#", r"\#", regex=False)
@@ -259,6 +384,8 @@ def plot_all_commodities_settlement_time_series_png(
     ),
     figure_size=(16, 9),
     legend_columns=1,
+    max_points=None,
+    downsample_method="minmax",
     output_file_name="all_commodities_settlement.png"
 ):
     """
@@ -275,6 +402,11 @@ def plot_all_commodities_settlement_time_series_png(
         Size of the figure in inches (default is (16, 9)).
     legend_columns : int, optional
         Number of columns used in the legend (default is 1).
+    max_points : int, optional
+        Points kept per commodity after shape-preserving downsampling (default is
+        PLOT_MAX_POINTS from settings; 0 plots every point).
+    downsample_method : str, optional
+        'minmax' (first/min/max/last per bucket, default) or 'lttb'.
     output_file_name : str, optional
         Filename for the saved plot.
 
@@ -285,12 +417,11 @@ def plot_all_commodities_settlement_time_series_png(
     """
 
     try:
-        df_all = load_combined_futures_data()
+        df_all, monthly_df = _shared_monthly_data()
         if df_all.empty:
             logging.warning("No data found from WRDS or local file.")
             return
 
-        monthly_df = futures_series_to_monthly(df_all)
         if monthly_df.empty:
             logging.warning("No monthly data available after processing.")
             return
@@ -316,7 +447,7 @@ def plot_all_commodities_settlement_time_series_png(
             return
 
         rename_dict = {
-            code: PRODUCT_NAME_MAP.get(code, f"Code {code}")
+            code: product_name(code)
             for code in pivot_df.columns
         }
         pivot_df.rename(columns=rename_dict, inplace=True)
@@ -338,12 +469,14 @@ def plot_all_commodities_settlement_time_series_png(
         # Setting up distinct line styles
         style_list = ["-", "--", "-.", ":", (0, (3, 5, 1, 5)), (0, (3, 1, 1, 1))]
 
+        dates = pivot_df.index.to_timestamp()  # Convert Period -> Timestamp
         for i, commodity in enumerate(commodity_names):
             color = color_list[i]
             linestyle = style_list[i % len(style_list)]
+            x_vals, y_vals = downsample_series(dates, pivot_df[commodity], max_points, downsample_method)
             ax.plot(
-                pivot_df.index.to_timestamp(),  # Convert Period -> Timestamp
-                pivot_df[commodity],
+                x_vals,
+                y_vals,
                 label=commodity,
                 color=color,
                 linestyle=linestyle,
@@ -430,6 +563,7 @@ def plot_all_commodities_settlement_time_series_png(
         # Save plot as PNG
         output_file_path = OUTPUT_DIR / output_file_name
         fig.savefig(output_file_path, dpi=300, bbox_inches="tight")
+        plt.close(fig)
 
         logging.info(f"Plot saved successfully as {output_file_path}")
 
@@ -438,6 +572,83 @@ def plot_all_commodities_settlement_time_series_png(
 
 
 
+def plot_continuous_futures_png(
+    main_title="Rolled Front-Contract Excess Return Index by Commodity",
+    nth=1,
+    roll_rule="expiry",
+    roll_days=5,
+    figure_size=(16, 9),
+    legend_columns=1,
+    max_points=None,
+    downsample_method="minmax",
+    output_file_name="continuous_front_futures.png"
+):
+    """
+    Plots the compounded excess-return index of each product's rolled Nth-contract
+    series (see build_continuous_futures) on a log scale and saves it as a PNG file.
+
+    Parameters
+    ----------
+    main_title : str, optional
+        Chart title.
+    nth : int, optional
+        Contract position followed, 1 being the front contract (default is 1).
+    roll_rule : str, optional
+        'expiry' (default), 'month_end' or 'volume'.
+    roll_days : int, optional
+        Business days before lasttrddate used by the 'expiry' rule (default is 5).
+    figure_size : tuple of (int, int), optional
+        Size of the figure in inches (default is (16, 9)).
+    legend_columns : int, optional
+        Number of columns used in the legend (default is 1).
+    max_points : int, optional
+        Points kept per commodity after shape-preserving downsampling (default is
+        PLOT_MAX_POINTS from settings; 0 plots every point).
+    downsample_method : str, optional
+        'minmax' (first/min/max/last per bucket, default) or 'lttb'.
+    output_file_name : str, optional
+        Filename for the saved plot.
+
+    Returns
+    -------
+    None
+        Saves the generated chart as a PNG image.
+    """
+    try:
+        continuous_df = load_continuous_futures_data(nth=nth, roll_rule=roll_rule, roll_days=roll_days)
+        if continuous_df.empty:
+            logging.warning("No continuous futures series available.")
+            return
+
+        plt.rcParams["font.family"] = "Times New Roman"
+        plt.rcParams["font.size"] = 11
+        fig, ax = plt.subplots(figsize=figure_size)
+
+        codes = sorted(continuous_df["product_code"].unique())
+        cmap = cm.get_cmap("tab20" if len(codes) <= 20 else "nipy_spectral", len(codes))
+        for i, (code, series) in enumerate(continuous_df.groupby("product_code", sort=True)):
+            x_vals, y_vals = downsample_series(series["date_"], series["cum_index"], max_points, downsample_method)
+            ax.plot(x_vals, y_vals, label=product_name(code), color=cmap(i), linewidth=1.5, alpha=0.8)
+
+        ax.set_yscale("log")
+        ax.axhline(1.0, color="black", linewidth=0.8)
+        ax.grid(True, linestyle="--", alpha=0.5)
+        ax.set_ylabel(f"Index of contract {nth}, rolled by {roll_rule} (start = 1)", fontname="Georgia", fontsize=16)
+        leg = ax.legend(title="Commodity", bbox_to_anchor=(1.02, 1), loc="upper left", ncol=legend_columns,
+                        frameon=True, edgecolor="black", facecolor="white", prop={"size": 11})
+        leg.set_title(leg.get_title().get_text(), prop={"size": 12, "weight": "bold"})
+        fig.suptitle(main_title, fontname="Georgia", fontsize=22, fontweight="bold")
+
+        output_file_path = OUTPUT_DIR / output_file_name
+        fig.savefig(output_file_path, dpi=300, bbox_inches="tight")
+        plt.close(fig)
+
+        logging.info(f"Plot saved successfully as {output_file_path}")
+
+    except Exception as e:
+        logging.error(f"An error occurred while generating the plot: {e}")
+
+
 def plot_commodity_correlation_heatmap_pairwise_png(
     main_title="Commodity Correlation Heatmap (Settlement Prices)",
     caption_text=(""
@@ -447,6 +658,10 @@ def plot_commodity_correlation_heatmap_pairwise_png(
     annot=True,
     min_coverage=200,
     exclude_codes=None,
+    method="pearson",
+    use_returns=False,
+    start=None,
+    end=None,
     output_file_name="commodity_correlation_heatmap.png"
 ):
     """
@@ -467,6 +682,13 @@ def plot_commodity_correlation_heatmap_pairwise_png(
         Minimum monthly observations required (default is 200).
     exclude_codes : set of int, optional
         Commodity codes to exclude from correlation.
+    method : str, optional
+        'pearson' (default) or 'spearman' pairwise-complete correlation.
+    use_returns : bool, optional
+        Correlate monthly excess returns instead of settlement price levels (default is False).
+    start, end : str or Timestamp, optional
+        Date window of the months correlated; coverage is counted inside it (default is
+        all of the store), as in calc_analysis.plot_commodity_correlation_heatmap_pairwise.
     output_file_name : str, optional
         Filename for the saved plot.
 
@@ -480,48 +702,48 @@ def plot_commodity_correlation_heatmap_pairwise_png(
         if exclude_codes is None:
             exclude_codes = set()
 
-        df_all = load_combined_futures_data()
+        df_all, monthly_df = _shared_monthly_data()
         if df_all.empty:
             logging.warning("No data found from WRDS or local file.")
             return
 
-        monthly_df = futures_series_to_monthly(df_all)
         if monthly_df.empty:
             logging.warning("No monthly data after converting from daily.")
             return
 
-        coverage_df = (
-            monthly_df.groupby("product_code")["obs_period"]
-            .nunique()
-            .reset_index(name="monthly_count")
-        )
-        drop_codes = coverage_df.loc[coverage_df["monthly_count"] < min_coverage, "product_code"]
+        if start is not None or end is not None:
+            first = pd.Timestamp(start).to_period("M") if start is not None else monthly_df["obs_period"].min()
+            last = pd.Timestamp(end).to_period("M") if end is not None else monthly_df["obs_period"].max()
+            monthly_df = monthly_df[monthly_df["obs_period"].between(first, last)]
+
+        monthly_count = coverage_counts(load_coverage_index(df_all=df_all), start, end)
+        drop_codes = monthly_count.index[monthly_count < min_coverage]
         drop_codes = set(drop_codes).union(exclude_codes)
         monthly_df = monthly_df[~monthly_df["product_code"].isin(drop_codes)]
         if monthly_df.empty:
             logging.warning(f"All commodities were dropped (coverage < {min_coverage} or exclude_codes used).")
             return
 
-        monthly_df["date_dt"] = monthly_df["obs_period"].apply(lambda p: p.asfreq("M").to_timestamp())
-        pivot_df = monthly_df.pivot_table(
-            index="date_dt",
-            columns="product_code",
-            values="settlement",
-            aggfunc="mean"
-        )
-        if pivot_df.empty:
+        if use_returns:
+            corr_source = load_monthly_excess_returns()
+            corr_source = corr_source[
+                corr_source["product_code"].isin(monthly_df["product_code"].unique())
+                & corr_source["obs_period"].isin(monthly_df["obs_period"].unique())
+            ]
+            value_col = "excess_return"
+        else:
+            corr_source, value_col = monthly_df, "settlement"
+
+        corr_matrix, _ = correlation_frame(corr_source, value_col=value_col, method=method)
+        if corr_matrix.empty:
             logging.warning("After pivot, the DataFrame is empty.")
             return
 
-        pivot_df = pivot_df.resample("M").mean().sort_index()
-
         rename_dict = {
-            code: CORRELATION_MAP.get(code, f"Code {code}")
-            for code in pivot_df.columns
+            code: product_label(code)
+            for code in corr_matrix.columns
         }
-        pivot_df.rename(columns=rename_dict, inplace=True)
-
-        corr_matrix = pivot_df.corr(method="pearson")
+        corr_matrix = corr_matrix.rename(index=rename_dict, columns=rename_dict)
         if corr_matrix.isna().all().all():
             logging.warning("All correlations are NaN after filtering.")
             return
@@ -612,6 +834,7 @@ def plot_commodity_correlation_heatmap_pairwise_png(
         # Save plot as PNG
         output_file_path = OUTPUT_DIR / output_file_name
         fig.savefig(output_file_path, dpi=300, bbox_inches="tight")
+        plt.close(fig)
 
         logging.info(f"Correlation heatmap saved successfully as {output_file_path}")
 
@@ -620,6 +843,67 @@ def plot_commodity_correlation_heatmap_pairwise_png(
 
 
 
+def plot_rolling_correlation_png(
+    main_title="Rolling Cross-Commodity Correlation of Monthly Excess Returns",
+    window=ROLLING_WINDOW,
+    figure_size=(16, 9),
+    output_file_name="rolling_commodity_correlation.png"
+):
+    """
+    Plots the average and interquartile range of the pairwise correlations in each
+    rolling window, read from the saved correlation tensor (rebuilt from the monthly
+    excess-return panel if it is missing or older than its inputs), and saves the plot
+    as a PNG file.
+
+    Parameters
+    ----------
+    main_title : str, optional
+        Chart title.
+    window : int, optional
+        Window length in months of the tensor (default is ROLLING_WINDOW).
+    figure_size : tuple of (int, int), optional
+        Size of the figure in inches (default is (16, 9)).
+    output_file_name : str, optional
+        Filename for the saved plot.
+
+    Returns
+    -------
+    None
+        Saves the generated chart as a PNG image.
+    """
+    try:
+        upper, index, products = load_rolling_return_correlation(window, packed=True)
+
+        rows, cols = np.triu_indices(len(products))
+        pair_corr = upper[:, rows != cols].astype(float)
+        defined = ~np.isnan(pair_corr).all(axis=1)
+        if pair_corr.shape[1] == 0 or not defined.any():
+            logging.warning("No rolling correlations available.")
+            return
+        pair_corr, dates = pair_corr[defined], index[defined].to_timestamp()
+
+        plt.rcParams["font.family"] = "Times New Roman"
+        plt.rcParams["font.size"] = 11
+        fig, ax = plt.subplots(figsize=figure_size)
+        ax.fill_between(dates, np.nanpercentile(pair_corr, 25, axis=1), np.nanpercentile(pair_corr, 75, axis=1),
+                        color="tab:blue", alpha=0.25, label="Interquartile range of pairs")
+        ax.plot(dates, np.nanmean(pair_corr, axis=1), color="tab:blue", linewidth=2, label="Average pair")
+        ax.axhline(0.0, color="black", linewidth=0.8)
+        ax.grid(True, linestyle="--", alpha=0.5)
+        ax.set_ylabel(f"Correlation over the trailing {window} months", fontname="Georgia", fontsize=16)
+        ax.legend(loc="upper left", frameon=True, edgecolor="black", facecolor="white")
+        fig.suptitle(main_title, fontname="Georgia", fontsize=22, fontweight="bold")
+
+        output_file_path = OUTPUT_DIR / output_file_name
+        fig.savefig(output_file_path, dpi=300, bbox_inches="tight")
+        plt.close(fig)
+
+        logging.info(f"Plot saved successfully as {output_file_path}")
+
+    except Exception as e:
+        logging.error(f"An error occurred while generating the plot: {e}")
+
+
 def plot_commodity_coverage_heatmap_png(
     main_title="Coverage Heatmap: Monthly Data",
     caption_text=(""),
@@ -659,41 +943,17 @@ def plot_commodity_coverage_heatmap_png(
     """
 
     try:
-        # Adds broilers to show that it is missing
-        CORRELATION_MAP[19] = "Broilers (BR)"
-
-        df_all = load_combined_futures_data()
-        if df_all.empty:
+        coverage = load_coverage_index(loader=load_combined_futures_data)
+        if len(coverage["products"]) == 0:
             logging.warning("No data found from WRDS or local file.")
             return
 
-        monthly_df = futures_series_to_monthly(df_all)
-        if monthly_df.empty:
-            logging.warning("After converting daily → monthly, no data remains.")
-            return
-
-        coverage = monthly_df[["product_code", "obs_period"]].drop_duplicates()
-        coverage["has_data"] = 1
-
-        coverage_pivot = coverage.pivot(
-            index="product_code",
-            columns="obs_period",
-            values="has_data"
-        ).fillna(0)
-
-        coverage_pivot = coverage_pivot.reindex(
-            sorted(coverage_pivot.columns),
-            axis=1
-        )
-
-        all_defined_codes = set(CORRELATION_MAP.keys())
-        pivot_codes = set(coverage_pivot.index)
-        missing_codes = all_defined_codes - pivot_codes
-        for code in missing_codes:
-            coverage_pivot.loc[code] = 0
+        coverage_pivot = coverage_matrix(coverage, product_codes=product_codes(include_disabled=True))
+        # keep only the months in which at least one commodity has data
+        coverage_pivot = coverage_pivot.loc[:, coverage_pivot.any(axis=0)]
 
         new_index = [
-            CORRELATION_MAP.get(code, f"Code {code}")
+            product_label(code)
             for code in coverage_pivot.index
         ]
         coverage_pivot.index = new_index
@@ -803,6 +1063,7 @@ def plot_commodity_coverage_heatmap_png(
         # Save plot as PNG
         output_file_path = OUTPUT_DIR / output_file_name
         fig.savefig(output_file_path, dpi=300, bbox_inches="tight")
+        plt.close(fig)
 
         logging.info(f"Coverage heatmap saved successfully as {output_file_path}")
 
@@ -810,62 +1071,102 @@ def plot_commodity_coverage_heatmap_png(
         logging.error(f"An error occurred while generating the heatmap: {e}")
 
 
-def plot_sample_future_curves_basis_png(product_contract_codes=[1986, 2060], time_period="paper"):
+def _draw_curves(ax, segments, colors=None, markers=True, linewidth=1.5):
+    """
+    Draw the output of curve_segments on ax as a single LineCollection.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        Target axes.
+    segments : dict
+        Output of curve_segments.
+    colors : list, optional
+        One color per curve (default cycles through the axes color cycle).
+    markers : bool, optional
+        Also mark every point (one scatter call for all curves, default is True).
+    linewidth : float, optional
+        Line width of the curves (default is 1.5).
+
+    Returns
+    -------
+    list
+        The RGBA color of each curve, for building legends.
+    """
+    x = mdates.date2num(segments["x"].ravel()).reshape(segments["x"].shape)
+    y = segments["y"]
+    if colors is None:
+        cycle = plt.rcParams["axes.prop_cycle"].by_key()["color"]
+        colors = [cycle[i % len(cycle)] for i in range(len(y))]
+    colors = matplotlib.colors.to_rgba_array(colors)
+
+    ax.add_collection(LineCollection(np.stack([x, y], axis=-1), colors=colors, linewidths=linewidth),
+                      autolim=False)
+    finite = np.isfinite(y)
+    if finite.any():
+        ax.update_datalim(np.column_stack([x[finite], y[finite]]))
+    if markers:
+        point_colors = np.repeat(colors, y.shape[1], axis=0)
+        ax.scatter(x.ravel(), y.ravel(), c=point_colors, s=20, zorder=3)
+    ax.xaxis_date()
+    ax.autoscale_view()
+    return list(colors)
+
+
+def plot_sample_future_curves_basis_png(product_contract_codes=[1986, 2060], time_period="paper", curve_rows=(30, 40)):
     """
     Generates and saves PNG figures of sample future curves basis for given product contract codes.
-    Parameters:
-    product_contract_codes (list): List of product contract codes to generate figures for. Default is [1986, 2060].
-    time_period (str): Time period for fetching contract information and data. Default is "paper".
-    Returns:
+
+    Parameters
+    ----------
+    product_contract_codes : list of int, optional
+        Products to plot, one figure each (default is [1986, 2060]).
+    time_period : str, optional
+        'paper' (default) or 'current' sample of observation months.
+    curve_rows : tuple of (int, int), optional
+        Range of observation months (positions within the sample) to draw (default is (30, 40)).
+
+    Returns
+    -------
     None
-    The function fetches contract information and future contract data from WRDS for the given product contract codes
-    and time period. It processes the data to extract monthly series and the first through twelfth contracts. It then
-    plots the sample future curves basis for a subset of the data and saves the figures as PNG files in the specified
-    output directory.
-    Raises:
-    Exception: If an error occurs during the data fetching, processing, or plotting steps, an error message is logged.
+        Saves sample_future_curves_basis_{code}.png for every product with data.
     """
 
     figure_size = (16, 9)
 
     try:
-        output_files = {
-            f"sample_future_curves_basis_{product_contract_codes[0]}.png": product_contract_codes[0],
-            f"sample_future_curves_basis_{product_contract_codes[1]}.png": product_contract_codes[1]
-        }
-
-        for filename, contract_code in output_files.items():
+        _, monthly_df = _shared_monthly_data()
+        if monthly_df.empty:
+            logging.warning("No data found from WRDS or local file.")
+            return
+        start, end = resolve_window(time_period)
 
-            info_df = fetch_wrds_contract_info(contract_code, time_period)
-            if info_df.empty:
-                return None
-            futcodes_contrdates = info_df.set_index("futcode")["contrdate"].to_dict()
-            data_contracts = fetch_wrds_fut_contract(futcodes_contrdates, time_period)
-            if data_contracts.empty:
-                return None
-            
-            monthly_df = futures_series_to_monthly(data_contracts)
-            first_through_12th_contracts_df = extract_first_through_12th_contracts(monthly_df)
+        for contract_code in product_contract_codes:
+            curves_df = product_curves(monthly_df, contract_code, start, end)
+            if curves_df.empty:
+                logging.warning(f"No futures curves available for product {contract_code}.")
+                continue
+            segments = curve_segments(curves_df.iloc[curve_rows[0]:curve_rows[1]])
 
             fig, ax = plt.subplots(figsize=figure_size)
+            colors = _draw_curves(ax, segments)
 
+            handles = [
+                Line2D([], [], color=color, marker="o", label=f"Obs. Month: {period}; Basis: {basis:.2f}")
+                for color, period, basis in zip(colors, segments["obs_period"], segments["basis"])
+            ]
+            ax.legend(handles=handles, loc='upper right')
 
-            for idx, row in first_through_12th_contracts_df.iloc[30:40].iterrows():
-                basis_val = (np.log(row.values[-1]) - np.log(row.values[0])) / (len(row) - 1) * 100
-                x_vals = [(idx + i).to_timestamp() for i in range(len(row))] 
-                ax.plot(x_vals, row.values, marker='o', label=f"Obs. Month: {idx}; Basis: {basis_val:.2f}")
-
-            ax.legend(loc='upper right')
-            
             ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m'))
             plt.xticks(rotation=45)
 
-            ax.set_title(f"Sample Future Curves Basis - {info_df['contrname'].iloc[0]}")
+            ax.set_title(f"Sample Future Curves Basis - {product_name(contract_code)}")
             ax.set_xlabel("Observation Month", fontsize=14)
             ax.set_ylabel("Settlement Price", fontsize=14)
 
-            output_file_path = OUTPUT_DIR / filename
+            output_file_path = OUTPUT_DIR / f"sample_future_curves_basis_{contract_code}.png"
             fig.savefig(output_file_path, dpi=300, bbox_inches="tight")
+            plt.close(fig)
 
             logging.info(f"Sample futures curve figure saved successfully as {output_file_path}")
 
@@ -873,23 +1174,132 @@ def plot_sample_future_curves_basis_png(product_contract_codes=[1986, 2060], tim
         logging.error(f"An error occurred while generating the sample futures curve figure: {e}")
 
 
+def _render_atlas_batch(batch, output_dir, start=None, end=None, ncols=6, panel_size=(4, 3)):
+    """
+    Render one atlas page per product of the batch: a panel per year holding every
+    curve observed in that year, colored by observation month.
+
+    Parameters
+    ----------
+    batch : list of int
+        Product codes. Their curves are read from the memory-mapped term-structure
+        cube, whose pages every worker shares.
+    output_dir : pathlib.Path
+        Directory receiving term_structure_atlas_{code}.png.
+    start, end : str or Period, optional
+        Inclusive monthly bounds on the observation month.
+
+    Returns
+    -------
+    list of pathlib.Path
+        Written files.
+    """
+    cube = read_term_structure_cube()
+    month_colors = plt.get_cmap("viridis", 12)
+    written = []
+    for product_code in batch:
+        curves_df = cube_curves(cube, product_code, start, end)
+        years = np.unique(curves_df.index.year)
+        n_cols = min(ncols, len(years))
+        n_rows = int(np.ceil(len(years) / n_cols))
+        fig, axes = plt.subplots(n_rows, n_cols, squeeze=False,
+                                 figsize=(panel_size[0] * n_cols, panel_size[1] * n_rows))
+        for ax, year in zip(axes.flat, years):
+            year_curves = curves_df[curves_df.index.year == year]
+            colors = month_colors(year_curves.index.month - 1)
+            _draw_curves(ax, curve_segments(year_curves), colors=colors, markers=False, linewidth=1.0)
+            locator = mdates.AutoDateLocator(maxticks=5)
+            ax.xaxis.set_major_locator(locator)
+            ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+            ax.set_title(str(year), fontsize=10)
+            ax.tick_params(labelsize=7)
+        for ax in axes.flat[len(years):]:
+            ax.set_visible(False)
+
+        fig.suptitle(f"Term structure atlas - {product_name(product_code)}")
+        fig.tight_layout()
+        output_path = Path(output_dir) / f"term_structure_atlas_{product_code}.png"
+        fig.savefig(output_path, dpi=150)
+        plt.close(fig)
+        written.append(output_path)
+    return written
+
+
+def plot_term_structure_atlas_png(product_list=None, start=None, end=None, batch_size=4,
+                                  max_workers=None, output_subdir="term_structure_atlas"):
+    """
+    Renders the full term-structure atlas: for every product, one page with a panel of
+    futures curves per year. Pages are rendered in parallel batches, each worker reading
+    curves from the memory-mapped term-structure cube (built first if stale).
+
+    Parameters
+    ----------
+    product_list : iterable of int, optional
+        Products to include (default is every product in the term-structure cube).
+    start, end : str or Period, optional
+        Inclusive monthly bounds on the observation month.
+    batch_size : int, optional
+        Products rendered per worker task (default is 4).
+    max_workers : int, optional
+        Size of the process pool (default is the CPU count).
+    output_subdir : str, optional
+        Subdirectory of OUTPUT_DIR receiving the pages.
+
+    Returns
+    -------
+    list of pathlib.Path
+        Written pages.
+    """
+    cube = load_term_structure_cube()
+    if product_list is None:
+        product_list = cube["products"]
+    product_list = [int(code) for code in product_list if not cube_curves(cube, code, start, end).empty]
+    batches = [product_list[i:i + batch_size] for i in range(0, len(product_list), batch_size)]
+    if not batches:
+        logging.warning("No futures curves available for the atlas.")
+        return []
+
+    output_dir = OUTPUT_DIR / output_subdir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    written = []
+    with ProcessPoolExecutor(max_workers=max_workers or min(len(batches), os.cpu_count() or 1),
+                             initializer=_init_render_worker, initargs=({},)) as pool:
+        n = len(batches)
+        for pages in pool.map(_render_atlas_batch, batches, [output_dir] * n, [start] * n, [end] * n):
+            written.extend(pages)
+    logging.info(f"Rendered {len(written)} atlas pages in {time.perf_counter() - started:.2f}s")
+    return written
+
+
+# Output file -> (renderer, keyword arguments, products it depends on; None = every product).
+# Table 1 is pulled from WRDS per product; the local store stands in for its data. The
+# HTML tables only read the saved Table 1 result of their period (FIGURE_FILE_INPUTS).
+FIGURE_OUTPUTS = {
+    "sector_settlement_summary.tex": (sector_settlement_summary_all_periods_latex, {}, None),
+    "paper_table1_replication_paper.tex": (paper_table1_replication_latex, {}, None),
+    "paper_table1_replication_current.tex": (paper_table1_replication_latex, {}, None),
+    "final_paper.html": (final_table_html, {"time_period": "paper"}, []),
+    "final_current.html": (final_table_html, {"time_period": "current"}, []),
+    "all_commodities_settlement.png": (plot_all_commodities_settlement_time_series_png, {}, None),
+    "continuous_front_futures.png": (plot_continuous_futures_png, {}, None),
+    "commodity_correlation_heatmap.png": (plot_commodity_correlation_heatmap_pairwise_png, {}, None),
+    "rolling_commodity_correlation.png": (plot_rolling_correlation_png, {}, None),
+    "commodity_coverage_heatmap.png": (plot_commodity_coverage_heatmap_png, {}, product_codes(include_disabled=True)),
+    "sample_future_curves_basis_1986.png": (plot_sample_future_curves_basis_png, {"product_contract_codes": [1986]}, [1986]),
+    "sample_future_curves_basis_2060.png": (plot_sample_future_curves_basis_png, {"product_contract_codes": [2060]}, [2060]),
+}
+
+# Saved results an output is built from, beyond the daily store
+FIGURE_FILE_INPUTS = {
+    "paper_table1_replication_paper.tex": [summary_file("paper"), summary_file("current")],
+    "paper_table1_replication_current.tex": [summary_file("paper"), summary_file("current")],
+    "final_paper.html": [summary_file("paper")],
+    "final_current.html": [summary_file("current")],
+    "continuous_front_futures.png": [continuous_file()],
+    "rolling_commodity_correlation.png": [rolling_correlation_file()],
+}
+
+
 if __name__ == "__main__":
-    # Define expected output files
-    output_files = {
-        "sector_settlement_summary.tex": sector_settlement_summary_all_periods_latex,
-        "paper_table1_replication_paper.tex": paper_table1_replication_latex,
-        "paper_table1_replication_current.tex": paper_table1_replication_latex,
-        "all_commodities_settlement.png": plot_all_commodities_settlement_time_series_png,
-        "commodity_correlation_heatmap.png": plot_commodity_correlation_heatmap_pairwise_png,
-        "commodity_coverage_heatmap.png": plot_commodity_coverage_heatmap_png,
-        "sample_future_curves_basis_1986.png": plot_sample_future_curves_basis_png,
-        "sample_future_curves_basis_2060.png": plot_sample_future_curves_basis_png
-    }
-
-    for filename, func in output_files.items():
-        output_path = OUTPUT_DIR / filename
-        if not output_path.exists():
-            logging.info(f"Generating {filename}...")
-            func()  
-        else:
-            logging.info(f"Skipping {filename}, already exists.")
\ No newline at end of file
+    render_figures()
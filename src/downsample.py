@@ -0,0 +1,137 @@
+""" Shape-preserving downsampling of dense time series before they are handed to matplotlib,
+so that daily plots of the full universe stay fast without visibly changing the figure"""
+
+import numpy as np
+import pandas as pd
+from settings import config
+
+PLOT_MAX_POINTS = config("PLOT_MAX_POINTS")
+DOWNSAMPLE_METHODS = ("minmax", "lttb")
+
+
+def minmax_indices(y, n_buckets):
+    """
+    Indices of the first, minimum, maximum and last point of each of n_buckets equal
+    buckets. With one bucket per pixel column the drawn line covers exactly the same
+    pixels as the full series.
+
+    Parameters
+    ----------
+    y : numpy.ndarray
+        Values without NaN.
+    n_buckets : int
+        Number of buckets.
+
+    Returns
+    -------
+    numpy.ndarray
+        Sorted unique indices into y.
+    """
+    n = len(y)
+    bucket = (np.arange(n) * n_buckets) // n
+    order = np.lexsort((y, bucket))
+    starts = np.flatnonzero(np.r_[True, bucket[order][1:] != bucket[order][:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    first = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    last = np.r_[first[1:], n] - 1
+    return np.unique(np.concatenate([order[starts], order[ends], first, last]))
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets selection of n_out points.
+
+    The first and last points are kept; every bucket in between keeps the point that
+    forms the largest triangle with the point kept in the previous bucket and the mean
+    of the next bucket.
+
+    Parameters
+    ----------
+    x, y : numpy.ndarray
+        Coordinates (float, increasing x) without NaN.
+    n_out : int
+        Number of points to keep (at least 3).
+
+    Returns
+    -------
+    numpy.ndarray
+        Sorted indices into x and y.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        next_lo, next_hi = hi, edges[b + 2] if b + 2 < len(edges) else n
+        mean_x = x[next_lo:next_hi].mean()
+        mean_y = y[next_lo:next_hi].mean()
+        area = np.abs(
+            (x[previous] - mean_x) * (y[lo:hi] - y[previous])
+            - (x[previous] - x[lo:hi]) * (mean_y - y[previous])
+        )
+        previous = lo + int(np.argmax(area))
+        keep[b + 1] = previous
+    return keep
+
+
+def downsample_series(x, y, max_points=None, method="minmax"):
+    """
+    Reduce one series to about max_points points while keeping its visual shape.
+
+    Runs of valid values are downsampled separately and their budgets are shared in
+    proportion to their length; a NaN is kept between runs so the plotted line still
+    breaks at missing data.
+
+    Parameters
+    ----------
+    x : array-like
+        Increasing x values (numbers, datetimes or a PeriodIndex).
+    y : array-like
+        Values, NaN where missing.
+    max_points : int, optional
+        Target number of points (default is PLOT_MAX_POINTS from settings). 0 or None
+        resolved to 0 disables downsampling.
+    method : str, optional
+        'minmax' (default; first/min/max/last per bucket) or 'lttb'.
+
+    Returns
+    -------
+    tuple of (numpy.ndarray, numpy.ndarray)
+        The kept x and y values, in the input's x type.
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method {method!r}; expected one of {DOWNSAMPLE_METHODS}")
+    if max_points is None:
+        max_points = PLOT_MAX_POINTS
+    if isinstance(x, pd.PeriodIndex):
+        x = x.to_timestamp()
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    valid = ~np.isnan(y)
+    if not max_points or valid.sum() <= max_points:
+        return x, y
+
+    x_num = x.astype("datetime64[ns]").astype(np.int64).astype(float) if np.issubdtype(x.dtype, np.datetime64) else x.astype(float)
+    edges = np.diff(np.r_[0, valid.astype(np.int8), 0])
+    run_starts, run_ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    n_valid = valid.sum()
+
+    kept = []
+    for lo, hi in zip(run_starts, run_ends):
+        budget = max(2, int(round(max_points * (hi - lo) / n_valid)))
+        if hi - lo <= budget:
+            idx = np.arange(hi - lo)
+        elif method == "lttb":
+            idx = lttb_indices(x_num[lo:hi], y[lo:hi], budget)
+        else:
+            idx = minmax_indices(y[lo:hi], max(1, budget // 4))
+        kept.append(lo + idx)
+        if hi < len(y):
+            kept.append(np.array([hi]))  # first NaN after the run
+    kept = np.concatenate(kept)
+    return x[kept], y[kept]
@@ -0,0 +1,155 @@
+""" Opt-in counters and timers for the hot paths of the pipeline (WRDS queries, contract
+date parsing, the maturity pivot, basis and return statistics).
+
+Enabled with INSTRUMENTATION=True in .env or the environment. When disabled, `timed`
+returns the function it decorates unchanged and `timer`, `count` and `count_frame` do
+nothing, so the instrumented code runs exactly as before. When enabled, the registry is written to
+OUTPUT_DIR/instrumentation.json at exit (or on demand with `dump`)"""
+
+import atexit
+import functools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from settings import config
+
+ENABLED = config("INSTRUMENTATION")
+OUTPUT_DIR = Path(config("OUTPUT_DIR"))
+INSTRUMENTATION_FILE = OUTPUT_DIR / "instrumentation.json"
+
+_lock = threading.Lock()
+_counters = {}
+_timers = {}
+
+
+def _record_time(name, seconds):
+    """
+    Add one call of `seconds` to the timer `name`.
+    """
+    with _lock:
+        calls, total, longest = _timers.get(name, (0, 0.0, 0.0))
+        _timers[name] = (calls + 1, total + seconds, max(longest, seconds))
+
+
+if ENABLED:
+    def count(name, n=1):
+        """
+        Add n to the counter `name` (e.g. rows returned by WRDS).
+        """
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+    def count_frame(name, df):
+        """
+        Add a frame's rows and in-memory bytes to the counters `name.rows` and `name.bytes`.
+        """
+        count(f"{name}.rows", len(df))
+        count(f"{name}.bytes", int(df.memory_usage(deep=True).sum()))
+else:
+    def count(name, n=1):
+        """
+        Disabled: does nothing.
+        """
+
+    def count_frame(name, df):
+        """
+        Disabled: does nothing (the frame's size is not even computed).
+        """
+
+
+@contextmanager
+def _timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record_time(name, time.perf_counter() - start)
+
+
+_NULL_TIMER = nullcontext()
+
+
+def timer(name):
+    """
+    Context manager timing its block under `name`.
+    """
+    return _timer(name) if ENABLED else _NULL_TIMER
+
+
+def timed(name=None):
+    """
+    Decorator timing every call of a function under `name` (default is the function's
+    qualified name). Returns the function itself when instrumentation is disabled.
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record_time(label, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    """
+    Current counters and timers.
+
+    Returns
+    -------
+    dict
+        {'counters': {name: value}, 'timers': {name: {'calls', 'total_s', 'mean_s', 'max_s'}}}
+    """
+    with _lock:
+        timers = {
+            name: {"calls": calls, "total_s": total, "mean_s": total / calls, "max_s": longest}
+            for name, (calls, total, longest) in sorted(_timers.items())
+        }
+        return {"counters": dict(sorted(_counters.items())), "timers": timers}
+
+
+def reset():
+    """
+    Clear every counter and timer.
+    """
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+
+
+def dump(path=INSTRUMENTATION_FILE):
+    """
+    Write the registry as JSON and log a one-line summary per timer.
+
+    Returns
+    -------
+    pathlib.Path
+        The written file.
+    """
+    data = snapshot()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=1))
+    for name, t in data["timers"].items():
+        logging.info(f"{name}: {t['calls']} calls, {t['total_s']:.3f}s total, {t['max_s']:.3f}s max")
+    for name, value in data["counters"].items():
+        logging.info(f"{name}: {value}")
+    return path
+
+
+def _dump_at_exit():
+    if _counters or _timers:
+        dump()
+
+
+if ENABLED:
+    atexit.register(_dump_at_exit)
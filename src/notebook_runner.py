@@ -0,0 +1,170 @@
+""" Executes the project notebooks concurrently, once per change of their source or upstream
+data, and exports HTML and PDF from that single executed copy"""
+
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from settings import config
+from output_fingerprint import (load_product_fingerprints, output_fingerprint, read_manifest,
+                                write_manifest, is_up_to_date)
+from product_registry import REGISTRY_FILE, product_codes
+from pull_futures_data import product_data_file
+from calc_format_futures_data import product_summary_file
+
+BASE_DIR = Path(config("BASE_DIR"))
+DATA_DIR = Path(config("DATA_DIR"))
+OUTPUT_DIR = Path(config("OUTPUT_DIR"))
+NOTEBOOK_DIR = BASE_DIR / "notebooks"
+EXECUTED_DIR = OUTPUT_DIR / "notebooks"
+# kept apart from the figure manifest so both tasks can run at the same time
+NOTEBOOK_MANIFEST = EXECUTED_DIR / "notebook_fingerprints.json"
+
+# Pipeline artifacts the notebooks read, beyond the daily store itself
+NOTEBOOK_INPUTS = [
+    DATA_DIR / "clean_futures_paper.parquet",
+    DATA_DIR / "clean_futures_current.parquet",
+    DATA_DIR / "final_paper.parquet",
+    DATA_DIR / "final_current.parquet",
+]
+TIME_PERIODS = ["paper", "current"]
+# Project modules the notebooks import, directly or through calc_analysis' star imports
+SRC_DIR = Path(__file__).resolve().parent
+NOTEBOOK_MODULES = [SRC_DIR / f"{module}.py" for module in (
+    "calc_analysis", "pull_futures_data", "calc_format_futures_data", "calc_continuous_futures",
+    "calc_correlation", "coverage_index", "calc_aggregate_cube", "downsample", "product_registry",
+    "columnar_store", "settings",
+)]
+EXPORT_FORMATS = {
+    "html": ("html", ".html"),
+    "pdf": ("webpdf --allow-chromium-download", ".pdf"),
+}
+
+
+def executed_notebook(name):
+    """
+    Location of the executed copy of a notebook.
+    """
+    return EXECUTED_DIR / f"{name}.ipynb"
+
+
+def notebook_inputs():
+    """
+    Every upstream file the notebooks read: NOTEBOOK_INPUTS, each registered product's
+    pulled data and Table 1 row (futures_* and summary_* under products/), the
+    product registry itself and the project modules they import.
+    """
+    products = [
+        path(code, time_period)
+        for time_period in TIME_PERIODS for code in product_codes(time_period)
+        for path in (product_data_file, product_summary_file)
+    ]
+    return NOTEBOOK_INPUTS + products + [REGISTRY_FILE] + NOTEBOOK_MODULES
+
+
+def notebook_fingerprint(name):
+    """
+    Fingerprint of a notebook's source together with every upstream artifact it reads.
+    """
+    fingerprints = load_product_fingerprints()
+    return output_fingerprint(fingerprints, files=[NOTEBOOK_DIR / f"{name}.ipynb"] + notebook_inputs())
+
+
+def stale_notebooks(names, formats=("html", "pdf")):
+    """
+    Notebooks whose executed copy or exports are missing, or whose executed copy was
+    produced from other inputs.
+    """
+    manifest = read_manifest(NOTEBOOK_MANIFEST)
+    stale = []
+    for name in names:
+        exports = [OUTPUT_DIR / f"{name}{EXPORT_FORMATS[fmt][1]}" for fmt in formats]
+        fresh = is_up_to_date(executed_notebook(name), notebook_fingerprint(name), manifest)
+        if not fresh or not all(path.exists() for path in exports):
+            stale.append(name)
+    return stale
+
+
+def _run(command):
+    """
+    Run a shell command, raising with its output if it fails.
+    """
+    result = subprocess.run(command, shell=True, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Command failed: {command}\n{result.stderr}")
+
+
+def execute_notebook(name, formats=("html", "pdf")):
+    """
+    Execute one notebook into EXECUTED_DIR, then export it to every format without
+    executing it again.
+
+    Returns
+    -------
+    list of pathlib.Path
+        The executed notebook and its exports.
+    """
+    EXECUTED_DIR.mkdir(parents=True, exist_ok=True)
+    source = NOTEBOOK_DIR / f"{name}.ipynb"
+    _run(f"jupyter nbconvert --execute --to notebook --output-dir={EXECUTED_DIR} {source}")
+
+    written = [executed_notebook(name)]
+    for fmt in formats:
+        exporter, suffix = EXPORT_FORMATS[fmt]
+        _run(f"jupyter nbconvert --to {exporter} --output-dir={OUTPUT_DIR} {executed_notebook(name)}")
+        written.append(OUTPUT_DIR / f"{name}{suffix}")
+    return written
+
+
+def run_notebooks(names, formats=("html", "pdf"), max_workers=None, force=False):
+    """
+    Execute and export every stale notebook, all notebooks concurrently (each one runs
+    its own kernel process).
+
+    Parameters
+    ----------
+    names : list of str
+        Notebook names in NOTEBOOK_DIR, without extension.
+    formats : tuple of str, optional
+        Export formats, any of 'html' and 'pdf' (default is both).
+    max_workers : int, optional
+        Notebooks executed at the same time (default is all of them).
+    force : bool, optional
+        Execute every notebook regardless of fingerprints (default is False).
+
+    Returns
+    -------
+    list of str
+        Names of the notebooks that were executed.
+
+    Raises
+    ------
+    RuntimeError
+        If a notebook fails; the notebooks that succeeded are still recorded first.
+    """
+    stale = list(names) if force else stale_notebooks(names, formats)
+    for name in names:
+        if name not in stale:
+            logging.info(f"Skipping {name}, notebook and inputs unchanged.")
+    if not stale:
+        return []
+
+    fingerprints = {name: notebook_fingerprint(name) for name in stale}
+    results, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(stale)) as pool:
+        futures = {name: pool.submit(execute_notebook, name, formats) for name in stale}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                errors[name] = e
+
+    manifest = read_manifest(NOTEBOOK_MANIFEST)
+    for name, written in results.items():
+        manifest[written[0].name] = fingerprints[name]
+        logging.info(f"Executed {name} -> {', '.join(str(p) for p in written)}")
+    write_manifest(manifest, NOTEBOOK_MANIFEST)
+    if errors:
+        failures = "\n".join(f"{name}: {e}" for name, e in errors.items())
+        raise RuntimeError(f"Notebooks failed:\n{failures}") from next(iter(errors.values()))
+    return stale
@@ -0,0 +1,165 @@
+""" Fingerprints of the daily store per product and of every report output, so that
+figures and tables are only re-rendered when the data slice or parameters behind them change"""
+
+import hashlib
+import inspect
+import json
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from settings import config
+
+DATA_DIR = Path(config("DATA_DIR"))
+OUTPUT_DIR = Path(config("OUTPUT_DIR"))
+DATA_FILE = DATA_DIR / "df_all.parquet"
+PRODUCT_FINGERPRINT_FILE = DATA_DIR / "product_fingerprints.json"
+MANIFEST_FILE = OUTPUT_DIR / "output_fingerprints.json"
+FINGERPRINT_COLUMNS = ["futcode", "date_", "contrdate", "settlement"]
+
+
+def product_fingerprints(df_all):
+    """
+    One order-independent hash per product over its rows of the daily store.
+
+    Every row is hashed once (pandas.util.hash_pandas_object) and the row hashes are
+    summed per product modulo 2**64, so a product's fingerprint only changes when one
+    of its own rows is added, removed or modified.
+
+    Parameters
+    ----------
+    df_all : pandas.DataFrame
+        Daily store with 'product_code' and the FINGERPRINT_COLUMNS present in it.
+
+    Returns
+    -------
+    dict
+        Product code (int) -> 16-character hex fingerprint.
+    """
+    if df_all.empty:
+        return {}
+    columns = [c for c in FINGERPRINT_COLUMNS if c in df_all.columns]
+    row_hashes = pd.util.hash_pandas_object(df_all[columns], index=False).to_numpy()
+
+    products, product_idx = np.unique(df_all["product_code"].to_numpy(), return_inverse=True)
+    sums = np.zeros(len(products), dtype=np.uint64)
+    np.add.at(sums, product_idx, row_hashes)
+    counts = np.bincount(product_idx, minlength=len(products))
+    return {int(p): f"{int(s):016x}{int(n):x}" for p, s, n in zip(products, sums, counts)}
+
+
+def save_product_fingerprints(fingerprints, path=PRODUCT_FINGERPRINT_FILE):
+    """
+    Persist product fingerprints as JSON next to the daily store.
+    """
+    Path(path).write_text(json.dumps({str(k): v for k, v in fingerprints.items()}, indent=1))
+    return Path(path)
+
+
+def load_product_fingerprints(df_all=None, loader=None, path=PRODUCT_FINGERPRINT_FILE):
+    """
+    Checks if product fingerprints at least as recent as df_all.parquet exist locally.
+    If so, reads them; otherwise computes them and saves them.
+
+    Parameters
+    ----------
+    df_all : pandas.DataFrame, optional
+        Daily store to fingerprint if the file must be rebuilt.
+    loader : callable, optional
+        Called to obtain the daily store when neither df_all nor df_all.parquet is available.
+    path : pathlib.Path, optional
+        Fingerprint location (default is DATA_DIR / "product_fingerprints.json").
+
+    Returns
+    -------
+    dict
+        Product code (int) -> hex fingerprint.
+    """
+    path = Path(path)
+    fresh = path.exists() and (not DATA_FILE.exists() or path.stat().st_mtime >= DATA_FILE.stat().st_mtime)
+    if fresh:
+        return {int(k): v for k, v in json.loads(path.read_text()).items()}
+
+    if df_all is None and DATA_FILE.exists():
+        df_all = pd.read_parquet(DATA_FILE, columns=["product_code"] + FINGERPRINT_COLUMNS)
+    elif df_all is None and loader is not None:
+        df_all = loader()
+    if df_all is None or df_all.empty:
+        return {}
+    fingerprints = product_fingerprints(df_all)
+    save_product_fingerprints(fingerprints, path)
+    return fingerprints
+
+
+def _file_digest(path):
+    """
+    SHA-256 of a file's content, or None if it does not exist.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def output_fingerprint(fingerprints, products=None, params=None, func=None, files=None):
+    """
+    Fingerprint of one output: its products' data, its parameters, its renderer's code
+    and any saved results it is built from.
+
+    Parameters
+    ----------
+    fingerprints : dict
+        Product fingerprints from load_product_fingerprints.
+    products : iterable of int, optional
+        Products the output depends on (default is every product in the store).
+        Products without data still enter the fingerprint, so they are picked up once
+        they appear.
+    params : dict, optional
+        Keyword arguments passed to the renderer.
+    func : callable, optional
+        Renderer; its source code is part of the fingerprint.
+    files : iterable of path-like, optional
+        Saved inputs (e.g. the persisted Table 1 results) whose content is part of the
+        fingerprint.
+
+    Returns
+    -------
+    str
+        Hex digest.
+    """
+    products = sorted(fingerprints) if products is None else sorted(set(int(p) for p in products))
+    payload = {
+        "data": [[p, fingerprints.get(p)] for p in products],
+        "params": params or {},
+        "code": inspect.getsource(func) if func is not None else None,
+        "files": {str(f): _file_digest(f) for f in files or []},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def read_manifest(path=MANIFEST_FILE):
+    """
+    Read the output filename -> fingerprint manifest (empty if missing or unreadable).
+    """
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text())
+    except json.JSONDecodeError:
+        return {}
+
+
+def write_manifest(manifest, path=MANIFEST_FILE):
+    """
+    Write the output filename -> fingerprint manifest.
+    """
+    Path(path).write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    return Path(path)
+
+
+def is_up_to_date(output_path, fingerprint, manifest):
+    """
+    True if the output exists and was last written from inputs with this fingerprint.
+    """
+    output_path = Path(output_path)
+    return output_path.exists() and manifest.get(output_path.name) == fingerprint
@@ -0,0 +1,114 @@
+""" The product universe, loaded once from data_manual/products.csv: each product's
+WRDS name, display name, symbol, sector and the periods it is pulled for. Adding or
+disabling a product is an edit to that file; every module looks products up here"""
+
+import csv
+from pathlib import Path
+from settings import config
+
+MANUAL_DATA_DIR = Path(config("MANUAL_DATA_DIR"))
+REGISTRY_FILE = MANUAL_DATA_DIR / "products.csv"
+REGISTRY_COLUMNS = ["product_code", "wrds_name", "display_name", "symbol", "sector", "periods"]
+
+
+def load_products(path=REGISTRY_FILE):
+    """
+    Read the product registry.
+
+    Parameters
+    ----------
+    path : pathlib.Path, optional
+        CSV with REGISTRY_COLUMNS (default is data_manual/products.csv). 'periods' lists
+        the time periods a product is pulled for, separated by spaces; a product with
+        none is disabled but still has names for labels (e.g. Broilers on the coverage
+        heatmap).
+
+    Returns
+    -------
+    dict
+        Product code (int) -> dict of its fields, in file order, with 'periods' as a
+        tuple and 'label' as "Display name (SYMBOL)".
+    """
+    products = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            missing = [c for c in REGISTRY_COLUMNS if c not in row]
+            if missing:
+                raise ValueError(f"{path} is missing columns {missing}")
+            code = int(row["product_code"])
+            if code in products:
+                raise ValueError(f"Product {code} appears twice in {path}")
+            products[code] = {
+                "product_code": code,
+                "wrds_name": row["wrds_name"],
+                "display_name": row["display_name"],
+                "symbol": row["symbol"],
+                "sector": row["sector"],
+                "periods": tuple(row["periods"].split()),
+                "label": f"{row['display_name']} ({row['symbol']})",
+            }
+    return products
+
+
+PRODUCTS = load_products()
+_BY_WRDS_NAME = {p["wrds_name"]: p for p in PRODUCTS.values() if p["wrds_name"]}
+
+
+def get_product(code):
+    """
+    Registry entry of a product code, or None if it is not registered.
+    """
+    return PRODUCTS.get(int(code))
+
+
+def product_by_wrds_name(wrds_name):
+    """
+    Registry entry of a WRDS contract name (e.g. 'CORN'), or None.
+    """
+    return _BY_WRDS_NAME.get(wrds_name)
+
+
+def product_codes(time_period=None, include_disabled=False):
+    """
+    Registered product codes in file order.
+
+    Parameters
+    ----------
+    time_period : str, optional
+        Only products pulled for this period ('paper' or 'current'); default is products
+        pulled for any period.
+    include_disabled : bool, optional
+        Also return products with no period (default is False).
+
+    Returns
+    -------
+    list of int
+    """
+    return [
+        code for code, p in PRODUCTS.items()
+        if (include_disabled and not p["periods"])
+        or (p["periods"] and (time_period is None or time_period in p["periods"]))
+    ]
+
+
+def product_field_map(field, include_disabled=False):
+    """
+    Product code -> one registry field, e.g. product_field_map('sector').
+    """
+    return {code: PRODUCTS[code][field] for code in product_codes(include_disabled=include_disabled)}
+
+
+def product_label(code):
+    """
+    "Display name (SYMBOL)" of a product, or "Code <code>" if it is not registered.
+    """
+    product = get_product(code)
+    return product["label"] if product else f"Code {code}"
+
+
+def product_name(code):
+    """
+    Title-case display name of a product for figure titles, or "Code <code>".
+    """
+    product = get_product(code)
+    return product["display_name"].title() if product else f"Code {code}"
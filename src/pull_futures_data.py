@@ -2,8 +2,10 @@
 
 import pandas as pd
 import numpy as np
-import wrds
 from settings import config
+from columnar_store import write_table, read_table, FUTURES_SCHEMA, PRODUCT_FUTURES_SCHEMA
+from instrumentation import timed
+from product_registry import product_codes
 from pathlib import Path
 import warnings
 
@@ -16,9 +18,22 @@ PAPER_END_DATE = config("PAPER_END_DATE")
 CURRENT_START_DATE = config("CURRENT_START_DATE")
 CURRENT_END_DATE = config("CURRENT_END_DATE")
 WRDS_USERNAME = config("WRDS_USERNAME")
+PRODUCT_DIR = DATA_DIR / "products"
 
 
-db = wrds.Connection(wrds_username=WRDS_USERNAME)
+_db = None
+
+
+def get_db():
+    """
+    The WRDS connection, opened on first use, so importing this module or working from
+    the local store never connects to WRDS.
+    """
+    global _db
+    if _db is None:
+        import wrds
+        _db = wrds.Connection(wrds_username=WRDS_USERNAME)
+    return _db
 
 """PAPER_START_DATE = '1970-01-01'
 PAPER_END_DATE   = '2008-12-31'
@@ -26,7 +41,38 @@ CURRENT_START_DATE = '2008-12-31'
 CURRENT_END_DATE   = '2025-02-28'"""
 
 
-def fetch_wrds_contract_info(product_contract_code, time_period='paper'):
+def resolve_window(time_period=None, start=None, end=None):
+    """
+    Start and end dates of a window: a named time period, with either bound replaced
+    by an explicit start or end.
+
+    Parameters
+    ----------
+    time_period : str, optional
+        'paper' or 'current' (dates from settings); None leaves the bounds open.
+    start, end : str or Timestamp, optional
+        Override the period's first and last date.
+
+    Returns
+    -------
+    tuple of (Timestamp or None, Timestamp or None)
+    """
+    if time_period is None:
+        period_start, period_end = None, None
+    elif time_period == "paper":
+        period_start, period_end = PAPER_START_DATE, PAPER_END_DATE
+    elif time_period == "current":
+        period_start, period_end = CURRENT_START_DATE, CURRENT_END_DATE
+    else:
+        raise ValueError(f"Unknown time period: {time_period}")
+    return (
+        period_start if start is None else pd.Timestamp(start),
+        period_end if end is None else pd.Timestamp(end),
+    )
+
+
+@timed()
+def fetch_wrds_contract_info(product_contract_code, time_period='paper', start=None, end=None):
     """
     Fetch rows from wrds_contract_info.
 
@@ -36,19 +82,17 @@ def fetch_wrds_contract_info(product_contract_code, time_period='paper'):
         The commodity's integer contract code (e.g., 3160).
     time_period : str, optional
         Either 'paper' (default) or 'current', indicating which date range to pull.
+    start, end : str or Timestamp, optional
+        Override the first and last date of the time period.
 
     Returns
     -------
     pandas.DataFrame
         Columns include: futcode, contrcode, contrname, contrdate, startdate, lasttrddate.
     """
+    from wrds_query_log import run_query
 
-    if time_period == 'paper':
-        start_date = PAPER_START_DATE
-        end_date = PAPER_END_DATE
-    else:
-        start_date = CURRENT_START_DATE
-        end_date = CURRENT_END_DATE
+    start_date, end_date = resolve_window(time_period, start, end)
     query = f"""
     SELECT futcode, contrcode, contrname, contrdate, startdate, lasttrddate
     FROM tr_ds_fut.wrds_contract_info
@@ -56,10 +100,12 @@ def fetch_wrds_contract_info(product_contract_code, time_period='paper'):
       AND startdate >= '{start_date}'
       AND lasttrddate <= '{end_date}'
     """
-    df = db.raw_sql(query)
+    df = run_query(get_db(), query, product=product_contract_code, period=time_period)
     return df
 
-def fetch_wrds_fut_contract(futcodes_contrdates, time_period='paper'):
+@timed()
+def fetch_wrds_fut_contract(futcodes_contrdates, time_period='paper', product_contract_code=None,
+                            start=None, end=None):
     """
     Fetch daily settlement prices from wrds_fut_contract.
 
@@ -69,33 +115,108 @@ def fetch_wrds_fut_contract(futcodes_contrdates, time_period='paper'):
         Keys are futcode values, and values are corresponding contract date strings.
     time_period : str, optional
         Either 'paper' (default) or 'current', indicating which date range to pull.
+    product_contract_code : int, optional
+        Product the contracts belong to, recorded with the query in the query log.
+    start, end : str or Timestamp, optional
+        Override the first and last date of the time period.
 
     Returns
     -------
     pandas.DataFrame
-        Columns include: futcode, date_, settlement, and a 'contrdate' column mapped from futcodes_contrdates.
+        Columns include: futcode, date_, settlement, volume, and a 'contrdate' column mapped from futcodes_contrdates.
     """
-    if time_period == 'paper':
-        start_date = PAPER_START_DATE
-        end_date = PAPER_END_DATE
-    else:
-        start_date = CURRENT_START_DATE
-        end_date = CURRENT_END_DATE
+    from wrds_query_log import run_query
+
+    start_date, end_date = resolve_window(time_period, start, end)
     query = f"""
-    SELECT futcode, date_, settlement
+    SELECT futcode, date_, settlement, volume
     FROM tr_ds_fut.wrds_fut_contract
     WHERE futcode IN {tuple(futcodes_contrdates.keys())}
       AND date_ >= '{start_date}'
       AND date_ <= '{end_date}'
     """
-    df = db.raw_sql(query)
+    df = run_query(get_db(), query, product=product_contract_code, period=time_period)
     df["date_"] = pd.to_datetime(df["date_"])
     df["contrdate"] = df["futcode"].map(futcodes_contrdates)
     return df
 
+@timed()
+def pull_single_product(product_contract_code, time_period="paper"):
+    """
+    Pull the daily settlements of one product from WRDS.
+
+    Parameters
+    ----------
+    product_contract_code : int
+        The commodity's integer contract code.
+    time_period : str, optional
+        Either 'paper' (default) or 'current' for the desired date range.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Daily settlements with each contract's startdate, lasttrddate and contrname,
+        and the product_code. Empty if WRDS has no data for the product.
+    """
+    info_df = fetch_wrds_contract_info(product_contract_code, time_period)
+    if info_df.empty:
+        return pd.DataFrame()
+    futcodes_contrdates = info_df.set_index("futcode")["contrdate"].to_dict()
+    data_contracts = fetch_wrds_fut_contract(futcodes_contrdates, time_period, product_contract_code)
+    if data_contracts.empty:
+        return pd.DataFrame()
+    contract_dates = info_df.set_index("futcode")
+    data_contracts["startdate"] = pd.to_datetime(data_contracts["futcode"].map(contract_dates["startdate"]))
+    data_contracts["lasttrddate"] = pd.to_datetime(data_contracts["futcode"].map(contract_dates["lasttrddate"]))
+    data_contracts["contrname"] = data_contracts["futcode"].map(contract_dates["contrname"])
+    data_contracts["product_code"] = product_contract_code
+    return data_contracts
+
+
+def product_data_file(product_contract_code, time_period="paper"):
+    """
+    Location of one product's pulled daily data for a time period.
+    """
+    return PRODUCT_DIR / f"futures_{time_period}_{product_contract_code}.parquet"
+
+
+def pull_product_to_file(product_contract_code, time_period="paper"):
+    """
+    Pull one product and save it as its own parquet artifact (empty if WRDS has no data),
+    so each product/period pair can be pulled, cached and rebuilt independently.
+
+    Returns
+    -------
+    None
+        Writes product_data_file(product_contract_code, time_period).
+    """
+    PRODUCT_DIR.mkdir(parents=True, exist_ok=True)
+    path = product_data_file(product_contract_code, time_period)
+    write_table(pull_single_product(product_contract_code, time_period), path, PRODUCT_FUTURES_SCHEMA)
+
+
+def merge_product_files(time_period="paper", product_list=None):
+    """
+    Concatenate the per-product artifacts of a time period, in product_list order
+    (default is the registry's products for the period).
+
+    Returns
+    -------
+    pandas.DataFrame
+        Same layout as pull_all_futures_data.
+    """
+    if product_list is None:
+        product_list = product_codes(time_period)
+    frames = [read_table(product_data_file(code, time_period)) for code in product_list]
+    frames = [df.drop(columns="contrname") for df in frames if not df.empty]
+    if len(frames) == 0:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
 def pull_all_futures_data(time_period="paper"):
     """
-    Pull raw data from WRDS for all product codes in product_list,
+    Pull raw data from WRDS for every registered product of the time period,
     then concatenate into one DataFrame.
 
     Parameters
@@ -106,34 +227,63 @@ def pull_all_futures_data(time_period="paper"):
     Returns
     -------
     pandas.DataFrame
-        Combined daily settlements for all relevant product codes.
+        Combined daily settlements for all relevant product codes, with each
+        contract's startdate and lasttrddate attached for roll scheduling.
     """
-    product_list = [
-        3160, 289, 3161, 1980, 2038, 3247, 1992, 361, 385, 2036,
-        379, 3256, 396, 430, 1986, 2091, 2029, 2060, 3847, 2032,
-        3250, 2676, 2675, 3126, 2087, 2026, 2020, 2065, 2074, 2108
-    ]
+    from wrds_query_log import print_query_summary, QUERY_LOG
+
+    first_query = len(QUERY_LOG)
     all_frames = []
-    for code in product_list:
-        info_df = fetch_wrds_contract_info(code, time_period)
-        if info_df.empty:
-            continue
-        futcodes_contrdates = info_df.set_index("futcode")["contrdate"].to_dict()
-        data_contracts = fetch_wrds_fut_contract(futcodes_contrdates, time_period)
+    for code in product_codes(time_period):
+        data_contracts = pull_single_product(code, time_period)
         if not data_contracts.empty:
-            data_contracts["product_code"] = code
-            all_frames.append(data_contracts)
+            all_frames.append(data_contracts.drop(columns="contrname"))
     if len(all_frames) > 0:
         final_df = pd.concat(all_frames, ignore_index=True)
     else:
         final_df = pd.DataFrame()  
+    print_query_summary(QUERY_LOG[first_query:])
     return final_df
 
+
+def save_combined_futures_data(df_all):
+    """
+    Write the combined daily store with its coverage index and per-product fingerprints.
+    """
+    from coverage_index import build_coverage_index, save_coverage_index
+    from output_fingerprint import product_fingerprints, save_product_fingerprints
+
+    write_table(df_all, DATA_FILE, FUTURES_SCHEMA)
+    save_coverage_index(build_coverage_index(df_all))
+    save_product_fingerprints(product_fingerprints(df_all))
+    return DATA_FILE
+
+
+def save_clean_futures_data(time_periods=("paper", "current")):
+    """
+    Merge the per-product pulls into clean_futures_{period}.parquet for each period
+    (CSV copies when EXPORT_CSV is set), and the combined daily store (df_all.parquet)
+    with its coverage index and fingerprints.
+    """
+    frames = []
+    for time_period in time_periods:
+        df = merge_product_files(time_period)
+        path = DATA_DIR / f"clean_futures_{time_period}.parquet"
+        write_table(df, path, FUTURES_SCHEMA, csv_path=DATA_DIR / f"clean_futures_{time_period}.csv")
+        print(f"Saved {path} with {len(df)} rows.")
+        frames.append(df)
+
+    df_all = pd.concat(frames, ignore_index=True)
+    if not df_all.empty:
+        save_combined_futures_data(df_all)
+
+
 def load_combined_futures_data():
     """
     Checks if a combined (paper + current) futures dataset already exists locally.
     If so, reads from that file to avoid repeated WRDS pulls.
-    If not, pulls from WRDS, saves to a local parquet file, and returns it.
+    If not, pulls from WRDS, saves to a local parquet file together with its
+    coverage index and per-product fingerprints, and returns it.
 
     Returns
     -------
@@ -141,7 +291,7 @@ def load_combined_futures_data():
         A DataFrame of daily settlement data spanning both 'paper' and 'current' periods.
     """
     if DATA_FILE.exists():
-        df_all = pd.read_parquet(DATA_FILE)
+        df_all = read_table(DATA_FILE)
         if not df_all.empty:
             return df_all
     
@@ -149,7 +299,105 @@ def load_combined_futures_data():
     df_current = pull_all_futures_data("current")
     df_all = pd.concat([df_paper, df_current], ignore_index=True)
     if not df_all.empty:
-        df_all.to_parquet(DATA_FILE)
+        save_combined_futures_data(df_all)
     return df_all
 
 
+def check_store_window(start=None, end=None):
+    """
+    Raise a ValueError if a window crosses the boundary between the paper and current
+    pulls. The store is the union of the two: the paper pull keeps contracts expiring by
+    PAPER_END_DATE and the current pull contracts starting from CURRENT_START_DATE, so
+    contracts trading across the boundary are in neither, and a window over it would
+    silently lose them. An open bound extends to the end of the store.
+
+    Examples
+    --------
+    >>> check_store_window("1990-01-01", "1999-12-31")
+    >>> check_store_window("2000-01-01", "2009-12-31")
+    Traceback (most recent call last):
+    ...
+    ValueError: Window 2000-01-01 to 2009-12-31 crosses 2008-12-31, where the paper and current pulls of the local store meet; windows must end by 2008-12-31 or start from 2008-12-31.
+    """
+    first = pd.Timestamp.min if start is None else pd.Timestamp(start)
+    last = pd.Timestamp.max if end is None else pd.Timestamp(end)
+    if first < CURRENT_START_DATE and last > PAPER_END_DATE:
+        raise ValueError(
+            f"Window {start or 'FIRST DATE'} to {end or 'LAST DATE'} crosses {PAPER_END_DATE.date()}, "
+            f"where the paper and current pulls of the local store meet; windows must end by "
+            f"{PAPER_END_DATE.date()} or start from {CURRENT_START_DATE.date()}."
+        )
+
+
+def window_filters(start=None, end=None, product_list=None, whole_contracts=True):
+    """
+    Predicates (column, op, value) selecting a window, in pyarrow filter syntax.
+    """
+    filters = []
+    if start is not None:
+        filters.append(("date_", ">=", pd.Timestamp(start)))
+        if whole_contracts:
+            filters.append(("startdate", ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append(("date_", "<=", pd.Timestamp(end)))
+        if whole_contracts:
+            filters.append(("lasttrddate", "<=", pd.Timestamp(end)))
+    if product_list is not None:
+        filters.append(("product_code", "in", [int(code) for code in product_list]))
+    return filters
+
+
+_COMPARISONS = {">=": pd.Series.ge, "<=": pd.Series.le, "in": pd.Series.isin}
+
+
+def slice_futures_window(df_all, start=None, end=None, product_list=None, whole_contracts=True):
+    """
+    Daily rows of a date window cut out of an already loaded store, with the same
+    selection as a WRDS pull of that window.
+
+    Parameters
+    ----------
+    df_all : pandas.DataFrame
+        Daily store (as from load_combined_futures_data).
+    start, end : str or Timestamp, optional
+        First and last date (default is open-ended).
+    product_list : list of int, optional
+        Products to keep (default is all).
+    whole_contracts : bool, optional
+        Keep only contracts that start and expire inside the window, as the WRDS pulls
+        do (default is True); the window must then lie on one side of the paper/current
+        boundary (see check_store_window). False keeps every row dated inside it, which
+        near the boundary lacks the contracts trading across it.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Rows in store order, with rows pulled for both periods (a contract trading on
+        the day the periods meet) kept once.
+    """
+    if whole_contracts:
+        check_store_window(start, end)
+    keep = np.ones(len(df_all), dtype=bool)
+    for column, op, value in window_filters(start, end, product_list, whole_contracts):
+        keep &= _COMPARISONS[op](df_all[column], value).to_numpy()
+    return df_all[keep].drop_duplicates(subset=["futcode", "date_"], ignore_index=True)
+
+
+def load_futures_window(start=None, end=None, product_list=None, whole_contracts=True):
+    """
+    Daily rows of a date window read from the local store (df_all.parquet), so a
+    window such as 1990-2000 needs no WRDS query once the store exists. The store is
+    pulled once with load_combined_futures_data if it does not. Windows of whole
+    contracts must lie on one side of the paper/current boundary (see
+    check_store_window).
+
+    The window is applied as parquet filters, so only its rows are read. Parameters
+    and result are as in slice_futures_window.
+    """
+    if whole_contracts:
+        check_store_window(start, end)
+    if not DATA_FILE.exists():
+        return slice_futures_window(load_combined_futures_data(), start, end, product_list, whole_contracts)
+    filters = window_filters(start, end, product_list, whole_contracts)
+    window = read_table(DATA_FILE, filters=filters or None)
+    return window.drop_duplicates(subset=["futcode", "date_"], ignore_index=True)
@@ -0,0 +1,226 @@
+""" Per-task timing and memory report for the doit pipeline: wall time, CPU time, peak RSS
+and parquet rows in/out of every task, written under OUTPUT_DIR so successive runs can be
+compared"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+import pyarrow.parquet as pq
+from settings import config
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+OUTPUT_DIR = Path(config("OUTPUT_DIR"))
+REPORT_DIR = OUTPUT_DIR / "run_reports"
+# Started-at time with microseconds and the pid; kept in the environment so that worker
+# processes of `doit -n N` (forked or spawned) report to their parent's run
+RUN_ID = os.environ.setdefault("RUN_REPORT_ID", f"{datetime.now():%Y%m%d_%H%M%S_%f}_{os.getpid()}")
+REPORT_COLUMNS = ["task", "wall_s", "cpu_s", "child_cpu_s", "peak_rss_mb", "rows_in", "rows_out"]
+
+_lock = threading.Lock()
+
+
+def _rusage_mb(maxrss):
+    """
+    ru_maxrss in MB (kilobytes on Linux, bytes on macOS).
+    """
+    return maxrss / 2**20 if sys.platform == "darwin" else maxrss / 2**10
+
+
+def _reset_peak_rss():
+    """
+    Reset the process high-water mark where the kernel allows it (Linux), so the peak
+    read at the end of a task is that task's own peak when tasks run one at a time.
+    """
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    """
+    Peak resident memory of this process in MB, and of its finished children (command
+    actions), or None where neither can be measured.
+    """
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                own = int(line.split()[1]) / 2**10
+                break
+        else:
+            raise OSError
+    except OSError:
+        own = _rusage_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) if resource else None
+    if resource is None:
+        return own, None
+    return own, _rusage_mb(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+
+def _child_cpu():
+    """
+    CPU seconds used by finished child processes, or 0 where unavailable.
+    """
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def parquet_rows(paths):
+    """
+    Total row count of the parquet files among paths, read from their footers only.
+    None if there is no parquet file among them.
+    """
+    files = [Path(p) for p in paths if str(p).endswith(".parquet") and Path(p).exists()]
+    if not files:
+        return None
+    return sum(pq.read_metadata(f).num_rows for f in files)
+
+
+def _instrument(task, name):
+    """
+    Add actions around a doit task dict that measure it and record it in the run report.
+    """
+    if not task.get("actions"):
+        return task
+    start = {}
+
+    def begin():
+        _reset_peak_rss()
+        start.update(wall=time.perf_counter(), cpu=time.process_time(), child_cpu=_child_cpu())
+
+    def end():
+        own_rss, child_rss = _peak_rss_mb()
+        child_cpu = _child_cpu() - start["child_cpu"]
+        # the children's peak is over every child so far, only meaningful if one ran now
+        peaks = [p for p in (own_rss, child_rss if child_cpu > 0 else None) if p is not None]
+        record_task({
+            "task": name,
+            "wall_s": time.perf_counter() - start["wall"],
+            "cpu_s": time.process_time() - start["cpu"],
+            "child_cpu_s": child_cpu,
+            "peak_rss_mb": max(peaks) if peaks else None,
+            "rows_in": parquet_rows(task.get("file_dep", [])),
+            "rows_out": parquet_rows(task.get("targets", [])),
+            "finished": datetime.now().isoformat(timespec="seconds"),
+        })
+
+    return {**task, "actions": [begin] + list(task["actions"]) + [end]}
+
+
+def reported(task_creator):
+    """
+    Decorator for dodo.py task creators: every task (and subtask) it returns records
+    its wall time, CPU time, peak RSS and parquet rows in/out in the run report.
+
+    CPU time is process-wide, so with `doit -n N -P thread` concurrent tasks share it;
+    wall time and rows stay per task.
+    """
+    basename = task_creator.__name__[len("task_"):]
+
+    @functools.wraps(task_creator)
+    def wrapper():
+        result = task_creator()
+        if isinstance(result, dict):
+            return _instrument(result, basename)
+        return (_instrument(task, f"{basename}:{task['name']}") for task in result)
+
+    return wrapper
+
+
+def record_task(record, run_id=RUN_ID, report_dir=REPORT_DIR):
+    """
+    Append one task record to the run's log and rewrite the run report and summary.
+
+    The append and the rewrite hold an exclusive lock on report_dir/.lock (where the
+    platform has fcntl), so tasks finishing at once in separate `doit -n N` processes
+    neither interleave their records nor read each other's partial writes.
+    """
+    report_dir = Path(report_dir)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    with _lock, open(report_dir / ".lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            with open(report_dir / f"{run_id}.jsonl", "a") as f:
+                f.write(json.dumps(record) + "\n")
+            write_run_report(run_id, report_dir)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_run(run_id, report_dir=REPORT_DIR):
+    """
+    Task records of a run, keyed by task name (latest record wins).
+    """
+    path = Path(report_dir) / f"{run_id}.jsonl"
+    if not path.exists():
+        return {}
+    records = [json.loads(line) for line in path.read_text().splitlines() if line]
+    return {r["task"]: r for r in records}
+
+
+def previous_run_times(run_id, report_dir=REPORT_DIR):
+    """
+    Latest wall time of every task over the runs before run_id.
+    """
+    times = {}
+    for path in sorted(Path(report_dir).glob("*.jsonl")):
+        if path.stem >= run_id:
+            break
+        times.update({task: r["wall_s"] for task, r in load_run(path.stem, report_dir).items()})
+    return times
+
+
+def _fmt(value):
+    """
+    Table cell for a number or a missing value.
+    """
+    if value is None:
+        return "-"
+    return f"{value:,.2f}" if isinstance(value, float) else f"{value:,}"
+
+
+def write_run_report(run_id=RUN_ID, report_dir=REPORT_DIR):
+    """
+    Write the run report as JSON ({run_id}.json) and as a summary table (latest.md),
+    with each task's wall time compared to its previous run.
+
+    Returns
+    -------
+    pathlib.Path
+        The JSON report.
+    """
+    report_dir = Path(report_dir)
+    records = load_run(run_id, report_dir)
+    previous = previous_run_times(run_id, report_dir)
+    for task, record in records.items():
+        record["prev_wall_s"] = previous.get(task)
+
+    report = {"run_id": run_id, "tasks": list(records.values()),
+              "total_wall_s": sum(r["wall_s"] for r in records.values())}
+    json_path = report_dir / f"{run_id}.json"
+    json_path.write_text(json.dumps(report, indent=1))
+
+    header = REPORT_COLUMNS + ["prev_wall_s", "change"]
+    lines = [f"# Run {run_id}", "", "| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    for r in records.values():
+        change = f"{r['wall_s'] / r['prev_wall_s'] - 1:+.0%}" if r["prev_wall_s"] else "-"
+        lines.append("| " + " | ".join([r["task"]] + [_fmt(r[c]) for c in header[1:-1]] + [change]) + " |")
+    (report_dir / "latest.md").write_text("\n".join(lines) + "\n")
+    return json_path
@@ -79,6 +79,20 @@ d["CURRENT_END_DATE"] = _config("CURRENT_END_DATE", default="2025-02-28", cast=t
 d["PIPELINE_DEV_MODE"] = _config("PIPELINE_DEV_MODE", default=True, cast=bool)
 d["PIPELINE_THEME"] = _config("PIPELINE_THEME", default="pipeline")
 
+# Points kept per plotted series (about four per pixel column of a 16in figure at 300 dpi); 0 disables
+d["PLOT_MAX_POINTS"] = _config("PLOT_MAX_POINTS", default=20000, cast=int)
+
+# Parquet artifacts passed between pipeline stages; CSV copies are an optional export
+d["PARQUET_COMPRESSION"] = _config("PARQUET_COMPRESSION", default="zstd")
+d["PARQUET_ROW_GROUP_SIZE"] = _config("PARQUET_ROW_GROUP_SIZE", default=262144, cast=int)
+d["EXPORT_CSV"] = _config("EXPORT_CSV", default=False, cast=bool)
+
+# Hot-path counters and timers (see instrumentation.py); off by default
+d["INSTRUMENTATION"] = _config("INSTRUMENTATION", default=False, cast=bool)
+
+# WRDS queries taking at least this long are logged as slow (see wrds_query_log.py)
+d["WRDS_SLOW_QUERY_SECONDS"] = _config("WRDS_SLOW_QUERY_SECONDS", default=10.0, cast=float)
+
 ## Paths
 d["DATA_DIR"] = if_relative_make_abs(_config('DATA_DIR', default=Path('_data'), cast=Path))
 d["MANUAL_DATA_DIR"] = if_relative_make_abs(_config('MANUAL_DATA_DIR', default=Path('data_manual'), cast=Path))
@@ -86,8 +100,8 @@ d["OUTPUT_DIR"] = if_relative_make_abs(_config('OUTPUT_DIR', default=Path('_outp
 d["PUBLISH_DIR"] = if_relative_make_abs(_config('PUBLISH_DIR', default=Path('_output/publish'), cast=Path))
 # fmt: on
 
-## WRDS Username
-d["WRDS_USERNAME"] = _config("WRDS_USERNAME")
+## WRDS Username (only needed when pulling; wrds prompts for it if left empty)
+d["WRDS_USERNAME"] = _config("WRDS_USERNAME", default="")
 
 
 ## Name of Stata Executable in path
@@ -0,0 +1,135 @@
+""" Deterministic synthetic futures data shaped like the WRDS tables the pipeline pulls
+(wrds_contract_info and wrds_fut_contract), for tests and benchmarks that run without WRDS"""
+
+import numpy as np
+import pandas as pd
+
+
+def contract_months(contracts_per_year=12):
+    """
+    Delivery months of a product listing contracts_per_year evenly spaced contracts
+    (e.g. 4 -> March, June, September, December).
+    """
+    if 12 % contracts_per_year != 0:
+        raise ValueError(f"contracts_per_year must divide 12, got {contracts_per_year}")
+    step = 12 // contracts_per_year
+    return list(range(step, 13, step))
+
+
+def synthetic_product(product_index, start="2000-01-01", n_years=5, contracts_per_year=12,
+                      trading_days_per_year=252, contract_life_months=13, missing_rate=0.02,
+                      seed=0):
+    """
+    Contract info and daily settlements of one synthetic product.
+
+    Settlements follow a product-level log random walk plus a per-product carry
+    (contango or backwardation) proportional to each contract's months to delivery,
+    so basis and returns behave like real term structures. The same arguments always
+    produce the same data.
+
+    Parameters
+    ----------
+    product_index : int
+        Position of the product; sets its codes and its random stream.
+    start : str, optional
+        First trading day (default is '2000-01-01').
+    n_years : int, optional
+        Length of the sample in years (default is 5).
+    contracts_per_year : int, optional
+        Listed contracts per year, a divisor of 12 (default is 12).
+    trading_days_per_year : int, optional
+        Trading days kept per year out of the ~261 business days (default is 252).
+    contract_life_months : int, optional
+        Months each contract trades before its delivery month (default is 13).
+    missing_rate : float, optional
+        Share of daily rows dropped at random, like gaps in WRDS (default is 0.02).
+    seed : int, optional
+        Seed of the whole synthetic universe (default is 0).
+
+    Returns
+    -------
+    info_df : pandas.DataFrame
+        As from fetch_wrds_contract_info: futcode, contrcode, contrname, contrdate,
+        startdate, lasttrddate.
+    data_df : pandas.DataFrame
+        As from fetch_wrds_fut_contract: futcode, date_, settlement, volume, contrdate.
+    """
+    rng = np.random.default_rng([seed, product_index])
+    start = pd.Timestamp(start)
+    end = start + pd.DateOffset(years=n_years) - pd.Timedelta(days=1)
+
+    days = pd.bdate_range(start, end)
+    days = days[rng.random(len(days)) < trading_days_per_year / 261]
+
+    # contracts whose whole trading life lies inside the sample, as the WRDS info query selects
+    first = start.to_period("M") + contract_life_months
+    last = end.to_period("M")
+    months = set(contract_months(contracts_per_year))
+    delivery = pd.period_range(first, last, freq="M")
+    delivery = delivery[np.isin(delivery.month, list(months))]
+
+    contrcode = 10000 + product_index
+    futcodes = contrcode * 1000 + np.arange(len(delivery))
+    startdate = (delivery - contract_life_months).to_timestamp()
+    lasttrddate = delivery.to_timestamp() - pd.Timedelta(days=10)
+    slash = rng.random() < 0.5
+    contrdate = [f"{p.month:02d}/{p.year % 100:02d}" if slash else f"{p.month:02d}{p.year % 100:02d}"
+                 for p in delivery]
+    info_df = pd.DataFrame({
+        "futcode": futcodes,
+        "contrcode": contrcode,
+        "contrname": f"SYNTHETIC {product_index}",
+        "contrdate": contrdate,
+        "startdate": startdate,
+        "lasttrddate": lasttrddate,
+    })
+
+    # daily rows of every contract: [lo, hi) slice of the trading calendar
+    lo = days.searchsorted(startdate)
+    hi = days.searchsorted(lasttrddate, side="right")
+    lengths = np.maximum(hi - lo, 0)
+    contract_idx = np.repeat(np.arange(len(delivery)), lengths)
+    day_idx = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(lo, lengths)
+
+    log_spot = np.log(rng.uniform(5, 500)) + np.cumsum(rng.normal(0, 0.015, len(days)))
+    carry = rng.normal(0, 0.005)
+    date_ = days[day_idx]
+    months_to_delivery = ((delivery.year.to_numpy()[contract_idx] - date_.year) * 12
+                          + delivery.month.to_numpy()[contract_idx] - date_.month)
+    settlement = np.exp(log_spot[day_idx] + carry * months_to_delivery
+                        + rng.normal(0, 0.002, len(day_idx)))
+
+    data_df = pd.DataFrame({
+        "futcode": futcodes[contract_idx],
+        "date_": date_,
+        "settlement": settlement,
+        "volume": np.round(rng.gamma(2.0, 500.0, len(day_idx))),
+        "contrdate": np.asarray(contrdate, dtype=object)[contract_idx],
+    })
+    data_df = data_df[rng.random(len(data_df)) >= missing_rate].reset_index(drop=True)
+    return info_df, data_df
+
+
+def synthetic_futures_data(n_products=30, **kwargs):
+    """
+    Daily store of n_products synthetic products, shaped like pull_all_futures_data.
+
+    Parameters
+    ----------
+    n_products : int, optional
+        Number of products (default is 30).
+    **kwargs
+        Passed to synthetic_product.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Daily settlements with startdate, lasttrddate and product_code.
+    """
+    frames = []
+    for i in range(n_products):
+        info_df, data_df = synthetic_product(i, **kwargs)
+        dates = info_df.set_index("futcode")[["startdate", "lasttrddate"]]
+        frames.append(data_df.join(dates, on="futcode").assign(product_code=info_df["contrcode"].iat[0]))
+    return pd.concat(frames, ignore_index=True)
+
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from calc_aggregate_cube import (build_settlement_cube, merge_settlement_cubes, update_settlement_cube,
+                                 rollup_settlement_cube)
+from calc_format_futures_data import futures_series_to_monthly
+from synthetic_futures import synthetic_futures_data
+
+
+def _direct(monthly_df, by):
+    """
+    Summary statistics straight from the monthly rows, as the cube rollup reports them.
+    """
+    cells = monthly_df.assign(year=monthly_df["obs_period"].dt.year)
+    direct = cells.groupby(by)["settlement"].agg(["mean", "std", "min", "max", "count"])
+    return direct.reset_index()
+
+
+def _assert_rollups_match(cube, monthly_df):
+    for by in ["product_code", ["product_code", "year"], "year"]:
+        pd.testing.assert_frame_equal(rollup_settlement_cube(cube, by=by), _direct(monthly_df, by),
+                                      check_dtype=False, rtol=1e-9)
+
+
+def test_cube_rollups_merges_and_updates_match_direct_groupby():
+    monthly_df = futures_series_to_monthly(synthetic_futures_data(3, n_years=4))
+    cube = build_settlement_cube(monthly_df)
+    _assert_rollups_match(cube, monthly_df)
+
+    window = monthly_df[monthly_df["obs_period"].between(pd.Period("2001-03", "M"), pd.Period("2002-06", "M"))]
+    pd.testing.assert_frame_equal(rollup_settlement_cube(cube, by="product_code", start="2001-03", end="2002-06"),
+                                  _direct(window, "product_code"), check_dtype=False, rtol=1e-9)
+
+    # cubes of disjoint rows of the same months merge into the cube of all rows
+    odd = monthly_df["futcode"] % 2 == 1
+    merged = merge_settlement_cubes(build_settlement_cube(monthly_df[odd]), build_settlement_cube(monthly_df[~odd]))
+    _assert_rollups_match(merged, monthly_df)
+
+    # new months are appended, and re-ingested months replace their cells instead of adding to them
+    cutoff = pd.Period("2003-01", "M")
+    early, late = monthly_df[monthly_df["obs_period"] < cutoff], monthly_df[monthly_df["obs_period"] >= cutoff]
+    updated = update_settlement_cube(build_settlement_cube(early), late)
+    _assert_rollups_match(updated, monthly_df)
+
+    corrected = monthly_df.copy()
+    restated = corrected["obs_period"] >= pd.Period("2003-10", "M")
+    corrected.loc[restated, "settlement"] *= 1.01
+    restated_cube = update_settlement_cube(updated, corrected[restated])
+    assert len(restated_cube) == len(cube)
+    _assert_rollups_match(restated_cube, corrected)
+
+
+def test_cube_variance_is_exact_at_large_price_levels():
+    """
+    Raw sums of squares lose every significant digit of the variance when prices are
+    large relative to their spread; centered moments do not.
+    """
+    monthly_df = futures_series_to_monthly(synthetic_futures_data(2, n_years=3))
+    monthly_df["settlement"] = 1e9 + monthly_df["settlement"] / 100
+    halves = [monthly_df[monthly_df["obs_period"] < pd.Period("2001-06", "M")],
+              monthly_df[monthly_df["obs_period"] >= pd.Period("2001-06", "M")]]
+    cube = merge_settlement_cubes(*[build_settlement_cube(half) for half in halves])
+    rolled = rollup_settlement_cube(cube, by="product_code").set_index("product_code")
+    expected = monthly_df.groupby("product_code")["settlement"].std()
+    assert np.allclose(rolled["std"], expected, rtol=1e-6)
+
+
+def test_cached_cube_round_trips_with_its_types(tmp_path, monkeypatch):
+    """
+    The saved cube reloads with the same columns and types it was built with.
+    """
+    import calc_aggregate_cube
+
+    df_all = synthetic_futures_data(2, n_years=2)
+    monkeypatch.setattr(calc_aggregate_cube, "CUBE_FILE", tmp_path / "settlement_cube.parquet")
+    monkeypatch.setattr(calc_aggregate_cube, "DATA_FILE", tmp_path / "df_all.parquet")
+    monkeypatch.setattr(calc_aggregate_cube, "load_combined_futures_data", lambda: df_all)
+
+    built = calc_aggregate_cube.load_settlement_cube(rebuild=True)
+    cached = calc_aggregate_cube.load_settlement_cube()
+    pd.testing.assert_frame_equal(cached, built)
+    assert cached["obs_period"].dtype == pd.PeriodDtype("M")
@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+import os
+import pytest
+import calc_continuous_futures
+import pull_futures_data
+from calc_continuous_futures import build_continuous_futures, build_monthly_excess_return_panel, load_monthly_excess_returns
+from calc_format_futures_data import futures_series_to_monthly, front_contract_returns
+from columnar_store import write_table, FUTURES_SCHEMA
+from synthetic_futures import synthetic_futures_data
+
+DATES = pd.bdate_range("2023-01-02", "2023-04-28")
+EXPIRIES = {1: "2023-02-15", 2: "2023-03-15", 3: "2023-04-14", 4: "2023-05-15"}
+CONTRDATES = {1: "0223", 2: "0323", 3: "0423", 4: "0523"}
+
+
+def _four_contracts(volume=None):
+    """
+    Feb-May 2023 contracts of one product, each trading from January to its expiry at
+    100 * futcode + business day number, so every return identifies its contract.
+    """
+    frames = []
+    for futcode, expiry in EXPIRIES.items():
+        dates = DATES[DATES <= expiry]
+        frames.append(pd.DataFrame({
+            "product_code": 1, "futcode": futcode, "date_": dates, "contrdate": CONTRDATES[futcode],
+            "settlement": 100.0 * futcode + np.arange(len(dates)), "lasttrddate": pd.Timestamp(expiry),
+            "volume": [volume(futcode, d) if volume else 1.0 for d in dates],
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _held(series, date):
+    return series.set_index("date_").loc[pd.Timestamp(date), "futcode"]
+
+
+def test_expiry_roll_days_before_last_trade():
+    series = build_continuous_futures(_four_contracts(), nth=[1, 2], roll_rule="expiry", roll_days=5)
+    front, second = series[series["nth"] == 1], series[series["nth"] == 2]
+    # five business days before Feb 15 is Feb 8
+    assert _held(front, "2023-02-07") == 1 and _held(front, "2023-02-08") == 2
+    assert _held(second, "2023-02-07") == 2 and _held(second, "2023-02-08") == 3
+    assert front.loc[front["roll"], "date_"].dt.strftime("%m-%d").tolist() == ["02-08", "03-08", "04-07"]
+
+    # the roll day's return is still earned on the contract held the day before
+    roll_day = front.set_index("date_").loc[pd.Timestamp("2023-02-08")]
+    i = DATES.get_loc(pd.Timestamp("2023-02-07"))
+    assert roll_day["ret"] == pytest.approx((100 + i + 1) / (100 + i) - 1)
+    assert np.allclose(front["cum_index"], (1 + front["ret"].fillna(0)).cumprod())
+
+    # a missing front quote skips that day instead of rolling to the next contract and back
+    gappy = _four_contracts()
+    gappy = gappy[~((gappy["futcode"] == 1) & (gappy["date_"] == pd.Timestamp("2023-01-16")))]
+    gappy_front = build_continuous_futures(gappy, roll_rule="expiry", roll_days=5)
+    assert pd.Timestamp("2023-01-16") not in set(gappy_front["date_"])
+    assert gappy_front["roll"].sum() == 3
+
+    later = build_continuous_futures(_four_contracts(), roll_rule="expiry", roll_days=2)
+    assert _held(later, "2023-02-10") == 1 and _held(later, "2023-02-13") == 2
+
+
+def test_month_end_roll_before_contract_month():
+    front = build_continuous_futures(_four_contracts(), roll_rule="month_end")
+    assert _held(front, "2023-01-31") == 1 and _held(front, "2023-02-01") == 2
+    assert _held(front, "2023-02-28") == 2 and _held(front, "2023-03-01") == 3
+
+
+def test_volume_roll_needs_sustained_leadership_and_never_rolls_back():
+    def volume(futcode, date):
+        if futcode == 1:
+            return 5000.0 if date == pd.Timestamp("2023-02-08") else (1000.0 if date < pd.Timestamp("2023-02-01") else 10.0)
+        if futcode == 2:
+            return 500.0 if date < pd.Timestamp("2023-02-01") else 2000.0
+        if futcode == 4:
+            return 9000.0 if date == pd.Timestamp("2023-01-20") else 100.0
+        return 3000.0 if date >= pd.Timestamp("2023-03-06") else 100.0
+
+    series = build_continuous_futures(_four_contracts(volume), nth=[1, 2], roll_rule="volume", roll_days=3)
+    front, second = series[series["nth"] == 1], series[series["nth"] == 2]
+    # a one-day spike in the May contract does not move the series past March and April
+    assert _held(front, "2023-01-20") == 1 and _held(front, "2023-01-23") == 1
+    # March leads from Feb 1 and is held from its third day of leadership
+    assert _held(front, "2023-02-02") == 1 and _held(front, "2023-02-03") == 2
+    # Feb contract's volume spike on Feb 8 does not pull the series back
+    assert _held(front, "2023-02-08") == 2
+    assert _held(front, "2023-03-07") == 2
+    assert _held(front, "2023-03-08") == 3 and _held(second, "2023-03-08") == 4
+
+
+def test_nth_series_on_synthetic_products():
+    df_all = synthetic_futures_data(3, n_years=3)
+    series = build_continuous_futures(df_all, nth=[1, 2])
+    assert not series.duplicated(["product_code", "nth", "date_"]).any()
+    assert set(series["product_code"]) == set(df_all["product_code"])
+
+    wide = series.pivot_table(index=["product_code", "date_"], columns="nth", values="contr_period", aggfunc="first")
+    wide = wide.dropna()
+    assert (wide[2] > wide[1]).all()
+    # roughly one roll per listed monthly contract
+    rolls = series[series["nth"] == 1].groupby("product_code")["roll"].sum()
+    assert rolls.between(20, 36).all()
+
+
+def test_return_panel_matches_per_product_returns():
+    """
+    The one-pass panel equals the front-contract returns computed product by product.
+    """
+    df_all = synthetic_futures_data(4, n_years=3, missing_rate=0.05)
+    panel = build_monthly_excess_return_panel(df_all)
+    assert len(panel) > 0 and not panel.duplicated(["obs_period", "product_code"]).any()
+
+    expected = pd.concat([
+        front_contract_returns(futures_series_to_monthly(data_contracts)).assign(product_code=code)
+        for code, data_contracts in df_all.groupby("product_code")
+    ])
+    expected = expected[["obs_period", "product_code", "futcode", "excess_return"]]
+    expected = expected.sort_values(["obs_period", "product_code"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(panel, expected, check_dtype=False)
+
+
+def test_return_panel_cache_follows_the_daily_store(tmp_path, monkeypatch):
+    """
+    The cached panel is reused while it is at least as recent as df_all.parquet and
+    rebuilt once the store is rewritten.
+    """
+    store = tmp_path / "df_all.parquet"
+    write_table(synthetic_futures_data(2, n_years=2), store, FUTURES_SCHEMA)
+    monkeypatch.setattr(pull_futures_data, "DATA_FILE", store)
+    monkeypatch.setattr(calc_continuous_futures, "DATA_FILE", store)
+    monkeypatch.setattr(calc_continuous_futures, "RETURN_PANEL_FILE", tmp_path / "monthly_excess_returns.parquet")
+
+    builds = []
+    build = calc_continuous_futures.build_monthly_excess_return_panel
+
+    def counting_build(df_all):
+        builds.append(len(df_all))
+        return build(df_all)
+
+    monkeypatch.setattr(calc_continuous_futures, "build_monthly_excess_return_panel", counting_build)
+    first = load_monthly_excess_returns()
+    pd.testing.assert_frame_equal(load_monthly_excess_returns(), first)
+    assert len(builds) == 1
+
+    # a newer store makes the cache stale
+    write_table(synthetic_futures_data(3, n_years=2), store, FUTURES_SCHEMA)
+    later = os.stat(calc_continuous_futures.RETURN_PANEL_FILE).st_mtime + 10
+    os.utime(store, (later, later))
+    rebuilt = load_monthly_excess_returns()
+    assert len(builds) == 2
+    assert rebuilt["product_code"].nunique() == 3
+    assert len(load_monthly_excess_returns(rebuild=True)) == len(rebuilt) and len(builds) == 3
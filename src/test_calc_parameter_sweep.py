@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+from calc_format_futures_data import window_summary
+from calc_parameter_sweep import rolling_windows, sweep_grid, run_sweep, SWEEP_STATS
+from synthetic_futures import synthetic_futures_data
+
+
+def test_sweep_matches_window_summary_in_and_out_of_process():
+    df_all = synthetic_futures_data(2, n_years=6)
+    codes = [10000, 10001]
+    windows = rolling_windows("2000-01-01", "2005-12-31", years=4, step_years=1)
+    assert len(windows) == 3 and windows[-1][1] == pd.Timestamp("2005-12-31")
+
+    configs = sweep_grid(windows, bases=[("span", (1, 12)), ("fixed", (1, 6))], freqs=["M", "Q"])
+    assert len(configs) == 12
+    results = run_sweep(configs, product_list=codes, df_all=df_all, max_workers=1)
+    assert len(results) == len(configs) * len(codes) * len(SWEEP_STATS)
+
+    # the paper's definition reproduces Table 1 of the same window
+    start, end = windows[1]
+    table = window_summary(start, end, product_list=codes, df_all=df_all).set_index("Contract Code")
+    paper = results[(results["start"] == start) & (results["freq"] == "M") & (results["basis"] == "span")]
+    paper = paper.pivot(index="product_code", columns="statistic", values="value")
+    assert np.allclose(paper.loc[codes, "mean_basis"], table.loc[codes, "Basis"].astype(float))
+    assert np.allclose(paper.loc[codes, "sharpe_ratio"], table.loc[codes, "Sharpe ratio"].astype(float))
+
+    # a fixed pair of maturities can only use fewer months than the nearest-to-farthest span
+    n = results[results["statistic"] == "N"].pivot_table(index=["start", "freq", "product_code"],
+                                                         columns="basis", values="value")
+    assert (n["fixed"] <= n["span"]).all()
+
+    with pytest.raises(ValueError, match="crosses"):
+        run_sweep(sweep_grid(rolling_windows("2000-01-01", "2009-12-31", years=10)), codes, df_all)
+
+    pooled = run_sweep(configs[:4], product_list=codes, df_all=df_all, max_workers=2)
+    pd.testing.assert_frame_equal(pooled, run_sweep(configs[:4], product_list=codes, df_all=df_all, max_workers=1))
@@ -0,0 +1,76 @@
+import pandas as pd
+import numpy as np
+import pytest
+from calc_term_structure import (curve_segments, product_curves, build_term_structure_cube,
+                                 save_term_structure_cube, read_term_structure_cube, cube_curves,
+                                 get_curve, get_point, get_curves, get_points)
+from calc_format_futures_data import futures_series_to_monthly
+from synthetic_futures import synthetic_futures_data
+
+
+def test_curve_segments_match_row_loop():
+    """
+    Arrays from curve_segments equal the per-row construction used by the sample curve figure.
+    """
+    index = pd.period_range("2000-01", periods=5, freq="M")
+    values = np.arange(1, 61, dtype=float).reshape(5, 12)
+    values[2, 4] = np.nan
+    curves_df = pd.DataFrame(values, index=index, columns=[f"{i}mth_settlement" for i in range(1, 13)])
+
+    segments = curve_segments(curves_df)
+    assert segments["x"].shape == (5, 12) and segments["y"].shape == (5, 12)
+    for r, (idx, row) in enumerate(curves_df.iterrows()):
+        expected_x = [(idx + i).to_timestamp() for i in range(len(row))]
+        assert list(pd.to_datetime(segments["x"][r])) == expected_x
+        expected_basis = (np.log(row.values[-1]) - np.log(row.values[0])) / (len(row) - 1) * 100
+        assert np.isclose(segments["basis"][r], expected_basis)
+    assert np.isnan(segments["y"][2, 4])
+
+
+def test_term_structure_cube_round_trips_memory_mapped(tmp_path):
+    """
+    The saved cube reopens memory-mapped with its axes, and its curves equal the
+    first-through-12th table of every month in which the product has a curve.
+    """
+    df_all = synthetic_futures_data(3, n_years=3, missing_rate=0.1)
+    monthly_df = futures_series_to_monthly(df_all)
+    path = save_term_structure_cube(build_term_structure_cube(monthly_df), tmp_path / "cube.npy")
+    cube = read_term_structure_cube(path)
+
+    assert isinstance(cube["values"], np.memmap)
+    assert cube["values"].shape == (3, len(cube["months"]), 12)
+    assert list(cube["products"]) == [10000, 10001, 10002]
+    for code in cube["products"]:
+        expected = product_curves(monthly_df, code, start="2001-03", end="2002-08")
+        expected = expected[expected.notna().any(axis=1)]
+        pd.testing.assert_frame_equal(cube_curves(cube, code, start="2001-03", end="2002-08"), expected,
+                                      check_freq=False, check_names=False)
+    assert cube_curves(cube, 999).empty
+
+
+def test_curve_and_point_lookups_match_the_monthly_pivot(tmp_path):
+    """
+    get_curve/get_point and their batch variants return the first-through-12th table's
+    values, NaN outside the cube's months, and reject unknown products.
+    """
+    monthly_df = futures_series_to_monthly(synthetic_futures_data(2, n_years=3))
+    path = save_term_structure_cube(build_term_structure_cube(monthly_df), tmp_path / "cube.npy")
+    cube = read_term_structure_cube(path)
+    expected = product_curves(monthly_df, 10001)
+
+    month = expected.index[14]
+    np.testing.assert_array_equal(get_curve(cube, 10001, str(month)), expected.loc[month].to_numpy())
+    assert np.isclose(get_point(cube, 10001, month, 3), expected.loc[month, "3mth_settlement"])
+    assert np.isnan(get_curve(cube, 10001, "1950-01")).all()
+
+    months = list(expected.index[:5]) + ["2099-01"]
+    curves = get_curves(cube, 10001, months)
+    np.testing.assert_array_equal(curves[:5], expected.iloc[:5].to_numpy())
+    assert np.isnan(curves[5]).all()
+    points = get_points(cube, [10000, 10001], [month, month], [1, 12])
+    assert np.isclose(points[1], expected.loc[month, "12mth_settlement"])
+
+    with pytest.raises(KeyError):
+        get_curve(cube, 999, month)
+    with pytest.raises(ValueError):
+        get_point(cube, 10001, month, 13)
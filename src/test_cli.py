@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pandas as pd
+import calc_format_futures_data
+from cli import main
+
+
+def test_summarize_from_cache_prints_saved_results(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(calc_format_futures_data, "DATA_DIR", tmp_path)
+    table = pd.DataFrame({
+        "Commodity": ["CORN"], "Contract Code": [3247], "N": [100], "Basis": [1.5],
+        "Freq. of bw.": [40.0], "E[Re]": [2.0], "σ[Re]": [10.0], "Sharpe ratio": [20.0],
+        "Sector": ["Agriculture"],
+    })
+    calc_format_futures_data.save_summary(table, "paper")
+
+    main(["summarize", "--from-cache", "--period", "paper"])
+    out = capsys.readouterr().out
+    assert "PAPER PERIOD" in out and "Corn" in out and "C-" in out
+
+
+def test_cli_import_does_not_load_plotting_or_wrds():
+    code = "import sys, cli; cli.build_parser(); print(sorted({'matplotlib', 'seaborn', 'IPython', 'wrds', 'pandas'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=Path(__file__).parent, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_summarize_from_cache_does_not_load_plotting_or_wrds(tmp_path, monkeypatch):
+    """
+    Printing the saved results end to end imports neither WRDS, the query log,
+    the coverage index, the fingerprints nor the plotting stack.
+    """
+    monkeypatch.setattr(calc_format_futures_data, "DATA_DIR", tmp_path)
+    table = pd.DataFrame({
+        "Commodity": ["CORN"], "Contract Code": [3247], "N": [100], "Basis": [1.5],
+        "Freq. of bw.": [40.0], "E[Re]": [2.0], "σ[Re]": [10.0], "Sharpe ratio": [20.0],
+        "Sector": ["Agriculture"],
+    })
+    calc_format_futures_data.save_summary(table, "paper")
+
+    code = ("import sys; from cli import main; main(['summarize', '--from-cache', '--period', 'paper']); "
+            "print(sorted({'matplotlib', 'seaborn', 'IPython', 'wrds', 'wrds_query_log', "
+            "'coverage_index', 'output_fingerprint'} & set(sys.modules)))")
+    env = {**os.environ, "DATA_DIR": str(tmp_path)}
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=Path(__file__).parent, env=env, check=True)
+    lines = result.stdout.strip().splitlines()
+    assert "PAPER PERIOD" in result.stdout and lines[-1] == "[]"
@@ -0,0 +1,60 @@
+import pandas as pd
+import pyarrow.parquet as pq
+from columnar_store import write_table, read_table, FUTURES_SCHEMA
+
+
+def test_futures_round_trip_is_type_exact(tmp_path):
+    """
+    Daily settlements come back with the schema's types; missing columns and empty
+    frames still produce the full schema.
+    """
+    df = pd.DataFrame({
+        "futcode": [1, 1, 2],
+        "date_": pd.to_datetime(["2020-01-02", "2020-01-03", "2020-01-02"]),
+        "settlement": [10.0, 10.5, None],
+        "contrdate": ["0320", "0320", "0620"],
+        "startdate": pd.to_datetime(["2019-01-01"] * 3),
+        "lasttrddate": pd.to_datetime(["2020-03-20", "2020-03-20", "2020-06-19"]),
+        "product_code": [1986] * 3,
+    })
+    path = write_table(df, tmp_path / "futures.parquet", FUTURES_SCHEMA)
+    assert pq.read_schema(path).remove_metadata().equals(FUTURES_SCHEMA)
+
+    back = read_table(path)
+    assert list(back.columns) == FUTURES_SCHEMA.names
+    assert back["volume"].isna().all()
+    pd.testing.assert_frame_equal(back.drop(columns="volume"), df)
+
+    empty = read_table(write_table(pd.DataFrame(), tmp_path / "empty.parquet", FUTURES_SCHEMA))
+    assert empty.empty and list(empty.columns) == FUTURES_SCHEMA.names
+
+
+def test_summary_schema_matches_typed_frame(tmp_path):
+    """
+    The saved Table 1 schema follows SUMMARY_SCHEMA column for column, and a typed
+    summary round-trips unchanged.
+    """
+    from calc_format_futures_data import SUMMARY_SCHEMA, SUMMARY_ARROW_SCHEMA
+
+    assert SUMMARY_ARROW_SCHEMA.names == list(SUMMARY_SCHEMA)
+    typed = pd.DataFrame({name: pd.Series([None], dtype=dtype) for name, dtype in SUMMARY_SCHEMA.items()})
+    path = write_table(typed, tmp_path / "summary.parquet", SUMMARY_ARROW_SCHEMA)
+    pd.testing.assert_frame_equal(read_table(path).astype(SUMMARY_SCHEMA), typed)
+
+
+def test_period_columns_round_trip(tmp_path):
+    """
+    Period fields come back as Periods of their frequency, also through row filters.
+    """
+    from columnar_store import RETURN_PANEL_SCHEMA
+
+    panel = pd.DataFrame({
+        "obs_period": pd.period_range("2020-01", periods=3, freq="M"),
+        "product_code": [1986] * 3,
+        "futcode": [1, 1, 2],
+        "excess_return": [0.01, None, -0.02],
+    })
+    path = write_table(panel, tmp_path / "panel.parquet", RETURN_PANEL_SCHEMA)
+    pd.testing.assert_frame_equal(read_table(path), panel)
+    later = read_table(path, filters=[("obs_period", ">=", pd.Timestamp("2020-02-01"))])
+    assert list(later["obs_period"].astype(str)) == ["2020-02", "2020-03"]
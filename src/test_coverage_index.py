@@ -0,0 +1,35 @@
+import pandas as pd
+from coverage_index import (
+    build_coverage_index,
+    products_with_data,
+    coverage_counts,
+    coverage_gaps,
+    coverage_matrix
+)
+
+
+def test_coverage_index_queries():
+    """
+    Product 1 trades Jan-Jun 2020 with April missing; product 2 only trades in May.
+    """
+    days = pd.bdate_range("2020-01-01", "2020-06-30")
+    days_1 = days[days.month != 4]
+    days_2 = days[days.month == 5]
+    df_all = pd.DataFrame({
+        "product_code": [1] * len(days_1) + [2] * len(days_2),
+        "date_": list(days_1) + list(days_2),
+    })
+    index = build_coverage_index(df_all)
+
+    assert list(products_with_data(index, "2020-04-01", "2020-04-30")) == []
+    assert list(products_with_data(index, "2020-05-15", "2020-05-15")) == [1, 2]
+    assert coverage_counts(index).to_dict() == {1: 5, 2: 1}
+
+    gaps = coverage_gaps(index, 1)
+    assert len(gaps) == 1
+    assert gaps.loc[0, "start"] == pd.Period("2020-04", freq="M") and gaps.loc[0, "length"] == 1
+
+    matrix = coverage_matrix(index, product_codes=[19])
+    assert list(matrix.index) == [1, 2, 19]
+    assert matrix.shape == (3, 6)
+    assert matrix.loc[19].sum() == 0 and matrix.loc[2].sum() == 1
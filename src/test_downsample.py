@@ -0,0 +1,34 @@
+import pandas as pd
+import numpy as np
+from downsample import downsample_series, lttb_indices, minmax_indices
+
+
+def test_downsampling_keeps_shape_and_gaps():
+    """
+    A noisy daily series is reduced to the target size without losing its extremes,
+    its endpoints or the gap in the middle.
+    """
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2000-01-03", periods=20000)
+    values = np.cumsum(rng.normal(size=len(dates))) + 100
+    values[9000:9500] = np.nan
+
+    for method in ("minmax", "lttb"):
+        x, y = downsample_series(dates, values, max_points=1000, method=method)
+        assert len(y) <= 1100
+        assert x[0] == dates[0].to_datetime64() and x[-1] == dates[-1].to_datetime64()
+        assert np.isnan(y).sum() == 1
+        assert np.all(np.diff(x.astype(np.int64)) > 0)
+
+    x, y = downsample_series(dates, values, max_points=1000, method="minmax")
+    assert np.nanmax(y) == np.nanmax(values)
+    assert np.nanmin(y) == np.nanmin(values)
+
+    # short series and a disabled target pass through untouched
+    x, y = downsample_series(dates[:50], values[:50], max_points=1000)
+    assert len(y) == 50
+    x, y = downsample_series(dates, values, max_points=0)
+    assert len(y) == len(values)
+
+    assert len(lttb_indices(np.arange(100.0), np.sin(np.arange(100.0)), 10)) == 10
+    assert list(minmax_indices(np.array([3.0, 1.0, 2.0, 5.0]), 1)) == [0, 1, 3]
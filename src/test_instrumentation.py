@@ -0,0 +1,30 @@
+import json
+import pytest
+import instrumentation
+from instrumentation import timed, timer, snapshot, reset, dump
+
+
+@pytest.mark.skipif(instrumentation.ENABLED, reason="INSTRUMENTATION is enabled in this environment")
+def test_disabled_hooks_leave_code_untouched():
+    """
+    With instrumentation off (the default), decorated functions are the originals.
+    """
+    def f(x):
+        return x + 1
+    assert timed()(f) is f
+    with timer("block"):
+        pass
+    instrumentation.count("calls")
+    assert snapshot() == {"counters": {}, "timers": {}}
+
+
+def test_registry_records_and_dumps(tmp_path):
+    reset()
+    instrumentation._record_time("stage", 0.5)
+    instrumentation._record_time("stage", 1.5)
+    with instrumentation._timer("block"):
+        pass
+    data = json.loads(dump(tmp_path / "instrumentation.json").read_text())
+    assert data["timers"]["stage"] == {"calls": 2, "total_s": 2.0, "mean_s": 1.0, "max_s": 1.5}
+    assert data["timers"]["block"]["calls"] == 1
+    reset()
@@ -0,0 +1,105 @@
+import pandas as pd
+import numpy as np
+from output_fingerprint import product_fingerprints, output_fingerprint, is_up_to_date
+
+
+def test_fingerprints_follow_product_changes(tmp_path):
+    """
+    Editing one product's rows only changes outputs that depend on that product.
+    """
+    days = pd.bdate_range("2020-01-01", "2020-03-31")
+    df_all = pd.DataFrame({
+        "product_code": [1] * len(days) + [2] * len(days),
+        "futcode": [10] * len(days) + [20] * len(days),
+        "date_": list(days) * 2,
+        "contrdate": ["0620"] * (2 * len(days)),
+        "settlement": np.arange(2 * len(days), dtype=float),
+    })
+    before = product_fingerprints(df_all)
+    # row order does not matter
+    assert product_fingerprints(df_all.iloc[::-1]) == before
+
+    changed = df_all.copy()
+    changed.loc[changed["product_code"] == 2, "settlement"] += 1.0
+    after = product_fingerprints(changed)
+    assert after[1] == before[1]
+    assert after[2] != before[2]
+
+    assert output_fingerprint(before, [1]) == output_fingerprint(after, [1])
+    assert output_fingerprint(before) != output_fingerprint(after)
+    assert output_fingerprint(before, [1], {"window": 12}) != output_fingerprint(before, [1], {"window": 24})
+
+    output = tmp_path / "figure.png"
+    fingerprint = output_fingerprint(before, [1])
+    manifest = {"figure.png": fingerprint}
+    assert not is_up_to_date(output, fingerprint, manifest)
+    output.write_bytes(b"")
+    assert is_up_to_date(output, fingerprint, manifest)
+    assert not is_up_to_date(output, output_fingerprint(after), manifest)
+
+
+def test_saved_inputs_and_helper_code_enter_fingerprint(tmp_path):
+    """
+    Editing a file an output reads (saved results, a helper module, the product
+    registry) changes its fingerprint.
+    """
+    helper = tmp_path / "helper.py"
+    helper.write_text("def f():\n    return 1\n")
+    before = output_fingerprint({1: "a"}, [1], files=[helper])
+    helper.write_text("def f():\n    return 2\n")
+    assert output_fingerprint({1: "a"}, [1], files=[helper]) != before
+
+
+def test_render_dependencies_cover_local_imports():
+    """
+    Every project module create_figures imports is part of each output's fingerprint,
+    and the HTML tables are fingerprinted outputs too.
+    """
+    import ast
+    from create_figures import RENDER_DEPENDENCIES, FIGURE_OUTPUTS, SRC_DIR
+
+    tree = ast.parse((SRC_DIR / "create_figures.py").read_text())
+    imported = {node.module for node in ast.walk(tree) if isinstance(node, ast.ImportFrom)}
+    local = {SRC_DIR / f"{module}.py" for module in imported if (SRC_DIR / f"{module}.py").exists()}
+    assert local <= set(RENDER_DEPENDENCIES)
+    assert {"final_paper.html", "final_current.html"} <= set(FIGURE_OUTPUTS)
+
+
+def test_notebook_inputs_cover_product_artifacts_and_registry():
+    """
+    The notebooks' fingerprint covers every product's pulled data and Table 1 row, both
+    Table 1 results and the product registry.
+    """
+    from notebook_runner import notebook_inputs
+    from product_registry import REGISTRY_FILE, product_codes
+    from pull_futures_data import product_data_file
+    from calc_format_futures_data import summary_file, product_summary_file
+
+    inputs = set(notebook_inputs())
+    for code in product_codes("paper"):
+        assert {product_data_file(code, "paper"), product_summary_file(code, "paper")} <= inputs
+    assert {summary_file("paper"), summary_file("current"), REGISTRY_FILE} <= inputs
+
+
+def test_failed_notebook_keeps_the_others_recorded(tmp_path, monkeypatch):
+    """
+    A failing notebook is reported after the notebooks that did execute are recorded,
+    so only the failed one runs again; the fingerprint covers the imported modules.
+    """
+    import pytest
+    import notebook_runner
+
+    monkeypatch.setattr(notebook_runner, "NOTEBOOK_MANIFEST", tmp_path / "notebook_fingerprints.json")
+    monkeypatch.setattr(notebook_runner, "EXECUTED_DIR", tmp_path)
+
+    def execute(name, formats):
+        if name == "Broken":
+            raise RuntimeError("kernel died")
+        return [tmp_path / f"{name}.ipynb"]
+
+    monkeypatch.setattr(notebook_runner, "execute_notebook", execute)
+    with pytest.raises(RuntimeError, match="Broken: kernel died"):
+        notebook_runner.run_notebooks(["Good", "Broken"], force=True)
+    manifest = notebook_runner.read_manifest(tmp_path / "notebook_fingerprints.json")
+    assert list(manifest) == ["Good.ipynb"]
+    assert notebook_runner.SRC_DIR / "calc_analysis.py" in notebook_runner.notebook_inputs()
@@ -0,0 +1,29 @@
+from product_registry import (PRODUCTS, load_products, get_product, product_by_wrds_name, product_codes,
+                              product_field_map, product_label, product_name)
+
+
+def test_registry_covers_table1_universe():
+    """
+    The registry holds the 30 Table 1 products plus disabled Broilers, with the names
+    the report uses.
+    """
+    assert len(product_codes("paper")) == 30 and len(product_codes("current")) == 30
+    assert 19 not in product_codes() and 19 in product_codes(include_disabled=True)
+    assert product_label(19) == "Broilers (BR)"
+    assert product_label(2036) == "Orange juice (JO)" and product_name(2036) == "Orange Juice"
+    assert product_by_wrds_name("BUTTER (CASH)")["symbol"] == "02"
+    assert get_product(1986)["sector"] == "Energy" and product_field_map("sector")[2108] == "Metals"
+    assert product_name(123456) == "Code 123456"
+
+
+def test_registry_is_a_data_change(tmp_path):
+    path = tmp_path / "products.csv"
+    path.write_text(
+        "product_code,wrds_name,display_name,symbol,sector,periods\n"
+        "1,A,Alpha,AA,Energy,current\n"
+        "2,B,Beta,BB,Metals,paper current\n"
+    )
+    products = load_products(path)
+    assert list(products) == [1, 2]
+    assert products[1]["periods"] == ("current",) and products[2]["label"] == "Beta (BB)"
+    assert PRODUCTS[3160]["wrds_name"] == "WESTERN BARLEY"
@@ -0,0 +1,48 @@
+import json
+import pandas as pd
+from run_report import record_task, parquet_rows
+
+
+def test_run_report_compares_with_previous_run(tmp_path):
+    """
+    Each run gets a JSON report whose tasks carry their wall time in the previous run.
+    """
+    base = {"cpu_s": 0.1, "child_cpu_s": 0.0, "peak_rss_mb": 100.0, "rows_in": None, "rows_out": 10}
+    record_task({"task": "calc", "wall_s": 2.0, **base}, run_id="20240101_000000", report_dir=tmp_path)
+    record_task({"task": "calc", "wall_s": 3.0, **base}, run_id="20240102_000000", report_dir=tmp_path)
+    record_task({"task": "pull", "wall_s": 1.0, **base}, run_id="20240102_000000", report_dir=tmp_path)
+
+    report = json.loads((tmp_path / "20240102_000000.json").read_text())
+    tasks = {t["task"]: t for t in report["tasks"]}
+    assert tasks["calc"]["prev_wall_s"] == 2.0 and tasks["pull"]["prev_wall_s"] is None
+    assert report["total_wall_s"] == 4.0
+    assert "| calc | 3.00 |" in (tmp_path / "latest.md").read_text()
+
+
+def test_parquet_rows_reads_footers(tmp_path):
+    pd.DataFrame({"a": range(5)}).to_parquet(tmp_path / "a.parquet")
+    pd.DataFrame({"a": range(3)}).to_parquet(tmp_path / "b.parquet")
+    paths = [tmp_path / "a.parquet", tmp_path / "b.parquet", tmp_path / "missing.parquet", "src/x.py"]
+    assert parquet_rows(paths) == 8
+    assert parquet_rows(["src/x.py"]) is None
+
+
+def _record_many(args):
+    worker, report_dir = args
+    base = {"cpu_s": 0.0, "child_cpu_s": 0.0, "peak_rss_mb": None, "rows_in": None, "rows_out": None}
+    for i in range(20):
+        record_task({"task": f"w{worker}:{i}", "wall_s": 0.01, **base}, run_id="20240103_000000", report_dir=report_dir)
+
+
+def test_concurrent_processes_share_one_complete_report(tmp_path):
+    """
+    Tasks of one run finishing in several processes at once all end up in its report.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_record_many, [(w, tmp_path) for w in range(4)]))
+    lines = (tmp_path / "20240103_000000.jsonl").read_text().splitlines()
+    assert len(lines) == 80 and all(json.loads(line) for line in lines)
+    report = json.loads((tmp_path / "20240103_000000.json").read_text())
+    assert len(report["tasks"]) == 80
@@ -0,0 +1,44 @@
+import pytest
+import pandas as pd
+from synthetic_futures import synthetic_product, synthetic_futures_data, contract_months
+from bench_pipeline import check_equivalence, benchmark_stages
+
+
+def test_synthetic_product_is_deterministic_and_wrds_shaped():
+    info_df, data_df = synthetic_product(3, n_years=3, contracts_per_year=4)
+    again_info, again_data = synthetic_product(3, n_years=3, contracts_per_year=4)
+    pd.testing.assert_frame_equal(info_df, again_info)
+    pd.testing.assert_frame_equal(data_df, again_data)
+
+    assert list(info_df.columns) == ["futcode", "contrcode", "contrname", "contrdate", "startdate", "lasttrddate"]
+    assert list(data_df.columns) == ["futcode", "date_", "settlement", "volume", "contrdate"]
+    assert set(info_df["contrdate"].str[:2].astype(int)) <= set(contract_months(4))
+    assert data_df["futcode"].isin(info_df["futcode"]).all()
+    assert (data_df["settlement"] > 0).all()
+
+    df_all = synthetic_futures_data(2, n_years=2)
+    assert df_all["product_code"].nunique() == 2
+
+
+def test_fast_stages_match_reference_on_synthetic_products():
+    for i in range(3):
+        _, data_df = synthetic_product(i, n_years=4)
+        check_equivalence(data_df)
+
+    results = benchmark_stages(scales=[2], reference_max_products=1, check_products=1, n_years=2)
+    assert results.loc[results["implementation"] == "fast", "equivalent"].dropna().all()
+
+
+def test_equivalence_failures_are_logged_or_raised(monkeypatch, caplog):
+    import bench_pipeline
+
+    def disagree(data_df):
+        raise AssertionError("stats['N'] differs from reference")
+    monkeypatch.setattr(bench_pipeline, "check_equivalence", disagree)
+
+    results = benchmark_stages(scales=[1], reference_max_products=1, check_products=1, n_years=2)
+    assert not results.loc[results["implementation"] == "fast", "equivalent"].dropna().any()
+    assert "Product 0 at scale 1" in caplog.text
+
+    with pytest.raises(AssertionError, match="Product 0 at scale 1"):
+        benchmark_stages(scales=[1], reference_max_products=1, check_products=1, strict=True, n_years=2)
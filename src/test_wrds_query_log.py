@@ -0,0 +1,36 @@
+import logging
+import pandas as pd
+import wrds_query_log
+from wrds_query_log import normalize_query, run_query, query_summary
+
+
+class _FakeConnection:
+    def raw_sql(self, query):
+        return pd.DataFrame({"futcode": range(3)})
+
+
+def test_normalize_query_strips_literals():
+    query = """
+    SELECT futcode, date_, settlement
+    FROM tr_ds_fut.wrds_fut_contract
+    WHERE futcode IN (101, 102)
+      AND date_ >= '1970-01-01'
+    """
+    assert normalize_query(query) == (
+        "SELECT futcode, date_, settlement FROM tr_ds_fut.wrds_fut_contract WHERE futcode IN (?) AND date_ >= ?"
+    )
+
+
+def test_queries_are_recorded_and_summarized(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(wrds_query_log, "SLOW_QUERY_SECONDS", 0.0)
+    monkeypatch.setattr(wrds_query_log, "QUERY_LOG", [])
+    log_file = tmp_path / "queries.jsonl"
+    with caplog.at_level(logging.WARNING):
+        for code in [3160, 3160, 289]:
+            run_query(_FakeConnection(), f"SELECT * FROM t WHERE contrcode = {code}", code, "paper", log_file)
+
+    assert len(log_file.read_text().splitlines()) == 3
+    assert "Slow WRDS query" in caplog.text
+    summary = query_summary(wrds_query_log.QUERY_LOG).set_index("product")
+    assert summary.loc[3160, "queries"] == 2 and summary.loc[3160, "rows"] == 6
+    assert summary.loc[289, "slow"] == 1
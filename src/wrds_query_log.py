@@ -0,0 +1,132 @@
+""" Telemetry of the SQL sent to WRDS: every query is timed and recorded with its
+normalized text, product, period and row count, slow queries are logged as they
+happen, and a per-product summary shows which pulls are the slow ones"""
+
+import json
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+from settings import config
+from instrumentation import count, count_frame
+
+OUTPUT_DIR = Path(config("OUTPUT_DIR"))
+QUERY_LOG_FILE = OUTPUT_DIR / "wrds_queries.jsonl"
+SLOW_QUERY_SECONDS = config("WRDS_SLOW_QUERY_SECONDS")
+
+QUERY_LOG = []
+_lock = threading.Lock()
+
+
+def normalize_query(query):
+    """
+    Query text with literals replaced by placeholders and whitespace collapsed, so
+    queries that differ only in their codes or dates share one normalized form.
+
+    Examples
+    --------
+    >>> normalize_query("SELECT a FROM t WHERE c = 3160 AND d >= '1970-01-01'")
+    'SELECT a FROM t WHERE c = ? AND d >= ?'
+    >>> normalize_query("SELECT a FROM t WHERE f IN (1, 2, 3)")
+    'SELECT a FROM t WHERE f IN (?)'
+    """
+    text = re.sub(r"'[^']*'", "?", query)
+    text = re.sub(r"\bIN\s*\([^)]*\)", "IN (?)", text, flags=re.IGNORECASE)
+    text = re.sub(r"\b\d+(\.\d+)?\b", "?", text)
+    return " ".join(text.split())
+
+
+def run_query(db, query, product=None, period=None, log_file=QUERY_LOG_FILE):
+    """
+    Run a query through db.raw_sql and record it.
+
+    Parameters
+    ----------
+    db : wrds.Connection
+        Open WRDS connection.
+    query : str
+        SQL to run.
+    product : int, optional
+        Product code the query is for.
+    period : str, optional
+        'paper' or 'current'.
+    log_file : pathlib.Path, optional
+        JSON-lines file every record is appended to (default is
+        OUTPUT_DIR / "wrds_queries.jsonl"); None keeps records in memory only.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The query result.
+    """
+    start = time.perf_counter()
+    df = db.raw_sql(query)
+    latency = time.perf_counter() - start
+
+    record = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "query": normalize_query(query),
+        "product": None if product is None else int(product),
+        "period": period,
+        "latency_s": latency,
+        "rows": len(df),
+        "slow": latency >= SLOW_QUERY_SECONDS,
+    }
+    with _lock:
+        QUERY_LOG.append(record)
+        if log_file is not None:
+            Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+            with open(log_file, "a") as f:
+                f.write(json.dumps(record) + "\n")
+    if record["slow"]:
+        logging.warning(f"Slow WRDS query ({latency:.1f}s, {len(df)} rows, product {product}, "
+                        f"{period}): {record['query']}")
+    count("wrds.queries")
+    count_frame("wrds", df)
+    return df
+
+
+def query_summary(records=None):
+    """
+    Per product and period: queries, total and slowest latency, rows and slow queries.
+
+    Parameters
+    ----------
+    records : list of dict, optional
+        Query records (default is every query of this process).
+
+    Returns
+    -------
+    pandas.DataFrame
+        Sorted by total latency, slowest first.
+    """
+    records = QUERY_LOG if records is None else records
+    columns = ["product", "period", "queries", "latency_s", "max_latency_s", "rows", "slow"]
+    if not records:
+        return pd.DataFrame(columns=columns)
+    df = pd.DataFrame(records)
+    summary = df.groupby(["product", "period"], dropna=False).agg(
+        queries=("query", "size"),
+        latency_s=("latency_s", "sum"),
+        max_latency_s=("latency_s", "max"),
+        rows=("rows", "sum"),
+        slow=("slow", "sum"),
+    ).reset_index()
+    return summary.sort_values("latency_s", ascending=False, ignore_index=True)[columns]
+
+
+def print_query_summary(records=None):
+    """
+    Print the query summary with overall totals.
+    """
+    records = QUERY_LOG if records is None else records
+    summary = query_summary(records)
+    if summary.empty:
+        print("No WRDS queries were run.")
+        return
+    print(f"WRDS queries: {summary['queries'].sum()} in {summary['latency_s'].sum():.1f}s, "
+          f"{summary['rows'].sum():,} rows, {summary['slow'].sum()} slower than {SLOW_QUERY_SECONDS}s")
+    print(summary.to_string(index=False, float_format=lambda x: f"{x:.2f}"))